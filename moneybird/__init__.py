@@ -1,2 +1,26 @@
-from moneybird.api import MoneyBird
-from moneybird.authentication import TokenAuthentication, OAuthAuthentication
+import importlib
+
+# The public classes are imported on first use (PEP 562), so importing the package, or a module like
+# moneybird.filters, does not import requests or aiohttp until they are needed.
+_exports = {
+    'MoneyBird': 'moneybird.api',
+    'AsyncMoneyBird': 'moneybird.aio',
+    'TokenAuthentication': 'moneybird.authentication',
+    'OAuthAuthentication': 'moneybird.authentication',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name: str):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError("module 'moneybird' has no attribute '%s'" % name)
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,5 @@
+import sys
+
+from moneybird.cli import main
+
+sys.exit(main())
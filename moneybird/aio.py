@@ -0,0 +1,233 @@
+import logging
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from moneybird.api import MoneyBird, VERSION
+from moneybird.authentication import Authentication
+from moneybird.coalescing import RequestCoalescer
+from moneybird.codecs import JSONCodec, default_codec
+from moneybird.filters import query_params
+from moneybird.metrics import MetricsHook, RequestEvent
+from moneybird.transport import build_url
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+logger = logging.getLogger('moneybird')
+
+
+class AsyncMoneyBird(object):
+    """
+    Asynchronous client for the MoneyBird API, built on asyncio and aiohttp.
+
+    The interface mirrors :py:class:`moneybird.api.MoneyBird`, except that the request methods are coroutines. Responses
+    are processed exactly like in the synchronous client, so the same exceptions are raised.
+
+    The underlying aiohttp session is created on first use, so the client has to be used from within a running event
+    loop. Close the client with :py:func:`close` or use it as an asynchronous context manager.
+
+    Example:
+        >>> from moneybird import AsyncMoneyBird, TokenAuthentication
+        >>> async with AsyncMoneyBird(TokenAuthentication('access_token')) as moneybird:
+        ...     administrations = await moneybird.get('administrations')
+
+    :param authentication: The authentication method to use.
+    :param limit: The maximum number of simultaneous connections.
+    :param codec: The codec used to encode request bodies and decode responses (optional).
+    :param coalescer: The coalescer sharing one call to the API between identical GET requests which are made at the
+        same time, e.g. a :py:class:`moneybird.coalescing.RequestCoalescer` (optional).
+    :param metrics: The hook receiving the measurements of every call to the API, e.g. a
+        :py:class:`moneybird.metrics.MetricsAggregator` (optional).
+    """
+    version = MoneyBird.version
+    base_url = MoneyBird.base_url
+
+    APIError = MoneyBird.APIError
+    Unauthorized = MoneyBird.Unauthorized
+    NotFound = MoneyBird.NotFound
+    InvalidData = MoneyBird.InvalidData
+    Throttled = MoneyBird.Throttled
+    ServerError = MoneyBird.ServerError
+
+    def __init__(self, authentication: Authentication, limit: int = 100, codec: JSONCodec = None,
+                 coalescer: RequestCoalescer = None, metrics: MetricsHook = None):
+        if aiohttp is None:
+            raise ImportError("AsyncMoneyBird requires the aiohttp package")
+
+        self.authentication = authentication
+        self.limit = limit
+        self.codec = codec or default_codec
+        self.coalescer = coalescer
+        self.metrics = metrics
+        self.session = None
+
+    async def get(self, resource_path: str, administration_id: int = None, params: dict = None):
+        """
+        Performs a GET request to the endpoint identified by the resource path.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (optional).
+        :return: The decoded JSON response for the request.
+        """
+        return await self._request('GET', resource_path, administration_id, params=params)
+
+    async def post(self, resource_path: str, data: dict, administration_id: int = None):
+        """
+        Performs a POST request to the endpoint identified by the resource path.
+
+        :param resource_path: The resource path.
+        :param data: The data to send to the server.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :return: The decoded JSON response for the request.
+        """
+        return await self._request('POST', resource_path, administration_id, data)
+
+    async def patch(self, resource_path: str, data: dict, administration_id: int = None):
+        """
+        Performs a PATCH request to the endpoint identified by the resource path.
+
+        :param resource_path: The resource path.
+        :param data: The data to send to the server.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :return: The decoded JSON response for the request.
+        """
+        return await self._request('PATCH', resource_path, administration_id, data)
+
+    async def delete(self, resource_path: str, administration_id: int = None, params: dict = None):
+        """
+        Performs a DELETE request to the endpoint identified by the resource path. USE THIS METHOD WITH CAUTION.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param params: The query parameters to send (optional).
+        :return: The decoded JSON response for the request.
+        """
+        return await self._request('DELETE', resource_path, administration_id, params=params)
+
+    async def renew_session(self):
+        """
+        Closes the current session. Future requests will use a new session initiated with the same settings and
+        authentication method.
+        """
+        await self.close()
+        logger.debug("API session renewed")
+
+    async def close(self):
+        """
+        Closes the underlying session and releases its connections.
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _request(self, method: str, resource_path: str, administration_id: int = None, data: dict = None,
+                       params: dict = None):
+        """
+        Performs a request and processes the response like the synchronous client does.
+
+        :param method: The HTTP method.
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (may be None).
+        :param data: The data to send to the server (may be None).
+        :param params: The query parameters to send (may be None).
+        :return: The decoded JSON response for the request.
+        """
+        url = build_url(self._get_url(administration_id, resource_path), query_params(params))
+        headers = body = None
+        if data is not None:
+            headers = {'Content-Type': self.codec.content_type}
+            body = self.codec.encode(data)
+
+        event = RequestEvent(method, url) if self.metrics is not None else None
+        start = time.perf_counter()
+        try:
+            shared = False
+            if method == 'GET' and self.coalescer is not None:
+                key = self.coalescer.key(url, None, self.authentication.get_headers())
+                response, shared = await self.coalescer.call_async(key, lambda: self._send(method, url, body, headers))
+                if shared:
+                    logger.debug("API response shared with an identical request: %s" % url)
+            else:
+                response = await self._send(method, url, body, headers)
+
+            if event is not None:
+                event.coalesced = shared
+                event.attempts = 0 if shared else 1
+                event.status_code = response.status_code
+                event.bytes_sent = len(body) if body is not None else 0
+                event.bytes_received = len(response.content)
+            return self._process_response(response, codec=self.codec)
+        except Exception as e:
+            if event is not None:
+                event.error = type(e).__name__
+            raise
+        finally:
+            if event is not None:
+                event.duration = time.perf_counter() - start
+                self.metrics.record(event)
+
+    async def _send(self, method: str, url: str, body: bytes = None, headers: dict = None) -> requests.Response:
+        """
+        Sends a request and reads the response.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint, including the query parameters.
+        :param body: The encoded request body (may be None).
+        :param headers: Additional request headers (may be None).
+        :return: The response.
+        """
+        headers = dict(self.authentication.get_headers(), **(headers or {}))
+        async with self._get_session().request(method, url, data=body, headers=headers) as response:
+            content = await response.read()
+        return self._build_response(method, url, response, content)
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """
+        Returns the current session, creating it when needed.
+
+        :return: The aiohttp session.
+        """
+        if self.session is None:
+            # The authentication headers are sent with every request instead, since the token may change.
+            self.session = aiohttp.ClientSession(
+                headers={
+                    'User-Agent': 'MoneyBird for Python %s' % VERSION,
+                    'Accept': 'application/json',
+                },
+                connector=aiohttp.TCPConnector(limit=self.limit),
+            )
+        return self.session
+
+    @staticmethod
+    def _build_response(method: str, url: str, response: 'aiohttp.ClientResponse', content: bytes) -> requests.Response:
+        """
+        Converts an aiohttp response into a requests response, so it can be processed by the shared response handling.
+
+        :param method: The HTTP method of the request.
+        :param url: The URL of the request.
+        :param response: The aiohttp response.
+        :param content: The body of the response.
+        :return: The equivalent requests response.
+        """
+        result = requests.Response()
+        result.status_code = response.status
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.encoding = response.charset
+        result.url = str(response.url)
+        result.request = requests.Request(method, url).prepare()
+        result._content = content
+        return result
+
+    _get_url = classmethod(MoneyBird._get_url.__func__)
+    _process_response = staticmethod(MoneyBird._process_response)
@@ -1,30 +1,98 @@
 import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from urllib.parse import urljoin
 
 import requests
 
 from moneybird.authentication import Authentication
+from moneybird.cache import ConditionalCache, ResponseCache
+from moneybird.coalescing import RequestCoalescer
+from moneybird.codecs import JSONCodec, default_codec
+from moneybird.filters import query_params
+from moneybird.metrics import MetricsHook, RequestEvent
+from moneybird.resources import Administration
+from moneybird.retry import RetryPolicy
+from moneybird.streaming import MultipartStream
+from moneybird.throttling import RateLimiter
+from moneybird.transport import RequestsTransport, Transport
 
 VERSION = '0.1.3'
 
 logger = logging.getLogger('moneybird')
 
 
+class BulkResult(namedtuple('BulkResult', ['item', 'result', 'error'])):
+    """
+    Result of a single item of a bulk operation.
+
+    :param item: The item as passed to the bulk operation, or the administration id for fan-out operations.
+    :param result: The decoded JSON response for the item, or None when it failed.
+    :param error: The exception raised for the item, or None when it succeeded.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the item succeeded.
+        """
+        return self.error is None
+
+
 class MoneyBird(object):
     """
     Client for the MoneyBird API.
 
+    The client is thread-safe. With the default transport, every thread uses its own session, while the connection
+    pool is shared by all threads. Connections are kept alive and reused, so the TLS handshake only has to be performed
+    once per connection. Size the pool to the number of threads sharing the client.
+
     :param authentication: The authentication method to use.
+    :param rate_limiter: The rate limiter which paces the requests (optional, may be shared with other clients).
+    :param retry: The policy for retrying requests which failed because of a transient problem (optional).
+    :param pool_connections: The number of hosts to keep connection pools for.
+    :param pool_maxsize: The maximum number of connections to keep alive per host.
+    :param pool_block: Whether to wait for a free connection when all connections are in use, instead of opening an
+        extra connection which is discarded afterwards.
+    :param codec: The codec used to encode request bodies and decode responses, e.g.
+        :py:class:`moneybird.codecs.OrjsonCodec` (optional).
+    :param conditional_cache: The cache for conditional GET requests (optional).
+    :param response_cache: The cache serving GET responses without contacting the API (optional).
+    :param metrics: The hook receiving the measurements of every call to the API, e.g. a
+        :py:class:`moneybird.metrics.MetricsAggregator` (optional).
+    :param transport: The transport which sends the requests, defaults to a
+        :py:class:`moneybird.transport.RequestsTransport` using the pool settings above (optional).
+    :param coalescer: The coalescer sharing one call to the API between identical GET requests which are made at the
+        same time, e.g. a :py:class:`moneybird.coalescing.RequestCoalescer` (optional).
     """
     version = 'v2'
     base_url = 'https://moneybird.com/api/'
 
-    def __init__(self, authentication: Authentication):
+    #: The maximum number of records the API returns per page, larger page sizes are reduced to this.
+    max_per_page = 100
+
+    def __init__(self, authentication: Authentication, rate_limiter: RateLimiter = None, retry: RetryPolicy = None,
+                 pool_connections: int = 1, pool_maxsize: int = 10, pool_block: bool = False, codec: JSONCodec = None,
+                 conditional_cache: ConditionalCache = None, response_cache: ResponseCache = None,
+                 metrics: MetricsHook = None, transport: Transport = None, coalescer: RequestCoalescer = None):
         self.authentication = authentication
-        self.session = None
-        self.renew_session()
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.codec = codec or default_codec
+        self.conditional_cache = conditional_cache
+        self.response_cache = response_cache
+        self.metrics = metrics
+        self.transport = transport or RequestsTransport(pool_connections, pool_maxsize, pool_block)
+        self.coalescer = coalescer
+        self.headers = {
+            'User-Agent': 'MoneyBird for Python %s' % VERSION,
+            'Accept': 'application/json',
+        }
 
-    def get(self, resource_path: str, administration_id: int = None):
+    def get(self, resource_path: str, administration_id: int = None, params: dict = None):
         """
         Performs a GET request to the endpoint identified by the resource path.
 
@@ -38,12 +106,42 @@ class MoneyBird(object):
 
         :param resource_path: The resource path.
         :param administration_id: The administration id (optional, depending on the resource path).
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (optional).
         :return: The decoded JSON response for the request.
         """
-        response = self.session.get(
-            url=self._get_url(administration_id, resource_path),
+        return self._request('GET', resource_path, administration_id, params=params)
+
+    def iter(self, resource_path: str, administration_id: int = None, per_page: int = 100, params: dict = None,
+             prefetch: bool = False):
+        """
+        Lazily iterates over all records of a paginated list endpoint. Pages are requested one at a time when the
+        records of the previous page have been consumed, so at most one page is held in memory.
+
+        With prefetching enabled, the next page is requested in a background thread while the records of the current
+        page are consumed. At most two pages are held in memory in that case.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> for invoice in moneybird.iter('sales_invoices', 123, prefetch=True):
+            ...     print(invoice['invoice_id'])
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param per_page: The number of records to request per page (the API allows at most 100, larger values are
+            reduced to 100).
+        :param params: Additional query parameters to send with every page request, or a
+            :py:class:`moneybird.filters.Filter` (optional).
+        :param prefetch: Whether to request the next page in the background.
+        :return: A generator yielding the records one by one.
+        """
+        per_page = min(per_page, self.max_per_page)
+        params = dict(query_params(params) or {}, per_page=per_page)
+        return self._paginate(
+            lambda page: self.get(resource_path, administration_id, params=dict(params, page=page)),
+            per_page,
+            prefetch,
         )
-        return self._process_response(response)
 
     def post(self, resource_path: str, data: dict, administration_id: int = None):
         """
@@ -62,11 +160,7 @@ class MoneyBird(object):
         :param administration_id: The administration id (optional, depending on the resource path).
         :return: The decoded JSON response for the request.
         """
-        response = self.session.post(
-            url=self._get_url(administration_id, resource_path),
-            json=data,
-        )
-        return self._process_response(response)
+        return self._request('POST', resource_path, administration_id, data=data)
 
     def patch(self, resource_path: str, data: dict, administration_id: int = None):
         """
@@ -80,13 +174,9 @@ class MoneyBird(object):
         :param administration_id: The administration id (optional, depending on the resource path).
         :return: The decoded JSON response for the request.
         """
-        response = self.session.patch(
-            url=self._get_url(administration_id, resource_path),
-            json=data,
-        )
-        return self._process_response(response)
+        return self._request('PATCH', resource_path, administration_id, data=data)
 
-    def delete(self, resource_path: str, administration_id: int = None):
+    def delete(self, resource_path: str, administration_id: int = None, params: dict = None):
         """
         Performs a DELETE request to the endpoint identified by the resource path. DELETE requests are usually used to
         (permanently) delete existing data. USE THIS METHOD WITH CAUTION.
@@ -95,26 +185,611 @@ class MoneyBird(object):
 
         :param resource_path: The resource path.
         :param administration_id: The administration id (optional, depending on the resource path).
+        :param params: The query parameters to send (optional).
         :return: The decoded JSON response for the request.
         """
-        response = self.session.delete(
-            url=self._get_url(administration_id, resource_path),
-        )
-        return self._process_response(response)
+        return self._request('DELETE', resource_path, administration_id, params=params)
+
+    def iter_download(self, resource_path: str, administration_id: int = None, chunk_size: int = 65536):
+        """
+        Downloads a binary file, like an invoice PDF, yielding its contents in chunks. The file is never loaded into
+        memory as a whole.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> for chunk in moneybird.iter_download('sales_invoices/143274315994891267/download_pdf', 123):
+            ...     archive.write(chunk)
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param chunk_size: The maximum number of bytes per chunk.
+        :return: A generator yielding the contents of the file.
+        """
+        url = self._get_url(administration_id, resource_path)
+
+        with self._measure('GET', url) as event:
+            response = self._send('GET', url, headers={'Accept': '*/*'}, stream=True, event=event)
+            with response:
+                if response.status_code != 200:
+                    self._process_response(response, codec=self.codec)
+                for chunk in response.iter_content(chunk_size):
+                    if event is not None:
+                        event.bytes_received += len(chunk)
+                    yield chunk
+
+    def download(self, resource_path: str, destination, administration_id: int = None, chunk_size: int = 65536) -> int:
+        """
+        Downloads a binary file, like an invoice PDF, to a file. The file is written in chunks and is never loaded into
+        memory as a whole.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> moneybird.download('sales_invoices/143274315994891267/download_pdf', 'invoice.pdf', 123)
+            24587
+
+        :param resource_path: The resource path.
+        :param destination: The path of the file to write to, or a file object opened in binary mode.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param chunk_size: The maximum number of bytes to write at once.
+        :return: The number of bytes written.
+        """
+        chunks = self.iter_download(resource_path, administration_id, chunk_size)
+
+        if not hasattr(destination, 'write'):
+            with open(destination, 'wb') as fileobj:
+                return self._write_chunks(chunks, fileobj)
+        return self._write_chunks(chunks, destination)
+
+    def upload(self, resource_path: str, fileobj, administration_id: int = None, field: str = 'file',
+               filename: str = None, content_type: str = None, chunk_size: int = 65536):
+        """
+        Uploads a file, like a receipt attachment, using a streaming multipart POST request. The file is read in chunks
+        and is never loaded into memory as a whole.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> with open('receipt.pdf', 'rb') as receipt:
+            ...     moneybird.upload('documents/receipts/143274315994891267/attachments', receipt, 123)
+
+        :param resource_path: The resource path.
+        :param fileobj: The file object to upload, opened in binary mode.
+        :param administration_id: The administration id (optional, depending on the resource path).
+        :param field: The name of the form field.
+        :param filename: The file name to send, defaults to the name of the file object.
+        :param content_type: The content type of the file, guessed from the file name when omitted.
+        :param chunk_size: The number of bytes to read at once.
+        :return: The decoded JSON response for the request.
+        """
+        url = self._get_url(administration_id, resource_path)
+        stream = MultipartStream(field, fileobj, filename, content_type, chunk_size)
+
+        with self._measure('POST', url) as event:
+            try:
+                response = self._send('POST', url, stream.body, {'Content-Type': stream.content_type}, event=event)
+            finally:
+                if self.response_cache is not None:
+                    self.response_cache.invalidate(url)
+
+            return self._process_response(response, codec=self.codec)
+
+    def administration(self, administration_id: int) -> Administration:
+        """
+        Returns an object representing an administration, through which its resources can be accessed.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> moneybird.administration(123).contacts.get('143273868766741508')
+            {'id': '143273868766741508', 'company_name': 'Parkietje B.V.', ...
+
+        :param administration_id: The administration id.
+        :return: The administration.
+        """
+        return Administration(self, administration_id)
+
+    def bulk_get(self, resource_paths, administration_id: int = None, workers: int = 4) -> list:
+        """
+        Performs GET requests for multiple resource paths concurrently.
+
+        :param resource_paths: An iterable of resource paths.
+        :param administration_id: The administration id (optional, depending on the resource paths).
+        :param workers: The maximum number of concurrent requests.
+        :return: A list of results, in the order of the resource paths.
+        """
+        return self._bulk(lambda path: self.get(path, administration_id), resource_paths, workers)
+
+    def bulk_post(self, items, administration_id: int = None, workers: int = 4) -> list:
+        """
+        Performs POST requests for multiple items concurrently. A failing item does not affect the other items.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> results = moneybird.bulk_post([('contacts', {'contact': contact}) for contact in contacts], 123)
+            >>> [result.result['id'] for result in results if result.ok]
+            ['143273868766741508', ...
+
+        :param items: An iterable of 2-tuples containing a resource path and the data to send.
+        :param administration_id: The administration id (optional, depending on the resource paths).
+        :param workers: The maximum number of concurrent requests.
+        :return: A list of results, in the order of the items.
+        """
+        return self._bulk(lambda item: self.post(item[0], item[1], administration_id), items, workers)
+
+    def bulk_patch(self, items, administration_id: int = None, workers: int = 4) -> list:
+        """
+        Performs PATCH requests for multiple items concurrently. A failing item does not affect the other items.
+
+        :param items: An iterable of 2-tuples containing a resource path and the data to send.
+        :param administration_id: The administration id (optional, depending on the resource paths).
+        :param workers: The maximum number of concurrent requests.
+        :return: A list of results, in the order of the items.
+        """
+        return self._bulk(lambda item: self.patch(item[0], item[1], administration_id), items, workers)
+
+    def bulk_delete(self, resource_paths, administration_id: int = None, workers: int = 4) -> list:
+        """
+        Performs DELETE requests for multiple resource paths concurrently. USE THIS METHOD WITH CAUTION.
+
+        :param resource_paths: An iterable of resource paths.
+        :param administration_id: The administration id (optional, depending on the resource paths).
+        :param workers: The maximum number of concurrent requests.
+        :return: A list of results, in the order of the resource paths.
+        """
+        return self._bulk(lambda path: self.delete(path, administration_id), resource_paths, workers)
+
+    def fan_out(self, resource_path: str, administration_ids=None, params: dict = None, workers: int = 4,
+                paginate: bool = False) -> list:
+        """
+        Performs the same GET request for multiple administrations concurrently. A failing administration does not
+        affect the other administrations.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> from moneybird.filters import Filter
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> results = moneybird.fan_out('sales_invoices', params=Filter(state='open'), paginate=True)
+            >>> {result.item: len(result.result) for result in results if result.ok}
+            {123: 12, 456: 3, ...
+
+        :param resource_path: The resource path.
+        :param administration_ids: An iterable of administration ids, defaults to all administrations which can be
+            accessed.
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (optional).
+        :param workers: The maximum number of concurrent requests.
+        :param paginate: Whether to request all pages of a paginated list endpoint, see :py:func:`iter`.
+        :return: A list of results with the administration id as item, in the order of the administration ids.
+        """
+        return self._bulk(self._fan_out_function(resource_path, params, paginate),
+                          self._administration_ids(administration_ids), workers)
+
+    def iter_fan_out(self, resource_path: str, administration_ids=None, params: dict = None, workers: int = 4,
+                     paginate: bool = False):
+        """
+        Performs the same GET request for multiple administrations concurrently, like :py:func:`fan_out`, but yields
+        the results as soon as they are available, in the order in which they complete.
+
+        Example:
+            >>> from moneybird import MoneyBird, TokenAuthentication
+            >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+            >>> for result in moneybird.iter_fan_out('contacts', [123, 456], paginate=True):
+            ...     print(result.item, result.error or len(result.result))
+
+        :param resource_path: The resource path.
+        :param administration_ids: An iterable of administration ids, defaults to all administrations which can be
+            accessed.
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (optional).
+        :param workers: The maximum number of concurrent requests.
+        :param paginate: Whether to request all pages of a paginated list endpoint, see :py:func:`iter`.
+        :return: A generator yielding results with the administration id as item.
+        """
+        return self._bulk_completed(self._fan_out_function(resource_path, params, paginate),
+                                    self._administration_ids(administration_ids), workers)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The session of the current thread, when the requests transport is used.
+        """
+        return self.transport.session
 
     def renew_session(self):
         """
         Clears all session data and starts a new session using the same settings as before.
 
         This method can be used to clear session data, e.g., cookies. Future requests will use a new session initiated
-        with the same settings and authentication method.
+        with the same settings and authentication method. Open connections are kept and will be reused.
         """
         logger.debug("API session renewed")
-        self.session = self.authentication.get_session()
-        self.session.headers.update({
-            'User-Agent': 'MoneyBird for Python %s' % VERSION,
-            'Accept': 'application/json',
-        })
+        self.transport.renew()
+
+    def close(self):
+        """
+        Closes all pooled connections. The client can still be used afterwards, new connections will be opened.
+        """
+        self.transport.close()
+
+    def _request(self, method: str, resource_path: str, administration_id: int = None, data: dict = None,
+                 params: dict = None):
+        """
+        Performs a request to the endpoint identified by the resource path and processes the response.
+
+        :param method: The HTTP method.
+        :param resource_path: The resource path.
+        :param administration_id: The administration id (may be None).
+        :param data: The data to send to the server (may be None).
+        :param params: The query parameters to send (may be None).
+        :return: The decoded JSON response for the request.
+        """
+        return self._perform(method, self._get_url(administration_id, resource_path), data, params)
+
+    def _perform(self, method: str, url: str, data: dict = None, params: dict = None):
+        """
+        Performs a request to the given URL and processes the response.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint.
+        :param data: The data to send to the server (may be None).
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (may be None).
+        :return: The decoded JSON response for the request.
+        """
+        params = query_params(params)
+        if self.metrics is None:
+            return self._execute(method, url, data, params)
+
+        with self._measure(method, url) as event:
+            return self._execute(method, url, data, params, event)
+
+    def _execute(self, method: str, url: str, data: dict = None, params: dict = None, event: RequestEvent = None):
+        """
+        Performs a request to the given URL using the caches, and processes the response.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint.
+        :param data: The data to send to the server (may be None).
+        :param params: The query parameters to send (may be None).
+        :param event: The measurements to complete (may be None).
+        :return: The decoded JSON response for the request.
+        """
+        headers = body = response_key = generation = None
+        if data is not None:
+            headers = {'Content-Type': self.codec.content_type}
+            body = self.codec.encode(data)
+
+        if method == 'GET' and self.response_cache is not None:
+            response_key = self.response_cache.key(url, params, self.authentication.get_headers())
+            entry = self.response_cache.get(response_key)
+            if entry is not None:
+                logger.debug("API response served from cache: %s" % url)
+                if event is not None:
+                    event.cached = True
+                    event.status_code = 200
+                    event.bytes_received = len(entry.content)
+                return self.codec.decode(entry.content)
+            generation = self.response_cache.generation
+
+        if method == 'GET' and self.coalescer is not None:
+            coalescer_key = self.coalescer.key(url, params, self.authentication.get_headers())
+            response, shared = self.coalescer.call(
+                coalescer_key,
+                lambda: self._fetch(method, url, body, headers, params, event, response_key, generation),
+            )
+            if shared:
+                logger.debug("API response shared with an identical request: %s" % url)
+                if event is not None:
+                    event.coalesced = True
+                    event.status_code = response.status_code
+                    event.bytes_received = len(response.content)
+        else:
+            response = self._fetch(method, url, body, headers, params, event, response_key, generation)
+
+        if event is None:
+            return self._process_response(response, codec=self.codec)
+
+        start = time.perf_counter()
+        try:
+            return self._process_response(response, codec=self.codec)
+        finally:
+            event.decode_time = time.perf_counter() - start
+
+    def _fetch(self, method: str, url: str, body: bytes = None, headers: dict = None, params: dict = None,
+               event: RequestEvent = None, response_key: str = None, generation: int = None) -> requests.Response:
+        """
+        Sends a request using the conditional cache, and stores the response in the response cache.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint.
+        :param body: The encoded request body (may be None).
+        :param headers: Additional request headers (may be None).
+        :param params: The query parameters to send (may be None).
+        :param event: The measurements to complete (may be None).
+        :param response_key: The key to store the response under in the response cache (may be None).
+        :param generation: The generation of the response cache at the time of the request (may be None).
+        :return: The response.
+        """
+        cache_key = entry = None
+        if method == 'GET' and self.conditional_cache is not None:
+            cache_key = self.conditional_cache.key(url, params, self.authentication.get_headers())
+            entry = self.conditional_cache.get(cache_key)
+            headers = self.conditional_cache.validators(entry)
+
+        try:
+            response = self._send(method, url, body, headers, params, event=event)
+        finally:
+            if self.response_cache is not None and self.response_cache.changes(method, url):
+                self.response_cache.invalidate(url)
+
+        if cache_key is not None:
+            response = self.conditional_cache.process(cache_key, response, entry)
+        if response_key is not None:
+            self.response_cache.store(response_key, response, generation)
+        return response
+
+    def _send(self, method: str, url: str, body: bytes = None, headers: dict = None, params: dict = None,
+              stream: bool = False, event: RequestEvent = None) -> requests.Response:
+        """
+        Sends a request, respecting the rate limiter and retry policy. Requests with a body which can only be read once,
+        like a generator, are not retried.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint.
+        :param body: The encoded request body (may be None).
+        :param headers: Additional request headers (may be None).
+        :param params: The query parameters to send (may be None).
+        :param stream: Whether to defer reading the response body.
+        :param event: The measurements to complete (may be None).
+        :return: The response.
+        """
+        attempt = 1
+        replayable = self._replayable(body)
+
+        while True:
+            response = error = None
+
+            # The authentication headers are determined per attempt, since they may change in the meantime.
+            request_headers = dict(self.headers)
+            request_headers.update(self.authentication.get_headers())
+            if headers:
+                request_headers.update(headers)
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            start = time.perf_counter()
+            try:
+                response = self.transport.request(method, url, body, request_headers, params, stream)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.update(response)
+
+            if event is not None:
+                self._measure_attempt(event, attempt, start, body, response, stream)
+
+            if self.retry is None or not self.retry.should_retry(method, attempt, response, error):
+                break
+            if not replayable:
+                logger.warning("API request %s %s failed, but is not retried since its body cannot be sent again" % (
+                    method, url,
+                ))
+                break
+
+            if response is not None:
+                response.close()
+            self.retry.wait(method, url, attempt, response, error)
+            attempt += 1
+
+        if error is not None:
+            raise error
+
+        return response
+
+    def _bulk(self, function, items, workers: int, errors: tuple = ()) -> list:
+        """
+        Calls a function for every item concurrently, collecting the results and errors per item.
+
+        When a rate limiter is used, the requests are performed with bulk priority, so other requests go first.
+
+        :param function: The function performing the request for an item.
+        :param items: The items.
+        :param workers: The maximum number of concurrent calls.
+        :param errors: Additional exception types to collect per item, besides the errors of the request.
+        :return: A list of results, in the order of the items.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda item: self._bulk_call(function, item, errors), items))
+
+    def _bulk_completed(self, function, items, workers: int):
+        """
+        Calls a function for every item concurrently, like :py:func:`_bulk`, yielding the results as they complete.
+
+        Calls which have not been started yet are cancelled when the generator is closed early.
+
+        :param function: The function performing the request for an item.
+        :param items: The items.
+        :param workers: The maximum number of concurrent calls.
+        :return: A generator yielding the results, in the order in which they complete.
+        """
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = [executor.submit(self._bulk_call, function, item) for item in items]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _bulk_call(self, function, item, errors: tuple = ()) -> BulkResult:
+        """
+        Calls a function for an item of a bulk operation, catching the errors of the request.
+
+        :param function: The function performing the request for the item.
+        :param item: The item.
+        :param errors: Additional exception types to catch, besides the errors of the request.
+        :return: The result for the item.
+        """
+        try:
+            if self.rate_limiter is not None:
+                with self.rate_limiter.prioritized(RateLimiter.BULK):
+                    return BulkResult(item, function(item), None)
+            return BulkResult(item, function(item), None)
+        except (MoneyBird.APIError, requests.RequestException) + tuple(errors) as e:
+            return BulkResult(item, None, e)
+
+    def _fan_out_function(self, resource_path: str, params: dict, paginate: bool):
+        """
+        Builds the function performing the request of a fan-out for an administration.
+
+        :param resource_path: The resource path.
+        :param params: The query parameters to send (may be None).
+        :param paginate: Whether to request all pages.
+        :return: The function, taking an administration id.
+        """
+        if paginate:
+            return lambda administration_id: list(self.iter(resource_path, administration_id, params=params))
+        return lambda administration_id: self.get(resource_path, administration_id, params=params)
+
+    def _administration_ids(self, administration_ids) -> list:
+        """
+        Returns the given administration ids, or the ids of all administrations which can be accessed.
+
+        :param administration_ids: An iterable of administration ids (may be None).
+        :return: The administration ids.
+        """
+        if administration_ids is None:
+            return [administration['id'] for administration in self.get('administrations')]
+        return list(administration_ids)
+
+    @contextmanager
+    def _measure(self, method: str, url: str):
+        """
+        Context manager measuring a call to the API. The measurements are passed to the metrics hook when the call is
+        finished.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL to the endpoint.
+        :return: The measurements to complete, or None when no metrics hook is used.
+        """
+        if self.metrics is None:
+            yield None
+            return
+
+        event = RequestEvent(method, url)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event.error = type(e).__name__
+            raise
+        finally:
+            event.duration = time.perf_counter() - start
+            self.metrics.record(event)
+
+    @staticmethod
+    def _replayable(body) -> bool:
+        """
+        Checks whether a request body can be sent again: bytes and iterables like a
+        :py:class:`moneybird.streaming.MultipartStream` can, iterators like generators and files cannot.
+
+        :param body: The request body (may be None).
+        :return: Whether the body can be sent again.
+        """
+        if body is None or isinstance(body, (bytes, str)):
+            return True
+        try:
+            return iter(body) is not body
+        except TypeError:
+            return True
+
+    @staticmethod
+    def _measure_attempt(event: RequestEvent, attempt: int, start: float, body, response: requests.Response,
+                         stream: bool):
+        """
+        Adds the measurements of an attempt to perform a request.
+
+        :param event: The measurements to complete.
+        :param attempt: The number of the attempt, starting at 1.
+        :param start: The time at which the attempt was started.
+        :param body: The request body (may be None).
+        :param response: The response (may be None).
+        :param stream: Whether the response body is streamed.
+        """
+        event.attempts = attempt
+        try:
+            event.bytes_sent = len(body) if body is not None else 0
+        except TypeError:
+            event.bytes_sent = 0
+
+        if response is not None:
+            event.status_code = response.status_code
+            event.wait_time = response.elapsed.total_seconds()
+            if not stream:
+                event.transfer_time = max(time.perf_counter() - start - event.wait_time, 0.0)
+                event.bytes_received = len(response.content)
+            if response.status_code in (403, 429):
+                event.throttled += 1
+
+    @staticmethod
+    def _write_chunks(chunks, fileobj) -> int:
+        """
+        Writes chunks of data to a file.
+
+        :param chunks: An iterable of chunks.
+        :param fileobj: The file object to write to.
+        :return: The number of bytes written.
+        """
+        size = 0
+        for chunk in chunks:
+            fileobj.write(chunk)
+            size += len(chunk)
+        return size
+
+    @staticmethod
+    def _paginate(fetch, per_page: int, prefetch: bool):
+        """
+        Iterates over the records of all pages, requesting the pages one at a time.
+
+        :param fetch: A function which requests a page by number.
+        :param per_page: The number of records per page, a shorter page is the last page.
+        :param prefetch: Whether to request the next page in the background.
+        :return: A generator yielding the records one by one.
+        """
+        if not prefetch:
+            page = 1
+            while True:
+                records = fetch(page) or []
+                yield from records
+                if MoneyBird._last_page(records, per_page):
+                    return
+                page += 1
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = 1
+            future = executor.submit(fetch, page)
+            while future is not None:
+                records = future.result() or []
+                if MoneyBird._last_page(records, per_page):
+                    future = None
+                else:
+                    page += 1
+                    future = executor.submit(fetch, page)
+                yield from records
+
+    @staticmethod
+    def _last_page(records: list, per_page: int) -> bool:
+        """
+        Checks whether a page is the last page: an empty page, or a page which is shorter than the page size.
+
+        :param records: The records of the page, None is treated as an empty page.
+        :param per_page: The number of records per page.
+        :return: Whether no more pages should be requested.
+        """
+        if not isinstance(records, list):
+            raise ValueError("Expected a list of records, got %s" % type(records).__name__)
+        return len(records) < min(per_page, MoneyBird.max_per_page) or not records
 
     @classmethod
     def _get_url(cls, administration_id: int, resource_path: str):
@@ -135,7 +810,7 @@ class MoneyBird(object):
         return url
 
     @staticmethod
-    def _process_response(response: requests.Response, expected: list = []) -> dict:
+    def _process_response(response: requests.Response, expected: list = [], codec: JSONCodec = None) -> dict:
         """
         Processes an API response. Raises an exception when appropriate.
 
@@ -151,6 +826,7 @@ class MoneyBird(object):
 
         :param response: The response to process.
         :param expected: A list of expected status codes which won't raise an exception.
+        :param codec: The codec to decode the response with (optional).
         :return: The useful data in the response (may be None).
         """
         responses = {
@@ -167,8 +843,16 @@ class MoneyBird(object):
             500: MoneyBird.ServerError,
         }
 
-        logger.debug("API request: %s %s\n" % (response.request.method, response.request.url) +
-                     "Response: %s %s" % (response.status_code, response.text))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("API request: %s %s\n" % (response.request.method, response.request.url) +
+                         "Response: %s %s" % (response.status_code, response.text))
+
+        try:
+            data = (codec or default_codec).decode(response.content) if response.content else None
+            decoded = True
+        except ValueError:
+            data = None
+            decoded = False
 
         if response.status_code not in expected:
             if response.status_code not in responses:
@@ -176,16 +860,13 @@ class MoneyBird(object):
                 raise MoneyBird.APIError(response, "API response contained unknown status code")
             elif responses[response.status_code] is not None:
                 try:
-                    description = response.json()['error']
-                except (AttributeError, TypeError, KeyError, ValueError):
+                    description = data['error']
+                except (TypeError, KeyError):
                     description = None
                 raise responses[response.status_code](response, description)
 
-        try:
-            data = response.json()
-        except ValueError:
+        if not decoded:
             logger.error("API response is not JSON decodable")
-            data = None
 
         return data
 
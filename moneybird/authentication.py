@@ -1,5 +1,8 @@
 import logging
+import time
 import uuid
+import warnings
+from collections import namedtuple
 from urllib.parse import urljoin, urlencode, parse_qs
 
 import requests
@@ -7,6 +10,29 @@ import requests
 logger = logging.getLogger('moneybird')
 
 
+class Token(namedtuple('Token', ['access_token', 'refresh_token', 'expires_at'])):
+    """
+    An OAuth access token.
+
+    :param access_token: The access token.
+    :param refresh_token: The refresh token, which can be exchanged for a new access token (may be None).
+    :param expires_at: The time at which the access token expires, as a UNIX timestamp (None if it does not expire).
+    """
+    __slots__ = ()
+
+    def expires_within(self, seconds: float, now: float = None) -> bool:
+        """
+        Checks whether the access token expires within the given time.
+
+        :param seconds: The time in seconds.
+        :param now: The current time as a UNIX timestamp, defaults to the current time.
+        :return: Whether the access token expires within the given time.
+        """
+        if self.expires_at is None:
+            return False
+        return (time.time() if now is None else now) + seconds >= self.expires_at
+
+
 class Authentication(object):
     """
     Base class for authentication implementations.
@@ -20,6 +46,28 @@ class Authentication(object):
         """
         raise NotImplementedError()
 
+    def get_headers(self) -> dict:
+        """
+        Returns the HTTP headers which authenticate a request.
+
+        Implementations which only override :py:func:`get_session` keep working: the ``Authorization`` header of their
+        session is used. This fallback is deprecated, implementations should override this method.
+
+        :return: A dictionary of headers.
+        """
+        warnings.warn(
+            "%s does not implement get_headers(), the Authorization header of get_session() is used instead. This is "
+            "deprecated, implement get_headers() instead." % type(self).__name__,
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        session = self.get_session()
+        try:
+            authorization = session.headers.get('Authorization')
+        finally:
+            session.close()
+        return {'Authorization': authorization} if authorization else {}
+
     def get_session(self) -> requests.Session:
         """
         Creates a new session with the authentication settings applied.
@@ -49,11 +97,14 @@ class TokenAuthentication(Authentication):
     def is_ready(self) -> bool:
         return bool(self.auth_token)
 
+    def get_headers(self) -> dict:
+        return {
+            'Authorization': 'Bearer %s' % self.auth_token,
+        }
+
     def get_session(self) -> requests.Session:
         session = requests.Session()
-        session.headers.update({
-            'Authorization': 'Bearer %s' % self.auth_token,
-        })
+        session.headers.update(self.get_headers())
         return session
 
 
@@ -69,17 +120,22 @@ class OAuthAuthentication(Authentication):
     :param client_id: The OAuth client id obtained from MoneyBird.
     :param client_secret: The OAuth client secret obtained from MoneyBird.
     :param auth_token: The optional token from an earlier authorization.
+    :param refresh_token: The optional refresh token from an earlier authorization.
     """
     base_url = 'https://moneybird.com/oauth/'
     auth_url = 'authorize/'
     token_url = 'token/'
+    #: The connect and read timeout in seconds for token requests, which may run while other workers wait for them.
+    timeout = 10
 
-    def __init__(self, redirect_url: str, client_id: str, client_secret: str, auth_token: str = ''):
+    def __init__(self, redirect_url: str, client_id: str, client_secret: str, auth_token: str = '',
+                 refresh_token: str = None):
         self.redirect_url = redirect_url
         self.client_id = client_id
         self.client_secret = client_secret
 
         self.real_auth = TokenAuthentication(auth_token)
+        self.token = Token(auth_token, refresh_token, None) if auth_token or refresh_token else None
 
     def authorize_url(self, scope: list, state: str = None) -> tuple:
         """
@@ -138,16 +194,71 @@ class OAuthAuthentication(Authentication):
             logger.warning("OAuth CSRF attack detected: the state in the provided URL does not equal the given state")
             raise ValueError("CSRF attack detected: the state in the provided URL does not equal the given state")
 
+        token = self._request_token({
+            'grant_type': 'authorization_code',
+            'code': url_data['code'][0],
+            'redirect_uri': self.redirect_url,
+        })
+        logger.debug("Obtained authentication token for state %s: %s" % (state, token.access_token))
+
+        return token.access_token
+
+    def refresh(self, refresh_token: str = None) -> Token:
+        """
+        Exchanges a refresh token for a new access token. The new token is used for future requests.
+
+        Example:
+            >>> auth = OAuthAuthentication('https://example.com/oauth/moneybird/', 'your_id', 'your_secret')
+            >>> auth.refresh('refresh_token')
+            Token(access_token='new_token', refresh_token='new_refresh_token', expires_at=1450860230)
+
+        :param refresh_token: The refresh token, defaults to the refresh token of the current token.
+        :return: The new token.
+        """
+        if refresh_token is None:
+            refresh_token = self.token.refresh_token if self.token is not None else None
+        if not refresh_token:
+            raise ValueError("No refresh token is available")
+
+        token = self._request_token({
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+        })
+        logger.debug("Refreshed authentication token")
+
+        return token
+
+    def set_token(self, token: Token):
+        """
+        Sets the token to use, e.g. a token from an earlier authorization.
+
+        :param token: The token.
+        """
+        self.token = token
+        self.real_auth.set_token(token.access_token)
+
+    def is_ready(self) -> bool:
+        return self.real_auth.is_ready()
+
+    def get_headers(self) -> dict:
+        return self.real_auth.get_headers()
+
+    def get_session(self) -> requests.Session:
+        return self.real_auth.get_session()
+
+    def _request_token(self, data: dict) -> Token:
+        """
+        Requests a token from the OAuth server and starts using it.
+
+        :param data: The grant parameters.
+        :return: The token.
+        """
+        requested_at = time.time()
         try:
             response = requests.post(
                 url=urljoin(self.base_url, self.token_url),
-                data={
-                    'grant_type': 'authorization_code',
-                    'code': url_data['code'][0],
-                    'redirect_uri': self.redirect_url,
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret,
-                },
+                data=dict(data, client_id=self.client_id, client_secret=self.client_secret),
+                timeout=self.timeout,
             ).json()
         except ValueError:
             logger.error("The OAuth server returned an invalid response when obtaining a token: JSON error")
@@ -161,16 +272,13 @@ class OAuthAuthentication(Authentication):
             logger.error("The OAuth server returned an invalid response when obtaining a token: no access token")
             raise ValueError("The remote server returned an invalid response when obtaining a token: no access token")
 
-        self.real_auth.set_token(response['access_token'])
-        logger.debug("Obtained authentication token for state %s: %s" % (state, self.real_auth.auth_token))
+        expires_at = None
+        if response.get('expires_in') is not None:
+            expires_at = float(response.get('created_at') or requested_at) + float(response['expires_in'])
 
-        return response['access_token']
-
-    def is_ready(self) -> bool:
-        return self.real_auth.is_ready()
-
-    def get_session(self) -> requests.Session:
-        return self.real_auth.get_session()
+        token = Token(response['access_token'], response.get('refresh_token'), expires_at)
+        self.set_token(token)
+        return token
 
     @staticmethod
     def _generate_state() -> str:
@@ -0,0 +1,405 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+
+from moneybird.api import MoneyBird, VERSION
+from moneybird.aio import AsyncMoneyBird, aiohttp
+from moneybird.codecs import default_codec
+from moneybird.metrics import CallbackHook
+from moneybird.models import Contact
+from moneybird.retry import RetryPolicy
+from moneybird.synchronization import Synchronizer
+from moneybird.testing import FakeMoneyBird, fake_client
+from moneybird.transport import HttpxTransport, RequestsTransport, Urllib3Transport, httpx_installed
+
+#: Metrics of which a higher value is better, all others are better when lower.
+higher_is_better = frozenset(['throughput'])
+
+#: The metrics compared by :py:func:`compare`.
+compared_metrics = ('throughput', 'p50', 'p90', 'p99', 'cpu_per_request', 'bytes_per_record')
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Calculates a percentile using the nearest-rank method.
+
+    :param values: The values.
+    :param percent: The percentile, between 0 and 100.
+    :return: The percentile, or None when there are no values.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(int(round(len(values) * percent / 100.0)) - 1, 0)]
+
+
+def summarize(requests: int, duration: float, cpu: float, latencies: list, **extra) -> dict:
+    """
+    Builds the result of a benchmark scenario.
+
+    :param requests: The number of requests made.
+    :param duration: The wall clock time of the scenario, in seconds.
+    :param cpu: The CPU time used by the client, in seconds.
+    :param latencies: The durations of the individual calls, in seconds.
+    :param extra: Additional results.
+    :return: The result.
+    """
+    result = {
+        'requests': requests,
+        'duration': duration,
+        'throughput': requests / duration if duration else None,
+        'cpu_per_request': cpu / requests if requests else None,
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99),
+    }
+    result.update(extra)
+    return result
+
+
+class Benchmark(object):
+    """
+    Benchmark of the client against a :py:class:`moneybird.testing.FakeMoneyBird` server.
+
+    The server runs in a separate process, so the measured CPU time is that of the client only. Every scenario is run
+    ``repeat`` times and the fastest run is reported, which reduces the influence of other activity on the machine.
+    The results only depend on the client, the machine and the scenario parameters, so results of different versions
+    of this package can be compared with :py:func:`compare`.
+
+    Example:
+        >>> from moneybird.benchmark import Benchmark
+        >>> results = Benchmark(requests=200).run(['get', 'iter'])
+        >>> results['scenarios']['get']['p50']
+        0.00071
+
+    :param requests: The number of requests per scenario.
+    :param records: The number of records of each resource on the server.
+    :param workers: The number of threads or tasks for the concurrent scenarios.
+    :param repeat: The number of runs per scenario.
+    :param transport: The transport used by the synchronous client: ``requests``, ``urllib3`` or ``httpx``.
+    """
+    scenarios = ('get', 'iter', 'bulk', 'async', 'sync', 'errors', 'throttled', 'memory')
+
+    transports = {
+        'requests': lambda workers: RequestsTransport(pool_maxsize=workers),
+        'urllib3': lambda workers: Urllib3Transport(maxsize=workers),
+        'httpx': lambda workers: HttpxTransport(http2=False, max_connections=workers),
+    }
+
+    def __init__(self, requests: int = 1000, records: int = 1000, workers: int = 8, repeat: int = 3,
+                 transport: str = 'requests'):
+        self.requests = requests
+        self.records = records
+        self.workers = workers
+        self.repeat = repeat
+        self.transport = transport
+
+    def run(self, scenarios: list = None) -> dict:
+        """
+        Runs the benchmark.
+
+        :param scenarios: The names of the scenarios to run, defaults to all scenarios.
+        :return: The results of the scenarios and a description of the environment.
+        """
+        results = {}
+        for name in scenarios or self.scenarios:
+            runs = [result for result in (getattr(self, 'bench_%s' % name)() for _ in range(self.repeat)) if result]
+            if runs:
+                results[name] = min(runs, key=lambda result: result.get('duration') or 0)
+        return {
+            'version': VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'codec': type(default_codec).__name__,
+            'transport': self.transport,
+            'parameters': {'requests': self.requests, 'records': self.records, 'workers': self.workers},
+            'scenarios': results,
+        }
+
+    def _client(self, base_url: str, **kwargs) -> MoneyBird:
+        """
+        Creates a synchronous client for a fake server, using the configured transport.
+
+        :param base_url: The base URL of the server.
+        :param kwargs: Additional arguments for the client.
+        :return: The client.
+        """
+        return fake_client(base_url, transport=self.transports[self.transport](self.workers), **kwargs)
+
+    def bench_get(self) -> dict:
+        """
+        Sequential requests for single records.
+        """
+        with _Server(contacts=self.records) as server:
+            moneybird = self._client(server.base_url)
+            ids = server.ids('contacts')
+            paths = ['contacts/%s' % ids[i % len(ids)] for i in range(self.requests)]
+            moneybird.get('administrations')
+
+            latencies = []
+            start, cpu = time.perf_counter(), time.process_time()
+            for path in paths:
+                call = time.perf_counter()
+                moneybird.get(path, FakeMoneyBird.administration_id)
+                latencies.append(time.perf_counter() - call)
+            return summarize(len(paths), time.perf_counter() - start, time.process_time() - cpu, latencies)
+
+    def bench_iter(self) -> dict:
+        """
+        Iterating over all records of a resource, page by page.
+        """
+        with _Server(contacts=self.records) as server:
+            latencies = []
+            moneybird = self._client(server.base_url, metrics=CallbackHook(lambda event: latencies.append(
+                event.duration)))
+
+            start, cpu = time.perf_counter(), time.process_time()
+            count = sum(1 for _ in moneybird.iter('contacts', FakeMoneyBird.administration_id))
+            duration = time.perf_counter() - start
+            return summarize(len(latencies), duration, time.process_time() - cpu, latencies, records=count,
+                             records_per_second=count / duration)
+
+    def bench_bulk(self) -> dict:
+        """
+        Concurrent requests for single records using a thread pool.
+        """
+        with _Server(contacts=self.records) as server:
+            latencies = []
+            moneybird = self._client(server.base_url, metrics=CallbackHook(
+                lambda event: latencies.append(event.duration)))
+            ids = server.ids('contacts')
+            paths = ['contacts/%s' % ids[i % len(ids)] for i in range(self.requests)]
+
+            start, cpu = time.perf_counter(), time.process_time()
+            results = moneybird.bulk_get(paths, FakeMoneyBird.administration_id, workers=self.workers)
+            return summarize(len(paths), time.perf_counter() - start, time.process_time() - cpu, latencies,
+                             errors=sum(not result.ok for result in results))
+
+    def bench_async(self) -> dict:
+        """
+        Concurrent requests for single records using the asynchronous client.
+        """
+        if aiohttp is None:
+            return None
+
+        with _Server(contacts=self.records) as server:
+            ids = server.ids('contacts')
+            paths = ['contacts/%s' % ids[i % len(ids)] for i in range(self.requests)]
+            return asyncio.run(self._bench_async(server.base_url, paths))
+
+    async def _bench_async(self, base_url: str, paths: list) -> dict:
+        latencies = []
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def get(moneybird, path):
+            async with semaphore:
+                call = time.perf_counter()
+                await moneybird.get(path, FakeMoneyBird.administration_id)
+                latencies.append(time.perf_counter() - call)
+
+        async with fake_client(base_url, client_class=AsyncMoneyBird, limit=self.workers) as moneybird:
+            await moneybird.get('administrations')
+            start, cpu = time.perf_counter(), time.process_time()
+            await asyncio.gather(*(get(moneybird, path) for path in paths))
+            return summarize(len(paths), time.perf_counter() - start, time.process_time() - cpu, latencies)
+
+    def bench_sync(self) -> dict:
+        """
+        Full synchronization of a resource using the synchronization endpoints.
+        """
+        with _Server(contacts=self.records) as server:
+            latencies = []
+            moneybird = self._client(server.base_url, metrics=CallbackHook(lambda event: latencies.append(
+                event.duration)))
+
+            start, cpu = time.perf_counter(), time.process_time()
+            result = Synchronizer(moneybird, 'contacts', FakeMoneyBird.administration_id).synchronize({})
+            duration = time.perf_counter() - start
+            return summarize(len(latencies), duration, time.process_time() - cpu, latencies,
+                             records=len(result.updated), records_per_second=len(result.updated) / duration)
+
+    def bench_errors(self) -> dict:
+        """
+        Sequential requests of which 10% fail with a server error and are retried.
+        """
+        with _Server(contacts=self.records, error_rate=0.1) as server:
+            latencies = []
+            retry = RetryPolicy(max_attempts=10, backoff_factor=0.001, max_backoff=0.01)
+            moneybird = self._client(server.base_url, retry=retry, metrics=CallbackHook(lambda event: latencies.append(
+                event.duration)))
+            ids = server.ids('contacts')
+
+            start, cpu = time.perf_counter(), time.process_time()
+            for i in range(self.requests):
+                moneybird.get('contacts/%s' % ids[i % len(ids)], FakeMoneyBird.administration_id)
+            return summarize(self.requests, time.perf_counter() - start, time.process_time() - cpu, latencies,
+                             retries=retry.retries)
+
+    def bench_throttled(self) -> dict:
+        """
+        Concurrent requests against a server allowing half of the requests per second, respecting ``Retry-After``.
+        """
+        requests = min(self.requests, 100)
+        with _Server(contacts=self.records, rate_limit=requests // 2, rate_window=1) as server:
+            latencies = []
+            retry = RetryPolicy(max_attempts=10, backoff_factor=0.001)
+            moneybird = self._client(server.base_url, retry=retry, metrics=CallbackHook(
+                lambda event: latencies.append(event.duration)))
+            ids = server.ids('contacts')
+            paths = ['contacts/%s' % ids[i % len(ids)] for i in range(requests)]
+
+            start, cpu = time.perf_counter(), time.process_time()
+            results = moneybird.bulk_get(paths, FakeMoneyBird.administration_id, workers=self.workers)
+            return summarize(requests, time.perf_counter() - start, time.process_time() - cpu, latencies,
+                             retries=retry.retries, errors=sum(not result.ok for result in results))
+
+    def bench_memory(self) -> dict:
+        """
+        Memory used by decoded records, as dictionaries and as :py:class:`moneybird.models.Contact` records.
+        """
+        fake = FakeMoneyBird(contacts=self.records)
+        content = json.dumps(list(fake.data['contacts'].values())).encode('utf-8')
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            dicts = default_codec.decode(content)
+            dict_size = tracemalloc.get_traced_memory()[0] - before
+
+            before = tracemalloc.get_traced_memory()[0]
+            records = list(Contact.from_dicts(default_codec.decode(content)))
+            record_size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'records': len(dicts),
+            'bytes_per_record': dict_size / len(dicts),
+            'bytes_per_model_record': record_size / len(records),
+        }
+
+
+class _Server(object):
+    """
+    Runs a :py:class:`moneybird.testing.FakeMoneyBird` server in a separate process.
+
+    :param options: The arguments for the server.
+    """
+    def __init__(self, **options):
+        self.options = options
+        self.base_url = None
+        self._ids = {}
+        self._connection = None
+        self._process = None
+
+    def ids(self, resource: str) -> list:
+        """
+        Returns the ids of the records of a resource, as created when the server was started.
+
+        :param resource: The resource, e.g. ``contacts``.
+        :return: The ids.
+        """
+        return self._ids[resource]
+
+    def __enter__(self):
+        context = multiprocessing.get_context('spawn')
+        self._connection, child = context.Pipe()
+        self._process = context.Process(target=_serve, args=(child, self.options), daemon=True)
+        self._process.start()
+        self.base_url, self._ids = self._connection.recv()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._connection.send(None)
+        self._process.join()
+
+
+def _serve(connection, options: dict):
+    """
+    Runs a fake server until told to stop through the connection.
+
+    :param connection: The connection to the parent process.
+    :param options: The arguments for the server.
+    """
+    with FakeMoneyBird(**options) as server:
+        connection.send((server.base_url, {resource: list(records) for resource, records in server.data.items()}))
+        connection.recv()
+
+
+def compare(baseline: dict, results: dict, tolerance: float = 0.1) -> list:
+    """
+    Compares benchmark results with those of a baseline, e.g. a previous version.
+
+    :param baseline: The results of the baseline.
+    :param results: The results to compare.
+    :param tolerance: The relative change which is accepted, e.g. 0.1 for 10%.
+    :return: A list of (scenario, metric, baseline value, value, relative change, whether it is a regression).
+    """
+    comparison = []
+    for name, result in sorted(results['scenarios'].items()):
+        base = baseline['scenarios'].get(name, {})
+        for metric in compared_metrics:
+            if not base.get(metric) or result.get(metric) is None:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            worse = -change if metric in higher_is_better else change
+            comparison.append((name, metric, base[metric], result[metric], change, worse > tolerance))
+    return comparison
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the MoneyBird client against a local fake server.")
+    parser.add_argument('scenarios', nargs='*', metavar='scenario',
+                        help="the scenarios to run: %s (default: all)" % ', '.join(Benchmark.scenarios))
+    parser.add_argument('--requests', type=int, default=1000, help="the number of requests per scenario")
+    parser.add_argument('--records', type=int, default=1000, help="the number of records on the server")
+    parser.add_argument('--workers', type=int, default=8, help="the concurrency of the concurrent scenarios")
+    parser.add_argument('--repeat', type=int, default=3, help="the number of runs per scenario")
+    parser.add_argument('--transport', choices=sorted(Benchmark.transports), default='requests',
+                        help="the transport of the synchronous client (default: requests)")
+    parser.add_argument('--output', help="the file to write the results to, as JSON")
+    parser.add_argument('--compare', metavar='BASELINE', help="a results file to compare the results with")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="the accepted relative change (default: 0.1)")
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        if name not in Benchmark.scenarios:
+            parser.error("unknown scenario: %s" % name)
+    if args.transport == 'httpx' and not httpx_installed():
+        parser.error("the httpx transport requires the httpx package")
+
+    # Retries are expected in some scenarios and should not be logged for every request.
+    logging.getLogger('moneybird').setLevel(logging.ERROR)
+
+    results = Benchmark(args.requests, args.records, args.workers, args.repeat, args.transport).run(args.scenarios)
+
+    if args.output:
+        with open(args.output, 'w') as fileobj:
+            json.dump(results, fileobj, indent=2, sort_keys=True)
+
+    for name, result in results['scenarios'].items():
+        print("%-10s %s" % (name, '  '.join('%s=%.6g' % (metric, result[metric])
+                                            for metric in compared_metrics if result.get(metric) is not None)))
+
+    if args.compare:
+        with open(args.compare) as fileobj:
+            baseline = json.load(fileobj)
+        regressions = 0
+        print("\nCompared with version %s:" % baseline.get('version'))
+        for name, metric, base, value, change, regression in compare(baseline, results, args.tolerance):
+            regressions += regression
+            print("%-10s %-16s %12.6g %12.6g %+7.1f%%%s" % (
+                name, metric, base, value, change * 100, '  REGRESSION' if regression else '',
+            ))
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
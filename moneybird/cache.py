@@ -0,0 +1,417 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlencode
+
+import requests
+
+logger = logging.getLogger('moneybird')
+
+CacheEntry = namedtuple('CacheEntry', ['content', 'etag', 'last_modified', 'stored_at'])
+CacheEntry.__doc__ = """
+A cached response body.
+
+:param content: The response body.
+:param etag: The value of the ETag header (may be None).
+:param last_modified: The value of the Last-Modified header (may be None).
+:param stored_at: The time at which the entry was stored.
+"""
+
+
+def request_key(url: str, params: dict = None, headers: dict = None) -> str:
+    """
+    Builds the cache key for a request. The key starts with the URL, followed by the query parameters and a hash of the
+    authentication headers.
+
+    :param url: The URL of the request.
+    :param params: The query parameters of the request (may be None).
+    :param headers: The authentication headers of the request (may be None).
+    :return: The cache key.
+    """
+    key = url
+    if params:
+        key += '?' + urlencode(sorted((str(name), str(value)) for name, value in params.items()))
+    if headers:
+        credentials = '\n'.join('%s: %s' % item for item in sorted(headers.items()))
+        key += '#' + hashlib.sha256(credentials.encode('utf-8')).hexdigest()
+    return key
+
+
+class MemoryBackend(object):
+    """
+    Cache backend which keeps entries in memory. The least recently used entries are evicted when the cache is full.
+
+    :param maxsize: The maximum number of entries.
+    """
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry:
+        """
+        Returns an entry.
+
+        :param key: The key of the entry.
+        :return: The entry, or None when it is not in the cache.
+        """
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return None
+            return self._entries[key]
+
+    def set(self, key: str, entry: CacheEntry):
+        """
+        Stores an entry.
+
+        :param key: The key of the entry.
+        :param entry: The entry.
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """
+        Removes an entry, if it exists.
+
+        :param key: The key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keys(self) -> list:
+        """
+        Returns the keys of all entries.
+
+        :return: The keys.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskBackend(object):
+    """
+    Cache backend which keeps entries in an SQLite database, so they survive restarts and can be shared by processes.
+    The least recently used entries are evicted when the cache is full.
+
+    :param path: The path to the SQLite database.
+    :param maxsize: The maximum number of entries.
+    """
+    def __init__(self, path: str, maxsize: int = 10000):
+        import sqlite3  # Imported here, since only this backend needs it and the client imports this module.
+
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, '
+                'content BLOB NOT NULL, '
+                'etag TEXT, '
+                'last_modified TEXT, '
+                'stored_at REAL NOT NULL, '
+                'used_at REAL NOT NULL'
+                ')'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS entries_used_at ON entries (used_at)')
+
+    def get(self, key: str) -> CacheEntry:
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT content, etag, last_modified, stored_at FROM entries WHERE key = ?', (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE entries SET used_at = ? WHERE key = ?', (time.time(), key))
+        return CacheEntry(bytes(row[0]), row[1], row[2], row[3])
+
+    def set(self, key: str, entry: CacheEntry):
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO entries (key, content, etag, last_modified, stored_at, used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, entry.content, entry.etag, entry.last_modified, entry.stored_at, time.time()),
+            )
+            self._connection.execute(
+                'DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY used_at DESC LIMIT ?)',
+                (self.maxsize,),
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def keys(self) -> list:
+        with self._lock:
+            return [key for key, in self._connection.execute('SELECT key FROM entries')]
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM entries')
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self._connection.close()
+
+
+class ConditionalCache(object):
+    """
+    Cache for GET requests based on HTTP validators.
+
+    Response bodies are stored together with their ``ETag`` and ``Last-Modified`` headers. When the same resource is
+    requested again, these are sent in ``If-None-Match`` and ``If-Modified-Since`` headers. When the resource has not
+    changed, the server responds with 304 Not Modified and the cached body is used. Entries are kept separately for
+    every set of credentials.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.cache import ConditionalCache, DiskBackend
+        >>> cache = ConditionalCache(DiskBackend('moneybird-cache.sqlite3'), ttl=3600)
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), conditional_cache=cache)
+
+    :param backend: The backend storing the entries, defaults to a :py:class:`MemoryBackend`.
+    :param ttl: The maximum age of entries in seconds, after which they are no longer used (optional).
+    """
+    def __init__(self, backend=None, ttl: float = None):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.ttl = ttl
+
+    @staticmethod
+    def key(url: str, params: dict = None, headers: dict = None) -> str:
+        """
+        Builds the cache key for a request.
+
+        :param url: The URL of the request.
+        :param params: The query parameters of the request (may be None).
+        :param headers: The authentication headers of the request (may be None).
+        :return: The cache key.
+        """
+        return request_key(url, params, headers)
+
+    def get(self, key: str) -> CacheEntry:
+        """
+        Returns the entry for a key, unless it has expired.
+
+        :param key: The cache key.
+        :return: The entry, or None when there is no valid entry.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and self.ttl is not None and time.time() - entry.stored_at > self.ttl:
+            self.backend.delete(key)
+            return None
+        return entry
+
+    @staticmethod
+    def validators(entry: CacheEntry) -> dict:
+        """
+        Returns the conditional request headers for a request.
+
+        :param entry: The entry returned by :py:func:`get` for the request (may be None).
+        :return: The headers to send with the request.
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def process(self, key: str, response: requests.Response, entry: CacheEntry = None) -> requests.Response:
+        """
+        Stores a response or, when the resource has not changed, replaces the response body with the cached body.
+
+        The entry the validators were taken from is used for a 304 response, so the cached body is available even when
+        the entry expired or was evicted while the request was in flight. Since the server confirmed the body is still
+        current, the entry is stored again with the current time, so it does not expire while it keeps being used.
+
+        :param key: The cache key.
+        :param response: The response to the conditional request.
+        :param entry: The entry the validators of the request were taken from (may be None).
+        :return: The response to process further.
+        """
+        if response.status_code == 304:
+            if entry is not None:
+                logger.debug("API response served from cache: %s" % response.request.url)
+                response.status_code = 200
+                response._content = entry.content
+                self.backend.set(key, entry._replace(
+                    etag=response.headers.get('ETag') or entry.etag,
+                    last_modified=response.headers.get('Last-Modified') or entry.last_modified,
+                    stored_at=time.time(),
+                ))
+        elif response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self.backend.set(key, CacheEntry(response.content, etag, last_modified, time.time()))
+        return response
+
+
+class ResponseCache(object):
+    """
+    Cache for GET responses which are served without contacting the API, for as long as they are valid.
+
+    Responses are cached for a fixed time. To prevent serving outdated data, all cached responses of a resource are
+    dropped when a POST, PATCH or DELETE request is made to that resource or any of its records, through the client
+    using this cache. For example, changing ``contacts/123`` drops the cached responses of ``contacts``,
+    ``contacts/123``, ``contacts/123/notes`` and ``contacts/synchronization``. POST requests to the synchronization
+    endpoints only read data, so they do not drop any responses. Changes made in other ways, e.g. by other
+    applications, are only seen when the cached responses expire.
+
+    The keys are indexed by resource, so invalidating a resource only touches the responses of that resource. The
+    index is built from the keys of the backend on first use, so responses stored in a :py:class:`DiskBackend` by an
+    earlier process are invalidated too.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.cache import ResponseCache
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), response_cache=ResponseCache(ttl=60))
+
+    :param backend: The backend storing the entries, defaults to a :py:class:`MemoryBackend`.
+    :param ttl: The time in seconds for which responses are served from the cache.
+    """
+    _resource_pattern = re.compile(r'^(.*?/v\d+/(?:\d+/)?[^/.?#]+)')
+    _read_only_pattern = re.compile(r'/synchronization(?:\.json)?(?:[?#]|$)')
+
+    def __init__(self, backend=None, ttl: float = 60):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.ttl = ttl
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._index = None
+        self._indexed = 0
+
+    @staticmethod
+    def key(url: str, params: dict = None, headers: dict = None) -> str:
+        """
+        Builds the cache key for a request.
+
+        :param url: The URL of the request.
+        :param params: The query parameters of the request (may be None).
+        :param headers: The authentication headers of the request (may be None).
+        :return: The cache key.
+        """
+        return request_key(url, params, headers)
+
+    def get(self, key: str) -> CacheEntry:
+        """
+        Returns the entry for a key, unless it has expired.
+
+        :param key: The cache key.
+        :return: The entry, or None when there is no valid entry.
+        """
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry.stored_at > self.ttl:
+            self.backend.delete(key)
+            return None
+        return entry
+
+    def store(self, key: str, response: requests.Response, generation: int):
+        """
+        Stores a successful response.
+
+        The response is not stored when the cache has been invalidated since the request was started, because it may
+        have been sent before the data was changed.
+
+        :param key: The cache key.
+        :param response: The response.
+        :param generation: The value of :py:attr:`generation` when the request was started.
+        """
+        if response.status_code != 200:
+            return
+        with self._lock:
+            if generation == self.generation:
+                self.backend.set(key, CacheEntry(
+                    response.content,
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    time.time(),
+                ))
+                self._add_key(key)
+
+    def changes(self, method: str, url: str) -> bool:
+        """
+        Checks whether a request may change data, in which case the cached responses of its resource are invalidated.
+
+        :param method: The HTTP method of the request.
+        :param url: The URL of the request.
+        :return: Whether the request may change data.
+        """
+        if method == 'GET':
+            return False
+        return not (method == 'POST' and self._read_only_pattern.search(url))
+
+    def invalidate(self, url: str):
+        """
+        Drops all cached responses of the resource to which the URL belongs.
+
+        :param url: The URL to which data was sent.
+        """
+        resource = self._resource(url)
+
+        with self._lock:
+            self.generation += 1
+            keys = self._get_index().pop(resource, ())
+            self._indexed -= len(keys)
+            for key in keys:
+                self.backend.delete(key)
+
+        logger.debug("API response cache invalidated for %s" % resource)
+
+    def _resource(self, key: str) -> str:
+        """
+        Returns the resource a URL or cache key belongs to, e.g. ``https://moneybird.com/api/v2/123/contacts`` for
+        ``https://moneybird.com/api/v2/123/contacts/1/notes.json``.
+
+        :param key: The URL or cache key.
+        :return: The URL of the resource.
+        """
+        match = self._resource_pattern.match(key)
+        return match.group(1) if match else re.split(r'[?#]', key, 1)[0].rsplit('.', 1)[0]
+
+    def _get_index(self) -> dict:
+        """
+        Returns the keys by resource, building the index from the backend when needed. Must be called with the lock
+        held.
+
+        :return: The sets of keys by resource.
+        """
+        if self._index is None:
+            self._index = {}
+            self._indexed = 0
+            for key in self.backend.keys():
+                self._add_key(key)
+        return self._index
+
+    def _add_key(self, key: str):
+        """
+        Adds a key to the index. Keys of entries which were evicted by the backend are dropped by rebuilding the index
+        when it has grown to twice the size of the backend. Must be called with the lock held.
+
+        :param key: The cache key.
+        """
+        if self._index is not None and self._indexed > 2 * getattr(self.backend, 'maxsize', self._indexed):
+            self._index = None
+        keys = self._get_index().setdefault(self._resource(key), set())
+        if key not in keys:
+            keys.add(key)
+            self._indexed += 1
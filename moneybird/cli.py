@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import sys
+
+# Only the standard library is imported here, the client is imported when a command runs, so showing the help and
+# reporting usage errors is fast.
+
+#: The transports which can be selected with ``--transport``.
+transports = ('requests', 'urllib3')
+
+
+def main(argv: list = None) -> int:
+    """
+    Runs the ``moneybird`` command.
+
+    The token is read from ``--token`` or the ``MONEYBIRD_TOKEN`` environment variable, and the administration id from
+    ``--administration`` or the ``MONEYBIRD_ADMINISTRATION_ID`` environment variable. Responses are written to standard
+    output as JSON, lists of records as one JSON object per line.
+
+    Example:
+        >>> main(['get', 'contacts', '--filter', 'created_after=2024-01-01'])
+        0
+
+    :param argv: The arguments, defaults to the arguments of the process.
+    :return: The exit code: 0 on success, 1 when the API returned an error or could not be reached, 2 when the
+        arguments are invalid.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.token:
+        parser.error("a token is required, use --token or MONEYBIRD_TOKEN")
+    if args.command in ('list', 'export', 'sync') and args.administration is None:
+        parser.error("an administration id is required, use --administration or MONEYBIRD_ADMINISTRATION_ID")
+
+    import requests
+    from moneybird.api import MoneyBird
+
+    try:
+        return args.function(_client(args), args)
+    except (MoneyBird.APIError, requests.RequestException) as e:
+        print("moneybird: %s" % e, file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print("moneybird: %s" % e, file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # The output was closed early, e.g. by head, which is not an error.
+        sys.stderr.close()
+        return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the argument parser of the ``moneybird`` command.
+
+    :return: The parser.
+    """
+    parser = argparse.ArgumentParser(prog='moneybird', description="Command-line client for the MoneyBird API.")
+    parser.add_argument('--token', default=os.environ.get('MONEYBIRD_TOKEN'),
+                        help="the API token (default: $MONEYBIRD_TOKEN)")
+    # A default given as text is converted like an argument, so an invalid environment variable is reported as a
+    # usage error.
+    parser.add_argument('-a', '--administration', type=int,
+                        default=os.environ.get('MONEYBIRD_ADMINISTRATION_ID') or None,
+                        help="the administration id (default: $MONEYBIRD_ADMINISTRATION_ID)")
+    parser.add_argument('--transport', choices=transports, default='requests',
+                        help="the transport to send requests with (default: requests)")
+    commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+    command = commands.add_parser('get', help="perform a GET request")
+    command.add_argument('path', help="the resource path, e.g. contacts/123")
+    _add_query_arguments(command)
+    command.set_defaults(function=_get)
+
+    for name in ('post', 'patch'):
+        command = commands.add_parser(name, help="perform a %s request" % name.upper())
+        command.add_argument('path', help="the resource path, e.g. contacts")
+        command.add_argument('data', nargs='?', default='-',
+                             help="the data to send, as JSON (default: read from standard input)")
+        command.set_defaults(function=_send, method=name)
+
+    command = commands.add_parser('delete', help="perform a DELETE request")
+    command.add_argument('path', help="the resource path, e.g. contacts/123")
+    command.set_defaults(function=_delete)
+
+    command = commands.add_parser('list', help="list all records of a resource, one JSON object per line")
+    command.add_argument('path', help="the resource path, e.g. sales_invoices")
+    command.add_argument('--per-page', type=int, default=100, help="the number of records per request (default: 100)")
+    _add_query_arguments(command)
+    command.set_defaults(function=_list)
+
+    command = commands.add_parser('export', help="export resources to files, resuming interrupted exports")
+    command.add_argument('resources', nargs='+', metavar='resource', help="the resource paths, e.g. sales_invoices")
+    command.add_argument('-d', '--directory', default='.', help="the directory to write to (default: .)")
+    command.add_argument('-f', '--format', choices=('ndjson', 'csv', 'parquet'), default='ndjson',
+                         help="the file format (default: ndjson)")
+    command.add_argument('--workers', type=int, default=4, help="the number of concurrent exports (default: 4)")
+    command.add_argument('--restart', action='store_true', help="start interrupted exports over")
+    _add_query_arguments(command)
+    command.set_defaults(function=_export)
+
+    command = commands.add_parser('sync', help="synchronize resources into a local SQLite mirror")
+    command.add_argument('resources', nargs='+', metavar='resource', help="the resource paths, e.g. contacts")
+    command.add_argument('--database', default='moneybird.sqlite3',
+                         help="the SQLite database of the mirror (default: moneybird.sqlite3)")
+    command.set_defaults(function=_sync)
+
+    return parser
+
+
+def _add_query_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the arguments for query parameters and filters to a command.
+
+    :param parser: The parser of the command.
+    """
+    parser.add_argument('-p', '--param', action='append', default=[], type=_pair, metavar='NAME=VALUE',
+                        help="a query parameter, may be repeated")
+    parser.add_argument('--filter', action='append', default=[], type=_pair, metavar='FIELD=VALUE',
+                        help="a filter condition, e.g. state=open|late, may be repeated")
+
+
+def _pair(value: str) -> tuple:
+    """
+    Parses a ``NAME=VALUE`` argument.
+
+    :param value: The argument.
+    :return: A tuple of the name and the value.
+    """
+    name, separator, pair_value = value.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE, got %r" % value)
+    return name, pair_value
+
+
+def _client(args: argparse.Namespace):
+    """
+    Creates the API client for the arguments.
+
+    :param args: The parsed arguments.
+    :return: The client.
+    """
+    from moneybird.api import MoneyBird
+    from moneybird.authentication import TokenAuthentication
+
+    transport = None
+    if args.transport == 'urllib3':
+        from moneybird.transport import Urllib3Transport
+        transport = Urllib3Transport()
+    return MoneyBird(TokenAuthentication(args.token), transport=transport)
+
+
+def _params(args: argparse.Namespace) -> dict:
+    """
+    Builds the query parameters for the arguments.
+
+    :param args: The parsed arguments.
+    :return: The query parameters, or None when there are none.
+    """
+    params = dict(args.param)
+    if args.filter:
+        from moneybird.filters import Filter
+        params['filter'] = Filter(**dict(args.filter))
+    return params or None
+
+
+def _read_data(data: str):
+    """
+    Decodes the data to send, reading it from standard input when it is ``-``.
+
+    :param data: The data argument.
+    :return: The decoded data.
+    """
+    return json.loads(sys.stdin.read() if data == '-' else data)
+
+
+def _print(data):
+    """
+    Writes a response to standard output.
+
+    :param data: The decoded response.
+    """
+    print(json.dumps(data, indent=2))
+
+
+def _get(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``get`` command.
+    """
+    _print(moneybird.get(args.path, args.administration, params=_params(args)))
+    return 0
+
+
+def _send(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``post`` and ``patch`` commands.
+    """
+    method = moneybird.post if args.method == 'post' else moneybird.patch
+    _print(method(args.path, _read_data(args.data), args.administration))
+    return 0
+
+
+def _delete(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``delete`` command.
+    """
+    _print(moneybird.delete(args.path, args.administration))
+    return 0
+
+
+def _list(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``list`` command, writing the records one at a time as they are received.
+    """
+    records = moneybird.iter(args.path, args.administration, per_page=args.per_page, params=_params(args),
+                             prefetch=True)
+    for record in records:
+        sys.stdout.write(json.dumps(record) + '\n')
+    return 0
+
+
+def _export(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``export`` command.
+    """
+    from moneybird.export import Exporter
+
+    exporter = Exporter(moneybird, args.administration, args.directory, format=args.format, params=_params(args))
+    failed = 0
+    for result in exporter.export_all(args.resources, workers=args.workers, resume=not args.restart):
+        if result.ok:
+            print("%s: %d records written to %s" % (result.item, result.result.records, result.result.path))
+        else:
+            failed += 1
+            print("moneybird: exporting %s failed: %s" % (result.item, result.error), file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _sync(moneybird, args: argparse.Namespace) -> int:
+    """
+    Runs the ``sync`` command.
+    """
+    from moneybird.mirror import Mirror
+
+    mirror = Mirror(moneybird, args.database)
+    try:
+        for resource_path in args.resources:
+            result = mirror.refresh(resource_path, args.administration)
+            print("%s: %d updated, %d deleted" % (resource_path, result.updated, result.deleted))
+    finally:
+        mirror.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import threading
+
+from moneybird.cache import request_key
+
+
+class RequestCoalescer(object):
+    """
+    Coalesces identical GET requests which are in flight at the same time, so they share a single call to the API.
+
+    When a GET request is made while an identical request, with the same URL, query parameters and credentials, is
+    still waiting for its response, the second request does not call the API but waits for the response of the first.
+    Both callers decode the shared response separately, so they never share mutable results, and both receive the same
+    exception when the request fails. Requests are only coalesced while they are in flight, nothing is cached.
+
+    A coalescer can be used by the threads of a :py:class:`moneybird.api.MoneyBird` client and by the coroutines of a
+    :py:class:`moneybird.aio.AsyncMoneyBird` client. It can be shared by multiple clients, since the credentials are
+    part of the key.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.coalescing import RequestCoalescer
+        >>> coalescer = RequestCoalescer()
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), coalescer=coalescer)
+        >>> results = moneybird.bulk_get(['administrations'] * 8, workers=8)
+        >>> coalescer.requests, coalescer.coalesced
+        (8, 7)
+    """
+    def __init__(self):
+        #: The number of requests passed through the coalescer.
+        self.requests = 0
+        #: The number of requests which shared the call of an identical request.
+        self.coalesced = 0
+
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str, params: dict = None, headers: dict = None) -> str:
+        """
+        Builds the key identifying identical requests.
+
+        :param url: The URL of the request.
+        :param params: The query parameters of the request (may be None).
+        :param headers: The authentication headers of the request (may be None).
+        :return: The key.
+        """
+        return request_key(url, params, headers)
+
+    def call(self, key: str, function):
+        """
+        Calls a function, unless a call with the same key is in progress in another thread, in which case its result is
+        awaited and returned instead.
+
+        :param key: The key of the request.
+        :param function: The function performing the request.
+        :return: A tuple of the result and whether it was shared with another call.
+        """
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            shared = call is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                call = self._calls[key] = _Call()
+
+        if shared:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def call_async(self, key: str, function):
+        """
+        Awaits a coroutine function, unless a call with the same key is in progress in the same event loop, in which
+        case its result is awaited and returned instead. Cancelling a caller does not cancel the shared call.
+
+        :param key: The key of the request.
+        :param function: The coroutine function performing the request.
+        :return: A tuple of the result and whether it was shared with another call.
+        """
+        import asyncio  # Imported here, since it is only needed by asynchronous clients, which have imported it.
+
+        key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            self.requests += 1
+            task = self._tasks.get(key)
+            shared = task is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                task = self._tasks[key] = asyncio.ensure_future(function())
+                task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), shared
+
+
+class _Call(object):
+    """
+    A call in progress, shared by the threads making identical requests.
+    """
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,51 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JSONCodec(object):
+    """
+    Encodes request bodies and decodes response bodies, using the standard library.
+
+    Custom codecs can be implemented by subclassing this class. Decoding errors should be raised as ValueError.
+    """
+    content_type = 'application/json'
+
+    def encode(self, data) -> bytes:
+        """
+        Encodes data to be sent to the API.
+
+        :param data: The data to encode.
+        :return: The encoded data.
+        """
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, content: bytes):
+        """
+        Decodes a response body.
+
+        :param content: The response body.
+        :return: The decoded data.
+        """
+        return json.loads(content.decode('utf-8'))
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    Encodes request bodies and decodes response bodies, using the fast ``orjson`` package.
+    """
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires the orjson package")
+
+    def encode(self, data) -> bytes:
+        return orjson.dumps(data)
+
+    def decode(self, content: bytes):
+        return orjson.loads(content)
+
+
+default_codec = JSONCodec()
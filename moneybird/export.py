@@ -0,0 +1,413 @@
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from moneybird.api import MoneyBird
+from moneybird.codecs import JSONCodec, default_codec
+from moneybird.filters import query_params
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+logger = logging.getLogger('moneybird')
+
+ExportResult = namedtuple('ExportResult', ['resource_path', 'path', 'records', 'pages', 'resumed'])
+ExportResult.__doc__ = """
+Result of the export of a resource.
+
+:param resource_path: The resource path.
+:param path: The path of the exported file.
+:param records: The number of records written, including those written before resuming.
+:param pages: The number of pages requested, including those requested before resuming.
+:param resumed: Whether an interrupted export was resumed.
+"""
+
+
+class NDJSONWriter(object):
+    """
+    Writes records as newline-delimited JSON, one record per line.
+
+    :param path: The path of the file.
+    :param state: The state returned by :py:func:`checkpoint` to resume from, or None to start a new file.
+    :param codec: The codec used to encode the records (optional).
+    """
+    extension = 'ndjson'
+
+    def __init__(self, path: str, state: dict = None, codec: JSONCodec = None):
+        self.codec = codec or default_codec
+        self.file = _open_at(path, state)
+
+    def write(self, records: list):
+        """
+        Writes records.
+
+        :param records: The records.
+        """
+        self.file.write(b''.join(self.codec.encode(record) + b'\n' for record in records))
+
+    def checkpoint(self) -> dict:
+        """
+        Flushes the written records to disk and returns the state needed to resume writing after them.
+
+        :return: The state, or None when the format cannot be resumed.
+        """
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {'offset': self.file.tell()}
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        self.file.close()
+
+
+class CSVWriter(NDJSONWriter):
+    """
+    Writes records as CSV with a header row. Nested fields, like the details of an invoice, are written as JSON.
+
+    The columns are fixed by the header row. When ``fields`` is given, other fields are left out. Otherwise the columns
+    are the fields of the first record, and a later record with another field raises a ValueError, since it cannot be
+    written without losing data; pass ``fields`` to export such resources.
+
+    :param path: The path of the file.
+    :param state: The state returned by :py:func:`checkpoint` to resume from, or None to start a new file.
+    :param codec: The codec used to encode nested fields (optional).
+    :param fields: The fields to write, defaults to the fields of the first record.
+    """
+    extension = 'csv'
+
+    def __init__(self, path: str, state: dict = None, codec: JSONCodec = None, fields: list = None):
+        super(CSVWriter, self).__init__(path, state, codec)
+        self.fields = state['fields'] if state is not None else fields
+        self.ignore_extra = state['ignore_extra'] if state is not None else fields is not None
+        self._text = io.TextIOWrapper(self.file, encoding='utf-8', newline='', write_through=True)
+        self._writer = None
+        if state is not None:
+            self._writer = self._create_writer()
+
+    def write(self, records: list):
+        if not records:
+            return
+        if self._writer is None:
+            self.fields = self.fields or list(records[0])
+            self._writer = self._create_writer()
+            self._writer.writeheader()
+        if not self.ignore_extra:
+            fields = set(self.fields)
+            unknown = sorted({field for record in records for field in record if field not in fields})
+            if unknown:
+                raise ValueError("Records contain fields which are not in the CSV header: %s" % ', '.join(unknown))
+        self._writer.writerows(_flatten(record, self.codec) for record in records)
+
+    def checkpoint(self) -> dict:
+        # Nothing can be resumed before the header is written, since the columns are not known yet.
+        if self._writer is None:
+            return None
+        return dict(super(CSVWriter, self).checkpoint(), fields=self.fields, ignore_extra=self.ignore_extra)
+
+    def _create_writer(self) -> csv.DictWriter:
+        """
+        Creates the CSV writer for the columns.
+
+        :return: The writer.
+        """
+        return csv.DictWriter(self._text, self.fields, extrasaction='ignore' if self.ignore_extra else 'raise')
+
+    def close(self):
+        self._text.close()
+
+
+class ParquetWriter(object):
+    """
+    Writes records as a Parquet file, a compressed columnar format. This requires the optional ``pyarrow`` package.
+
+    Nested fields are written as JSON. Records are buffered and written in row groups of ``batch_size`` records, which
+    bounds memory use. Parquet files cannot be appended to, so an interrupted export to Parquet starts over.
+
+    The columns are fixed by the schema of the file. When ``fields`` is given, other fields are left out. Otherwise the
+    columns are the fields of the first row group, and a later record with another field raises a ValueError, like
+    :py:class:`CSVWriter` does; pass ``fields`` to export such resources.
+
+    :param path: The path of the file.
+    :param state: Not supported, should be None.
+    :param codec: The codec used to encode nested fields (optional).
+    :param batch_size: The number of records per row group.
+    :param fields: The fields to write, defaults to the fields of the first row group.
+    """
+    extension = 'parquet'
+
+    def __init__(self, path: str, state: dict = None, codec: JSONCodec = None, batch_size: int = 10000,
+                 fields: list = None):
+        if pyarrow is None:
+            raise ImportError("ParquetWriter requires the pyarrow package")
+
+        self.path = path
+        self.codec = codec or default_codec
+        self.batch_size = batch_size
+        self.fields = fields
+        self.ignore_extra = fields is not None
+        self._buffer = []
+        self._writer = None
+
+    def write(self, records: list):
+        if self._writer is not None and not self.ignore_extra:
+            fields = set(self.fields)
+            unknown = sorted({field for record in records for field in record if field not in fields})
+            if unknown:
+                raise ValueError("Records contain fields which are not in the Parquet schema: %s" % ', '.join(unknown))
+        self._buffer.extend(_flatten(record, self.codec) for record in records)
+        if len(self._buffer) >= self.batch_size:
+            self._write_buffer()
+
+    def checkpoint(self) -> dict:
+        return None
+
+    def close(self):
+        self._write_buffer()
+        if self._writer is not None:
+            self._writer.close()
+
+    def _write_buffer(self):
+        """
+        Writes the buffered records as a row group.
+        """
+        if not self._buffer:
+            return
+        if self._writer is None:
+            # The schema is inferred from all buffered records, since a field may be missing from the first one.
+            self.fields = self.fields or list(dict.fromkeys(field for record in self._buffer for field in record))
+            schema = pyarrow.Table.from_pydict({
+                name: [record.get(name) for record in self._buffer] for name in self.fields
+            }).schema
+            schema = pyarrow.schema([
+                field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field for field in schema
+            ])
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, schema)
+
+        schema = self._writer.schema
+        strings = [field.name for field in schema if pyarrow.types.is_string(field.type)]
+        for record in self._buffer:
+            for name in strings:
+                value = record.get(name)
+                if value is not None and not isinstance(value, str):
+                    record[name] = self.codec.encode(value).decode('utf-8')
+
+        self._writer.write_table(pyarrow.Table.from_pylist(self._buffer, schema=schema))
+        self._buffer = []
+
+
+class Exporter(object):
+    """
+    Exports resources of an administration to files, streaming the records page by page.
+
+    Only the page being written and the next page, which is requested in the background meanwhile, are held in memory.
+    Every record passes through the transforms in order. A transform returns the record to write, which may be a new or
+    modified record, or None to leave the record out.
+
+    After every page a checkpoint is stored next to the file. When an export is interrupted, the next export of the
+    resource continues after the last completed page instead of starting over. Since pages are numbered, records which
+    are created during an export may shift the pages; use a filter or run exports when the administration is quiet
+    when this matters. The checkpoint is removed when the export completes.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.export import Exporter
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+        >>> exporter = Exporter(moneybird, 123, 'exports', format='csv')
+        >>> exporter.export('sales_invoices')
+        ExportResult(resource_path='sales_invoices', path='exports/sales_invoices.csv', records=1234, pages=13, ...
+        >>> results = exporter.export_all(['sales_invoices', 'documents/purchase_invoices', 'financial_mutations'])
+
+    :param moneybird: The API client to use.
+    :param administration_id: The administration id.
+    :param directory: The directory to write the files to.
+    :param format: The file format: ``ndjson``, ``csv`` or ``parquet``, or a writer class.
+    :param transforms: Functions applied to every record, in order (optional).
+    :param params: Additional query parameters, or a :py:class:`moneybird.filters.Filter` (optional).
+    :param per_page: The number of records to request per page (the API allows at most 100, larger values are reduced
+        to 100).
+    :param writer_options: Additional arguments for the writer, e.g. ``fields`` for CSV and Parquet.
+    """
+    writers = {
+        'ndjson': NDJSONWriter,
+        'csv': CSVWriter,
+        'parquet': ParquetWriter,
+    }
+
+    def __init__(self, moneybird: MoneyBird, administration_id: int, directory: str, format='ndjson',
+                 transforms: list = None, params: dict = None, per_page: int = 100, **writer_options):
+        self.moneybird = moneybird
+        self.administration_id = administration_id
+        self.directory = directory
+        self.writer_class = self.writers[format] if isinstance(format, str) else format
+        self.transforms = list(transforms or [])
+        self.params = query_params(params) or {}
+        self.per_page = min(per_page, moneybird.max_per_page)
+        self.writer_options = writer_options
+
+    def path(self, resource_path: str) -> str:
+        """
+        Returns the path of the file a resource is exported to.
+
+        :param resource_path: The resource path.
+        :return: The path.
+        """
+        return os.path.join(self.directory, '%s.%s' % (resource_path.replace('/', '_'), self.writer_class.extension))
+
+    def export(self, resource_path: str, resume: bool = True) -> ExportResult:
+        """
+        Exports all records of a resource.
+
+        :param resource_path: The resource path, e.g. ``sales_invoices``.
+        :param resume: Whether to continue an interrupted export, instead of starting over.
+        :return: The result.
+        """
+        path = self.path(resource_path)
+        checkpoint_path = path + '.checkpoint'
+        checkpoint = _read_checkpoint(checkpoint_path) if resume and os.path.exists(path) else None
+        resumed = checkpoint is not None
+        if resumed:
+            logger.info("Resuming the export of %s after page %d" % (resource_path, checkpoint['pages']))
+        else:
+            checkpoint = {'pages': 0, 'records': 0, 'state': None}
+
+        os.makedirs(self.directory, exist_ok=True)
+        writer = self.writer_class(path, checkpoint['state'], codec=self.moneybird.codec, **self.writer_options)
+        try:
+            for records in self._pages(resource_path, checkpoint['pages'] + 1):
+                records = self._transform(records)
+                writer.write(records)
+                state = writer.checkpoint()
+                checkpoint = {
+                    'pages': checkpoint['pages'] + 1,
+                    'records': checkpoint['records'] + len(records),
+                    'state': state,
+                }
+                if state is not None:
+                    _write_checkpoint(checkpoint_path, checkpoint)
+        finally:
+            writer.close()
+
+        if os.path.exists(checkpoint_path):
+            os.unlink(checkpoint_path)
+        logger.debug("Exported %d records of %s to %s" % (checkpoint['records'], resource_path, path))
+        return ExportResult(resource_path, path, checkpoint['records'], checkpoint['pages'], resumed)
+
+    def export_all(self, resource_paths, workers: int = 4, resume: bool = True) -> list:
+        """
+        Exports multiple resources concurrently. A failing export, because of an API error or e.g. a full disk, does not
+        affect the other exports, and can be resumed later.
+
+        :param resource_paths: The resource paths.
+        :param workers: The maximum number of concurrent exports.
+        :param resume: Whether to continue interrupted exports, instead of starting over.
+        :return: A list of :py:class:`moneybird.api.BulkResult` with the resource path as item and an
+            :py:class:`ExportResult` as result, in the order of the resource paths.
+        """
+        return self.moneybird._bulk(lambda resource_path: self.export(resource_path, resume), resource_paths, workers,
+                                    errors=(OSError, ValueError))
+
+    def _pages(self, resource_path: str, page: int):
+        """
+        Requests the pages of a resource, requesting the next page in the background while a page is processed.
+
+        :param resource_path: The resource path.
+        :param page: The first page to request.
+        :return: A generator yielding the records per page.
+        """
+        def fetch(number):
+            params = dict(self.params, page=number, per_page=self.per_page)
+            return self.moneybird.get(resource_path, self.administration_id, params=params)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch, page)
+            while future is not None:
+                records = future.result() or []
+                if self.moneybird._last_page(records, self.per_page):
+                    future = None
+                else:
+                    page += 1
+                    future = executor.submit(fetch, page)
+                yield records
+
+    def _transform(self, records: list) -> list:
+        """
+        Passes records through the transforms.
+
+        :param records: The records.
+        :return: The transformed records, without the records which were left out.
+        """
+        for transform in self.transforms:
+            records = [record for record in map(transform, records) if record is not None]
+        return records
+
+
+def _flatten(record: dict, codec: JSONCodec) -> dict:
+    """
+    Encodes the nested fields of a record as JSON, for formats which only hold scalar fields.
+
+    :param record: The record.
+    :param codec: The codec used to encode the nested fields.
+    :return: The record with only scalar fields.
+    """
+    return {
+        key: codec.encode(value).decode('utf-8') if isinstance(value, (dict, list)) else value
+        for key, value in record.items()
+    }
+
+
+def _open_at(path: str, state: dict = None):
+    """
+    Opens a file for writing, truncated to the offset of a checkpoint when resuming, so records written after the
+    checkpoint are discarded.
+
+    :param path: The path of the file.
+    :param state: The state of the checkpoint, or None to start a new file.
+    :return: The binary file object.
+    """
+    if state is None:
+        return open(path, 'wb')
+    fileobj = open(path, 'r+b')
+    fileobj.truncate(state['offset'])
+    fileobj.seek(state['offset'])
+    return fileobj
+
+
+def _read_checkpoint(path: str) -> dict:
+    """
+    Reads a checkpoint.
+
+    :param path: The path of the checkpoint.
+    :return: The checkpoint, or None when there is none.
+    """
+    try:
+        with open(path) as fileobj:
+            return json.load(fileobj)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path: str, checkpoint: dict):
+    """
+    Writes a checkpoint, replacing the previous checkpoint atomically.
+
+    :param path: The path of the checkpoint.
+    :param checkpoint: The checkpoint.
+    """
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.checkpoint-')
+    try:
+        with os.fdopen(descriptor, 'w') as fileobj:
+            json.dump(checkpoint, fileobj)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,114 @@
+import datetime
+
+
+class Filter(object):
+    """
+    Builds the value of the ``filter`` query parameter, which most list endpoints of the API support, so records are
+    filtered by the API instead of downloaded and filtered locally.
+
+    Conditions are given as keyword arguments. Lists, tuples and sets match any of their values, booleans, dates and
+    datetimes are formatted as the API expects them, and conditions which are None are left out. Filters are immutable,
+    :py:func:`where` and the ``&`` operator return a new filter.
+
+    A filter can be passed as the ``params`` of any method sending query parameters, or as the ``filter`` item in
+    those parameters.
+
+    Example:
+        >>> from datetime import date
+        >>> from moneybird.filters import Filter, period
+        >>> open_invoices = Filter(state=['open', 'late'], period=period(date(2024, 1, 1), date(2024, 3, 31)))
+        >>> str(open_invoices.where(contact_id=123))
+        'state:open|late,period:20240101..20240331,contact_id:123'
+        >>> moneybird.iter('sales_invoices', 123, params=open_invoices)
+
+    :param conditions: The conditions, by field.
+    """
+    def __init__(self, **conditions):
+        self.conditions = {key: value for key, value in conditions.items() if value is not None}
+
+    def where(self, **conditions) -> 'Filter':
+        """
+        Returns a filter with additional conditions. Conditions on a field which already has a condition replace it.
+
+        :param conditions: The conditions, by field.
+        :return: The new filter.
+        """
+        return Filter(**dict(self.conditions, **conditions))
+
+    def params(self, **params) -> dict:
+        """
+        Returns the query parameters for the filter.
+
+        :param params: Additional query parameters, e.g. ``query`` or ``per_page``.
+        :return: The query parameters.
+        """
+        return dict(params, filter=str(self))
+
+    def __and__(self, other: 'Filter') -> 'Filter':
+        return self.where(**other.conditions)
+
+    def __bool__(self):
+        return bool(self.conditions)
+
+    def __eq__(self, other):
+        return isinstance(other, Filter) and str(self) == str(other)
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __str__(self):
+        return ','.join('%s:%s' % (key, _format(value)) for key, value in self.conditions.items())
+
+    def __repr__(self):
+        return 'Filter(%s)' % ', '.join('%s=%r' % item for item in self.conditions.items())
+
+
+def period(start, end=None) -> str:
+    """
+    Formats a custom period for the ``period`` condition of a filter. The API also accepts named periods, like
+    ``this_month`` or ``prev_year``, which can be given as they are.
+
+    :param start: The first date of the period.
+    :param end: The last date of the period, defaults to the start date.
+    :return: The period.
+    """
+    return '%s..%s' % (start.strftime('%Y%m%d'), (end or start).strftime('%Y%m%d'))
+
+
+def query_params(params) -> dict:
+    """
+    Converts query parameters which may be or contain a :py:class:`Filter` into plain query parameters.
+
+    :param params: The query parameters: a dictionary, a filter or None.
+    :return: The query parameters, or None when there are none.
+    """
+    if params is None:
+        return None
+    if isinstance(params, Filter):
+        return params.params() if params else {}
+    if any(isinstance(value, Filter) for value in params.values()):
+        params = {key: str(value) if isinstance(value, Filter) else value for key, value in params.items()}
+        if params.get('filter') == '':
+            del params['filter']
+    return params
+
+
+def _format(value) -> str:
+    """
+    Formats the value of a filter condition.
+
+    :param value: The value.
+    :return: The formatted value.
+    """
+    if isinstance(value, (set, frozenset)):
+        value = sorted(value, key=str)
+    if isinstance(value, (list, tuple)):
+        return '|'.join(_format(item) for item in value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    value = str(value)
+    if ',' in value:
+        raise ValueError("Filter values cannot contain ',': %r" % value)
+    return value
@@ -0,0 +1,241 @@
+import bisect
+import re
+import threading
+
+
+class RequestEvent(object):
+    """
+    Measurements of a single call to the API, passed to :py:func:`MetricsHook.record`.
+
+    All durations are in seconds. When a request is retried, the durations of the individual attempts are those of the
+    last attempt, while :py:attr:`duration` covers all attempts including the time spent waiting between them.
+
+    :param method: The HTTP method.
+    :param url: The URL of the request.
+    """
+    __slots__ = (
+        'method', 'url', 'path', 'administration_id', 'status_code', 'error', 'duration', 'wait_time',
+        'transfer_time', 'decode_time', 'bytes_sent', 'bytes_received', 'attempts', 'throttled', 'cached',
+        'coalesced',
+    )
+
+    _url_pattern = re.compile(r'^.*?/v\d+/(?:(\d+)/)?(.*?)(?:\.json)?$')
+    _id_pattern = re.compile(r'(?<=/)\d+(?=/|$)')
+
+    def __init__(self, method: str, url: str):
+        #: The HTTP method.
+        self.method = method
+        #: The URL of the request.
+        self.url = url
+        #: The resource path with ids replaced by ``:id``, e.g. ``contacts/:id/notes``.
+        self.path = None
+        #: The administration id, or None when the request does not belong to an administration.
+        self.administration_id = None
+        #: The status code of the last response, or None when no response was received.
+        self.status_code = None
+        #: The name of the exception raised to the caller, or None when the call succeeded.
+        self.error = None
+        #: The total duration of the call.
+        self.duration = 0.0
+        #: The time from sending the request until the response headers were received. For new connections, this
+        #: includes setting up the connection and the TLS handshake.
+        self.wait_time = 0.0
+        #: The time spent receiving the response body.
+        self.transfer_time = 0.0
+        #: The time spent decoding and processing the response.
+        self.decode_time = 0.0
+        #: The size of the request body in bytes.
+        self.bytes_sent = 0
+        #: The size of the response body in bytes.
+        self.bytes_received = 0
+        #: The number of attempts made, zero when the response was served from a cache or shared with another request.
+        self.attempts = 0
+        #: The number of attempts which were throttled by the API.
+        self.throttled = 0
+        #: Whether the response was served from the response cache.
+        self.cached = False
+        #: Whether the response was shared with an identical request made at the same time, see
+        #: :py:class:`moneybird.coalescing.RequestCoalescer`.
+        self.coalesced = False
+
+        match = self._url_pattern.match(url.split('?', 1)[0])
+        if match:
+            administration_id, path = match.groups()
+            self.administration_id = int(administration_id) if administration_id else None
+            self.path = self._id_pattern.sub(':id', '/' + path)[1:]
+
+    @property
+    def retries(self) -> int:
+        """
+        The number of retries.
+        """
+        return max(self.attempts - 1, 0)
+
+    def __repr__(self):
+        return '<RequestEvent %s %s %s %.3fs>' % (self.method, self.path, self.status_code, self.duration)
+
+
+class MetricsHook(object):
+    """
+    Base class for receivers of request measurements. Implementations should be thread-safe and fast, since they are
+    called synchronously for every call to the API.
+    """
+    def record(self, event: RequestEvent):
+        """
+        Records the measurements of a call to the API.
+
+        :param event: The measurements.
+        """
+        raise NotImplementedError()
+
+
+class CallbackHook(MetricsHook):
+    """
+    Passes request measurements to one or more callables, e.g. to export them to Prometheus or StatsD.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.metrics import CallbackHook
+        >>> def to_statsd(event):
+        ...     statsd.timing('moneybird.%s.%s' % (event.method, event.path), event.duration * 1000)
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), metrics=CallbackHook(to_statsd))
+
+    :param callbacks: The callables, which are called with the :py:class:`RequestEvent`.
+    """
+    def __init__(self, *callbacks):
+        self.callbacks = callbacks
+
+    def record(self, event: RequestEvent):
+        for callback in self.callbacks:
+            callback(event)
+
+
+class Histogram(object):
+    """
+    Histogram of values with fixed bucket boundaries.
+
+    :param buckets: The upper boundaries of the buckets, in increasing order.
+    """
+    def __init__(self, buckets: tuple):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Adds a value.
+
+        :param value: The value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Estimates a percentile, as the upper boundary of the bucket containing it.
+
+        :param percentile: The percentile, between 0 and 100.
+        :return: The estimate, infinite when it is beyond the last bucket, or None when no values were added.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percentile / 100.0
+        total = 0
+        for boundary, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            if total >= rank:
+                return boundary
+        return float('inf')
+
+
+class MetricsAggregator(MetricsHook):
+    """
+    Aggregates request measurements in memory, per method and resource path.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.metrics import MetricsAggregator
+        >>> metrics = MetricsAggregator()
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), metrics=metrics)
+        >>> moneybird.get('contacts/143273868766741508', 123)
+        >>> metrics.snapshot()[('GET', 'contacts/:id')]['requests']
+        1
+
+    :param buckets: The upper boundaries of the latency histogram buckets, in seconds.
+    """
+    default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    counters = (
+        'requests', 'errors', 'attempts', 'retries', 'throttled', 'cached', 'coalesced', 'bytes_sent',
+        'bytes_received',
+    )
+
+    def __init__(self, buckets: tuple = None):
+        self.buckets = self.default_buckets if buckets is None else tuple(buckets)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, event: RequestEvent):
+        with self._lock:
+            stats = self._stats.get((event.method, event.path))
+            if stats is None:
+                stats = self._stats[(event.method, event.path)] = self._new_stats()
+
+            stats['requests'] += 1
+            stats['errors'] += event.error is not None
+            stats['attempts'] += event.attempts
+            stats['retries'] += event.retries
+            stats['throttled'] += event.throttled
+            stats['cached'] += event.cached
+            stats['coalesced'] += event.coalesced
+            stats['bytes_sent'] += event.bytes_sent
+            stats['bytes_received'] += event.bytes_received
+            stats['statuses'][event.status_code] = stats['statuses'].get(event.status_code, 0) + 1
+            stats['duration'].observe(event.duration)
+            stats['wait_time'].observe(event.wait_time)
+            stats['decode_time'].observe(event.decode_time)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the aggregated measurements.
+
+        :return: A dictionary by (method, path) containing the counters, the number of responses by status code, and
+            the count, sum and 50th, 90th and 99th percentiles of the durations.
+        """
+        with self._lock:
+            result = {}
+            for key, stats in self._stats.items():
+                summary = {name: stats[name] for name in self.counters}
+                summary['statuses'] = dict(stats['statuses'])
+                for name in ('duration', 'wait_time', 'decode_time'):
+                    histogram = stats[name]
+                    summary[name] = {
+                        'count': histogram.count,
+                        'sum': histogram.sum,
+                        'p50': histogram.percentile(50),
+                        'p90': histogram.percentile(90),
+                        'p99': histogram.percentile(99),
+                    }
+                result[key] = summary
+            return result
+
+    def reset(self):
+        """
+        Discards all aggregated measurements.
+        """
+        with self._lock:
+            self._stats = {}
+
+    def _new_stats(self) -> dict:
+        """
+        Creates empty statistics for a method and path.
+
+        :return: The statistics.
+        """
+        stats = {name: 0 for name in self.counters}
+        stats['statuses'] = {}
+        for name in ('duration', 'wait_time', 'decode_time'):
+            stats[name] = Histogram(self.buckets)
+        return stats
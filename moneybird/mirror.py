@@ -0,0 +1,230 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+from moneybird.api import MoneyBird
+from moneybird.filters import query_params
+from moneybird.synchronization import Synchronizer
+
+logger = logging.getLogger('moneybird')
+
+RefreshResult = namedtuple('RefreshResult', ['updated', 'deleted'])
+RefreshResult.__doc__ = """
+Result of refreshing a resource in the mirror.
+
+:param updated: The number of new or changed records that were stored.
+:param deleted: The number of records that were removed.
+"""
+
+
+class Mirror(object):
+    """
+    Persistent local copy of administration resources, stored in SQLite.
+
+    Records are stored by administration, resource, id and version. Refreshing a resource uses the synchronization
+    endpoints of the API, so only new and changed records are downloaded. All reads are served from the local database.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.mirror import Mirror
+        >>> mirror = Mirror(MoneyBird(TokenAuthentication('access_token')), 'moneybird.sqlite3')
+        >>> mirror.refresh('contacts', 123)
+        RefreshResult(updated=1204, deleted=0)
+        >>> mirror.find('contacts', 123, customer_id='1001')
+        [{'id': '143273868766741508', 'customer_id': '1001', ...
+
+    :param moneybird: The API client to use for refreshing.
+    :param path: The path to the SQLite database, use ``:memory:`` for a temporary mirror.
+    :param indexes: The fields to index per resource, defaults to :py:attr:`default_indexes`.
+    """
+    default_indexes = {
+        'contacts': ['customer_id', 'company_name', 'email'],
+        'sales_invoices': ['contact_id', 'invoice_id', 'state', 'invoice_date'],
+        'documents/purchase_invoices': ['contact_id', 'state', 'date'],
+        'financial_mutations': ['financial_account_id', 'date', 'state'],
+    }
+
+    _field_pattern = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+    def __init__(self, moneybird: MoneyBird, path: str = ':memory:', indexes: dict = None):
+        self.moneybird = moneybird
+        self.indexes = self.default_indexes if indexes is None else indexes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._create_schema()
+
+    def refresh(self, resource_path: str, administration_id: int, params: dict = None) -> RefreshResult:
+        """
+        Downloads the changes of a resource since the last refresh and applies them to the mirror.
+
+        When ``params`` filters the records, records outside the filter are left alone, so deleted records are only
+        removed by a refresh without a filter.
+
+        :param resource_path: The resource path, e.g. ``contacts``.
+        :param administration_id: The administration id.
+        :param params: Additional query parameters for the version listing, e.g. a filter (optional).
+        :return: The number of updated and deleted records.
+        """
+        sync = Synchronizer(self.moneybird, resource_path, administration_id)
+        filtered = bool(query_params(params))
+        changed, deleted = sync.diff(self.versions(resource_path, administration_id), sync.versions(params), filtered)
+
+        updated = 0
+        batch = []
+        for record in sync.fetch(changed):
+            batch.append(record)
+            if len(batch) >= sync.batch_size:
+                self.store(resource_path, administration_id, batch)
+                updated += len(batch)
+                batch = []
+        self.store(resource_path, administration_id, batch)
+        updated += len(batch)
+        self.remove(resource_path, administration_id, deleted)
+
+        logger.debug("Mirror of %s refreshed: %d updated, %d deleted" % (resource_path, updated, len(deleted)))
+        return RefreshResult(updated, len(deleted))
+
+    def store(self, resource_path: str, administration_id: int, records: list):
+        """
+        Stores records in the mirror, replacing earlier versions.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :param records: The records to store.
+        """
+        rows = [
+            (administration_id, resource_path, str(record['id']), record.get('version'), json.dumps(record))
+            for record in records
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO records (administration_id, resource, id, version, data) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def remove(self, resource_path: str, administration_id: int, ids: list):
+        """
+        Removes records from the mirror.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :param ids: The ids of the records to remove.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'DELETE FROM records WHERE administration_id = ? AND resource = ? AND id = ?',
+                [(administration_id, resource_path, str(id_)) for id_ in ids],
+            )
+
+    def versions(self, resource_path: str, administration_id: int) -> dict:
+        """
+        Returns the versions of all locally stored records of a resource.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :return: The versions of the records, by id.
+        """
+        return dict(self._query(
+            'SELECT id, version FROM records WHERE administration_id = ? AND resource = ?',
+            (administration_id, resource_path),
+        ))
+
+    def get(self, resource_path: str, administration_id: int, id_) -> dict:
+        """
+        Returns a single record from the mirror.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :param id_: The id of the record.
+        :return: The record, or None when it is not in the mirror.
+        """
+        rows = self._query(
+            'SELECT data FROM records WHERE administration_id = ? AND resource = ? AND id = ?',
+            (administration_id, resource_path, str(id_)),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def all(self, resource_path: str, administration_id: int) -> list:
+        """
+        Returns all records of a resource from the mirror.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :return: The records.
+        """
+        return [json.loads(data) for data, in self._query(
+            'SELECT data FROM records WHERE administration_id = ? AND resource = ?',
+            (administration_id, resource_path),
+        )]
+
+    def find(self, resource_path: str, administration_id: int, **fields) -> list:
+        """
+        Returns the records of a resource of which the given top-level fields have the given values. Lookups on
+        indexed fields do not scan the resource.
+
+        :param resource_path: The resource path.
+        :param administration_id: The administration id.
+        :param fields: The values to look for, by field name.
+        :return: The matching records.
+        """
+        query = 'SELECT data FROM records WHERE administration_id = ? AND resource = ?'
+        params = [administration_id, resource_path]
+        for field, value in fields.items():
+            query += " AND json_extract(data, '$.%s') = ?" % self._check_field(field)
+            params.append(value)
+        return [json.loads(data) for data, in self._query(query, params)]
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        self._connection.close()
+
+    def _query(self, query: str, params) -> list:
+        """
+        Executes a read query.
+
+        :param query: The SQL query.
+        :param params: The query parameters.
+        :return: All resulting rows.
+        """
+        with self._lock:
+            return self._connection.execute(query, params).fetchall()
+
+    def _create_schema(self):
+        """
+        Creates the tables and indexes when they do not exist yet.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS records ('
+                'administration_id INTEGER NOT NULL, '
+                'resource TEXT NOT NULL, '
+                'id TEXT NOT NULL, '
+                'version INTEGER, '
+                'data TEXT NOT NULL, '
+                'PRIMARY KEY (administration_id, resource, id)'
+                ')'
+            )
+            fields = sorted({field for resource_fields in self.indexes.values() for field in resource_fields})
+            for field in fields:
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS records_%s ON records "
+                    "(administration_id, resource, json_extract(data, '$.%s'))" % (field, self._check_field(field))
+                )
+
+    @classmethod
+    def _check_field(cls, field: str) -> str:
+        """
+        Checks whether a field name can safely be used in a query.
+
+        :param field: The field name.
+        :return: The field name.
+        """
+        if not cls._field_pattern.match(field):
+            raise ValueError("Invalid field name: %s" % field)
+        return field
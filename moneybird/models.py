@@ -0,0 +1,191 @@
+from moneybird.codecs import default_codec
+
+
+class RecordType(type):
+    """
+    Metaclass for records. Creates a slot for every field and a lazily decoded property for every nested field.
+    """
+    def __new__(mcs, name, bases, namespace):
+        fields = tuple(namespace.get('fields', ()))
+        nested = tuple(namespace.get('nested', ()))
+        inherited = set()
+        for base in bases:
+            for cls in base.__mro__:
+                inherited.update(getattr(cls, '__slots__', ()))
+
+        slots = [field for field in fields if field not in inherited]
+        slots += ['_%s' % field for field in nested if '_%s' % field not in inherited]
+        if '_extra' not in inherited:
+            slots.append('_extra')
+        namespace['__slots__'] = tuple(slots)
+
+        for field in nested:
+            namespace[field] = mcs._nested_property(field)
+
+        cls = super(RecordType, mcs).__new__(mcs, name, bases, namespace)
+
+        cls._slots = tuple(
+            (field, getattr(cls, field if field in fields else '_%s' % field))
+            for field in fields + nested
+        )
+        cls._all_fields = frozenset(fields + nested)
+        return cls
+
+    @staticmethod
+    def _nested_property(field: str) -> property:
+        """
+        Creates a property which stores a nested value encoded, and decodes it on every access.
+
+        :param field: The name of the field.
+        :return: The property.
+        """
+        slot = '_%s' % field
+
+        def getter(self):
+            try:
+                content = getattr(self, slot)
+            except AttributeError:
+                return None
+            return self.codec.decode(content)
+
+        def setter(self, value):
+            setattr(self, slot, self.codec.encode(value))
+
+        return property(getter, setter, doc="Nested field ``%s``, decoded on access." % field)
+
+
+class Record(object, metaclass=RecordType):
+    """
+    Base class for compact records of API resources.
+
+    Records store their fields in slots instead of a dictionary, which saves a lot of memory when many records are held.
+    Nested fields, like the details of an invoice, are kept in encoded form and are only decoded when accessed. Note
+    that a nested value is decoded again on every access, and that changing the decoded value does not change the
+    record: assign a new value instead.
+
+    Fields which are not known to the record class are preserved. Fields which are known but were not present in the
+    data are None, and are not included when converting back to a dictionary.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.models import FinancialMutation
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+        >>> mutations = list(FinancialMutation.from_dicts(moneybird.iter('financial_mutations', 123)))
+        >>> mutations[0].amount
+        '-12.5'
+
+    :param data: The fields of the record.
+    """
+    fields = ()
+    nested = ()
+
+    #: The codec used to encode nested fields.
+    codec = default_codec
+
+    def __init__(self, data: dict = None):
+        self._extra = None
+        for key, value in (data or {}).items():
+            if key in self._all_fields:
+                setattr(self, key, value)
+            else:
+                if self._extra is None:
+                    self._extra = {}
+                self._extra[key] = value
+
+    @classmethod
+    def from_dicts(cls, records):
+        """
+        Converts decoded records to record objects.
+
+        :param records: An iterable of records as returned by the API.
+        :return: A generator yielding the record objects.
+        """
+        for record in records:
+            yield cls(record)
+
+    def to_dict(self) -> dict:
+        """
+        Converts the record back to a dictionary, e.g. for sending it to the API.
+
+        :return: The fields of the record.
+        """
+        data = {}
+        for field, descriptor in self._slots:
+            try:
+                descriptor.__get__(self)
+            except AttributeError:
+                continue
+            data[field] = getattr(self, field)
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __getattr__(self, name: str):
+        if name == '_extra':
+            raise AttributeError(name)
+        if name in self._all_fields:
+            return None
+        if self._extra is not None and name in self._extra:
+            return self._extra[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, getattr(self, 'id', None))
+
+
+class Contact(Record):
+    fields = (
+        'id', 'administration_id', 'company_name', 'firstname', 'lastname', 'address1', 'address2', 'zipcode', 'city',
+        'country', 'phone', 'delivery_method', 'customer_id', 'tax_number', 'chamber_of_commerce', 'bank_account',
+        'attention', 'email', 'email_ubl', 'send_invoices_to_attention', 'send_invoices_to_email',
+        'send_estimates_to_attention', 'send_estimates_to_email', 'sepa_active', 'sepa_iban', 'sepa_iban_account_name',
+        'sepa_bic', 'sepa_mandate_id', 'sepa_mandate_date', 'sepa_sequence_type', 'credit_card_number',
+        'credit_card_reference', 'credit_card_type', 'tax_number_validated_at', 'tax_number_valid',
+        'invoice_workflow_id', 'estimate_workflow_id', 'si_identifier', 'si_identifier_type', 'archived',
+        'sales_invoices_url', 'created_at', 'updated_at', 'version',
+    )
+    nested = ('notes', 'custom_fields', 'contact_people', 'events')
+
+
+class SalesInvoice(Record):
+    fields = (
+        'id', 'administration_id', 'contact_id', 'contact_person_id', 'invoice_id', 'recurring_sales_invoice_id',
+        'workflow_id', 'document_style_id', 'identity_id', 'draft_id', 'state', 'invoice_date', 'due_date',
+        'payment_conditions', 'payment_reference', 'short_payment_reference', 'reference', 'language', 'currency',
+        'discount', 'original_sales_invoice_id', 'original_estimate_id', 'paused', 'paid_at', 'sent_at',
+        'public_view_code', 'public_view_code_expires_at', 'prices_are_incl_tax', 'total_paid', 'total_unpaid',
+        'total_unpaid_base', 'total_price_excl_tax', 'total_price_excl_tax_base', 'total_price_incl_tax',
+        'total_price_incl_tax_base', 'total_discount', 'marked_dubious_on', 'marked_uncollectible_on',
+        'reminder_count', 'next_reminder', 'url', 'payment_url', 'created_at', 'updated_at', 'version',
+    )
+    nested = (
+        'contact', 'contact_person', 'details', 'payments', 'custom_fields', 'notes', 'attachments', 'events',
+        'tax_totals',
+    )
+
+
+class FinancialMutation(Record):
+    fields = (
+        'id', 'administration_id', 'financial_account_id', 'financial_statement_id', 'amount', 'amount_open', 'code',
+        'date', 'message', 'contra_account_name', 'contra_account_number', 'state', 'batch_reference', 'currency',
+        'original_amount', 'account_servicer_transaction_id', 'processed_at', 'created_at', 'updated_at', 'version',
+    )
+    nested = ('sepa_fields', 'payments', 'ledger_account_bookings')
+
+
+class LedgerAccount(Record):
+    fields = (
+        'id', 'administration_id', 'name', 'account_type', 'account_id', 'parent_id', 'created_at', 'updated_at',
+    )
+    nested = ('allowed_document_types',)
@@ -0,0 +1,130 @@
+from urllib.parse import urljoin
+
+from moneybird.filters import query_params
+
+
+class Administration(object):
+    """
+    An administration, through which its resources can be accessed.
+
+    Resources are available as attributes, e.g. ``administration.contacts``, or through :py:func:`resource` for
+    resource paths which are not valid attribute names, e.g. ``documents/purchase_invoices``.
+
+    :param moneybird: The API client to use.
+    :param administration_id: The administration id.
+    """
+    def __init__(self, moneybird: 'MoneyBird', administration_id: int):
+        self.moneybird = moneybird
+        self.id = administration_id
+        self.url = moneybird._get_url(administration_id, '')[:-len('.json')]
+        self._resources = {}
+
+    def resource(self, resource_path: str) -> 'Resource':
+        """
+        Returns a resource of the administration.
+
+        :param resource_path: The resource path, e.g. ``contacts`` or ``documents/purchase_invoices``.
+        :return: The resource.
+        """
+        try:
+            return self._resources[resource_path]
+        except KeyError:
+            resource = self._resources[resource_path] = Resource(self.moneybird, urljoin(self.url, resource_path))
+            return resource
+
+    def __getattr__(self, name: str) -> 'Resource':
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self.resource(name)
+
+    def __repr__(self):
+        return '<Administration %s>' % self.id
+
+
+class Resource(object):
+    """
+    A resource of the API, e.g. the contacts of an administration.
+
+    The URLs of the resource are computed once, so no URL building is required for every request.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+        >>> contacts = moneybird.administration(123).contacts
+        >>> contact = contacts.create({'contact': {'company_name': 'Parkietje B.V.'}})
+        >>> contacts.update(contact['id'], {'contact': {'firstname': 'John'}})
+        {'id': '143273868766741508', 'company_name': 'Parkietje B.V.', 'firstname': 'John', ...
+
+    :param moneybird: The API client to use.
+    :param url: The absolute URL to the resource, without format extension.
+    """
+    def __init__(self, moneybird: 'MoneyBird', url: str):
+        self.moneybird = moneybird
+        self.url = url
+        self.collection_url = '%s.json' % url
+        self._item_url = '%s/%%s.json' % url
+
+    def list(self, params: dict = None) -> list:
+        """
+        Requests a single page of the resource.
+
+        :param params: The query parameters to send, or a :py:class:`moneybird.filters.Filter` (optional).
+        :return: The records.
+        """
+        return self.moneybird._perform('GET', self.collection_url, params=params)
+
+    def iterate(self, per_page: int = 100, params: dict = None, prefetch: bool = False):
+        """
+        Lazily iterates over all records of the resource. See :py:func:`moneybird.api.MoneyBird.iter`.
+
+        :param per_page: The number of records to request per page (the API allows at most 100, larger values are
+            reduced to 100).
+        :param params: Additional query parameters to send with every page request, or a
+            :py:class:`moneybird.filters.Filter` (optional).
+        :param prefetch: Whether to request the next page in the background.
+        :return: A generator yielding the records one by one.
+        """
+        per_page = min(per_page, self.moneybird.max_per_page)
+        params = dict(query_params(params) or {}, per_page=per_page)
+        return self.moneybird._paginate(lambda page: self.list(dict(params, page=page)), per_page, prefetch)
+
+    def get(self, id_, params: dict = None) -> dict:
+        """
+        Requests a single record.
+
+        :param id_: The id of the record.
+        :param params: The query parameters to send (optional).
+        :return: The record.
+        """
+        return self.moneybird._perform('GET', self._item_url % id_, params=params)
+
+    def create(self, data: dict) -> dict:
+        """
+        Creates a record.
+
+        :param data: The data to send to the server.
+        :return: The created record.
+        """
+        return self.moneybird._perform('POST', self.collection_url, data)
+
+    def update(self, id_, data: dict) -> dict:
+        """
+        Changes a record.
+
+        :param id_: The id of the record.
+        :param data: The data to send to the server.
+        :return: The changed record.
+        """
+        return self.moneybird._perform('PATCH', self._item_url % id_, data)
+
+    def delete(self, id_) -> dict:
+        """
+        Deletes a record. USE THIS METHOD WITH CAUTION.
+
+        :param id_: The id of the record.
+        :return: The decoded JSON response for the request.
+        """
+        return self.moneybird._perform('DELETE', self._item_url % id_)
+
+    def __repr__(self):
+        return '<Resource %s>' % self.url
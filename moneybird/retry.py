@@ -0,0 +1,175 @@
+import datetime
+import email.utils
+import logging
+import random
+import threading
+import time
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+logger = logging.getLogger('moneybird')
+
+
+def parse_retry_after(value: str) -> float:
+    """
+    Parses a Retry-After header, which holds either a number of seconds or an HTTP date.
+
+    :param value: The value of the header (may be None).
+    :return: The delay in seconds, or None when the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+class RetryPolicy(object):
+    """
+    Policy for retrying requests which failed because of a transient problem.
+
+    Failed requests are retried after an exponentially increasing delay of ``backoff_factor * 2 ** (attempt - 1)``
+    seconds, at most ``max_backoff`` seconds. With jitter enabled, a random delay between zero and this value is used
+    instead, so clients which failed at the same moment do not retry at the same moment. A ``Retry-After`` header sent
+    by the API is always respected.
+
+    Requests using an idempotent method are retried on connection errors and on the configured status codes. Other
+    requests, like POST requests, could have been processed by the server already. These are only retried when it is
+    certain that this did not happen: when no connection could be made, or when the request was throttled.
+
+    The number of retries and the total time spent waiting are counted in :py:attr:`retries` and :py:attr:`retry_delay`.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.retry import RetryPolicy
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), retry=RetryPolicy(max_attempts=5))
+
+    :param max_attempts: The maximum number of attempts, including the first one.
+    :param backoff_factor: The delay before the first retry, in seconds.
+    :param max_backoff: The maximum delay between attempts, in seconds.
+    :param jitter: Whether to randomize the delays.
+    :param statuses: The maximum number of attempts by status code, for the status codes which should be retried.
+    :param methods: The idempotent HTTP methods.
+    """
+    default_statuses = {
+        429: None,
+        500: None,
+        502: None,
+        503: None,
+        504: None,
+    }
+    default_methods = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+    #: Status codes which guarantee that the request has not been processed.
+    unprocessed_statuses = frozenset([429])
+
+    def __init__(self, max_attempts: int = 3, backoff_factor: float = 0.5, max_backoff: float = 30, jitter: bool = True,
+                 statuses: dict = None, methods: set = None):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = self.default_statuses if statuses is None else statuses
+        self.methods = self.default_methods if methods is None else frozenset(methods)
+
+        self.retries = 0
+        self.retry_delay = 0.0
+        self._lock = threading.Lock()
+
+    def should_retry(self, method: str, attempt: int, response: requests.Response = None,
+                     error: Exception = None) -> bool:
+        """
+        Decides whether a failed attempt should be retried.
+
+        :param method: The HTTP method of the request.
+        :param attempt: The number of the attempt that was made, starting at 1.
+        :param response: The response, if one was received.
+        :param error: The exception raised while performing the request, if any.
+        :return: Whether the request should be retried.
+        """
+        idempotent = method.upper() in self.methods
+
+        if error is not None:
+            if not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+                return False
+            return attempt < self.max_attempts and (idempotent or self._not_sent(error))
+
+        if response is None or response.status_code not in self.statuses:
+            return False
+        if not idempotent and response.status_code not in self.unprocessed_statuses:
+            return False
+
+        return attempt < self._max_attempts(response)
+
+    def delay(self, attempt: int, response: requests.Response = None) -> float:
+        """
+        Calculates the delay before the next attempt.
+
+        :param attempt: The number of the attempt that was made, starting at 1.
+        :param response: The response, if one was received.
+        :return: The delay in seconds.
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+
+        return delay
+
+    def wait(self, method: str, url: str, attempt: int, response: requests.Response = None, error: Exception = None):
+        """
+        Waits before the next attempt and records the retry.
+
+        :param method: The HTTP method of the request.
+        :param url: The URL of the request.
+        :param attempt: The number of the attempt that was made, starting at 1.
+        :param response: The response, if one was received.
+        :param error: The exception raised while performing the request, if any.
+        """
+        delay = self.delay(attempt, response)
+        reason = error if response is None else 'status %d' % response.status_code
+        logger.warning("API request %s %s failed (%s), retrying in %.2f seconds (attempt %d of %d)" % (
+            method, url, reason, delay, attempt + 1, self._max_attempts(response),
+        ))
+
+        with self._lock:
+            self.retries += 1
+            self.retry_delay += delay
+
+        time.sleep(delay)
+
+    def _max_attempts(self, response: requests.Response = None) -> int:
+        """
+        Returns the maximum number of attempts in effect for a failed attempt.
+
+        :param response: The response, if one was received.
+        :return: The maximum number of attempts for the status of the response, or the default maximum.
+        """
+        max_attempts = self.statuses.get(response.status_code) if response is not None else None
+        return self.max_attempts if max_attempts is None else max_attempts
+
+    @staticmethod
+    def _not_sent(error: Exception) -> bool:
+        """
+        Checks whether a request certainly did not reach the server.
+
+        :param error: The exception raised while performing the request.
+        :return: Whether the request was not sent.
+        """
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        return isinstance(reason, MaxRetryError) and isinstance(reason.reason, NewConnectionError)
@@ -0,0 +1,89 @@
+import io
+import mimetypes
+import os
+import uuid
+
+
+class MultipartStream(object):
+    """
+    Streaming ``multipart/form-data`` request body containing a single file.
+
+    The file is read in chunks while the request is sent, so it is never loaded into memory as a whole. When the size of
+    the file can be determined, the length of the body is known in advance and a regular request is sent, which is read
+    from the initial position of the file again when it is retried. Otherwise, the body is sent using chunked transfer
+    encoding and cannot be sent again, so the request is not retried.
+
+    :param field: The name of the form field.
+    :param fileobj: The file object to read from, opened in binary mode.
+    :param filename: The file name to send, defaults to the name of the file object.
+    :param content_type: The content type of the file, guessed from the file name when omitted.
+    :param chunk_size: The number of bytes to read at once.
+    """
+    def __init__(self, field: str, fileobj, filename: str = None, content_type: str = None, chunk_size: int = 65536):
+        if filename is None:
+            filename = os.path.basename(getattr(fileobj, 'name', None) or 'file')
+        if content_type is None:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+
+        self._head = (
+            '--%s\r\n'
+            'Content-Disposition: form-data; name="%s"; filename="%s"\r\n'
+            'Content-Type: %s\r\n'
+            '\r\n' % (self.boundary, self._quote(field), self._quote(filename), content_type)
+        ).encode('utf-8')
+        self._tail = ('\r\n--%s--\r\n' % self.boundary).encode('utf-8')
+
+        try:
+            self._start = fileobj.tell()
+            fileobj.seek(0, io.SEEK_END)
+            file_size = fileobj.tell() - self._start
+            fileobj.seek(self._start)
+        except (AttributeError, OSError, ValueError):
+            self._start = None
+            self.size = None
+        else:
+            self.size = len(self._head) + file_size + len(self._tail)
+
+    @property
+    def replayable(self) -> bool:
+        """
+        Whether the body can be sent again, e.g. when a request is retried, which requires a seekable file.
+        """
+        return self._start is not None
+
+    @property
+    def body(self):
+        """
+        The request body to pass to requests: the stream itself when its length is known, an iterator otherwise.
+        """
+        return self if self.replayable else iter(self)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        if self._start is not None:
+            self.fileobj.seek(self._start)
+
+        yield self._head
+        while True:
+            chunk = self.fileobj.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        yield self._tail
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        """
+        Escapes a value for use in a quoted header parameter.
+
+        :param value: The value.
+        :return: The escaped value.
+        """
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\r', ' ').replace('\n', ' ')
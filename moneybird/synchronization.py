@@ -0,0 +1,106 @@
+import logging
+from collections import namedtuple
+
+from moneybird.api import MoneyBird
+from moneybird.filters import query_params
+
+logger = logging.getLogger('moneybird')
+
+SyncResult = namedtuple('SyncResult', ['updated', 'deleted', 'versions'])
+SyncResult.__doc__ = """
+Result of an incremental synchronization.
+
+:param updated: The full records which are new or have changed.
+:param deleted: The ids of the records which no longer exist remotely, always empty for filtered synchronizations.
+:param versions: The current remote versions of all records, by id.
+"""
+
+
+class Synchronizer(object):
+    """
+    Incremental synchronization of a resource using the synchronization endpoints of the API.
+
+    The synchronization endpoints list the id and version of every record of a resource. These versions are compared
+    with the locally known versions, after which only the new and changed records are requested in batches.
+
+    When the version listing is filtered, records missing from it may still exist remotely, so no deletions are
+    reported for filtered synchronizations.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.synchronization import Synchronizer
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'))
+        >>> sync = Synchronizer(moneybird, 'contacts', 123)
+        >>> result = sync.synchronize({'143273868766741508': 1450856630})
+        >>> [record['id'] for record in result.updated]
+        ['143273868766741508', '143273868766741509']
+        >>> result.deleted
+        []
+
+    :param moneybird: The API client to use.
+    :param resource_path: The resource path of the resource, e.g. ``contacts``.
+    :param administration_id: The administration id.
+    :param batch_size: The number of records to request at once (the API allows at most 100).
+    """
+    def __init__(self, moneybird: MoneyBird, resource_path: str, administration_id: int, batch_size: int = 100):
+        self.moneybird = moneybird
+        self.resource_path = resource_path
+        self.administration_id = administration_id
+        self.batch_size = batch_size
+
+    @property
+    def sync_path(self) -> str:
+        """
+        The resource path of the synchronization endpoint.
+        """
+        return '%s/synchronization' % self.resource_path
+
+    def versions(self, params: dict = None) -> dict:
+        """
+        Requests the current versions of all records of the resource.
+
+        :param params: Additional query parameters, e.g. a filter (optional).
+        :return: The versions of the records, by id.
+        """
+        return {
+            item['id']: item['version']
+            for item in self.moneybird.get(self.sync_path, self.administration_id, params=params)
+        }
+
+    @staticmethod
+    def diff(known: dict, remote: dict, filtered: bool = False) -> tuple:
+        """
+        Compares locally known versions with the remote versions.
+
+        :param known: The locally known versions, by id.
+        :param remote: The remote versions, by id.
+        :param filtered: Whether the remote versions were filtered, in which case no records are reported as deleted.
+        :return: 2-tuple containing the ids of new or changed records and the ids of deleted records.
+        """
+        changed = [id_ for id_, version in remote.items() if known.get(id_) != version]
+        deleted = [] if filtered else [id_ for id_ in known if id_ not in remote]
+        return changed, deleted
+
+    def fetch(self, ids: list):
+        """
+        Requests the full records for the given ids, in batches.
+
+        :param ids: The ids of the records.
+        :return: A generator yielding the records.
+        """
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start:start + self.batch_size]
+            logger.debug("Synchronizing %d records of %s" % (len(batch), self.resource_path))
+            yield from self.moneybird.post(self.sync_path, {'ids': batch}, self.administration_id)
+
+    def synchronize(self, known: dict, params: dict = None) -> SyncResult:
+        """
+        Performs an incremental synchronization.
+
+        :param known: The locally known versions, by id.
+        :param params: Additional query parameters for the version listing, e.g. a filter (optional).
+        :return: The result of the synchronization.
+        """
+        remote = self.versions(params)
+        changed, deleted = self.diff(known, remote, filtered=bool(query_params(params)))
+        return SyncResult(list(self.fetch(changed)), deleted, remote)
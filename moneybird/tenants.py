@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from moneybird.api import MoneyBird
+from moneybird.throttling import RateLimiter
+from moneybird.transport import RequestsTransport, Transport
+
+logger = logging.getLogger('moneybird')
+
+
+class ClientPool(object):
+    """
+    Pool of API clients for many tenants, e.g. the customers of an application, which all share one connection pool.
+
+    Every tenant gets its own client with its own authentication and rate limiter, since the API limits the requests per
+    token. All clients use the same transport, so connections are reused across tenants and the number of open
+    connections does not grow with the number of tenants. Clients are created on first use. The least recently used
+    clients are evicted when the pool is full, and clients which have not been used for ``idle_timeout`` seconds are
+    evicted as well.
+
+    The clients of the pool share the transport, so :py:func:`moneybird.api.MoneyBird.close` and
+    :py:func:`moneybird.api.MoneyBird.renew_session` affect all tenants. The default transport does not keep cookies,
+    so no session state leaks between tenants; a custom transport should not keep cookies either.
+
+    Example:
+        >>> from moneybird import TokenAuthentication
+        >>> from moneybird.tenants import ClientPool
+        >>> pool = ClientPool(lambda tenant: TokenAuthentication(tokens[tenant]), maxsize=500)
+        >>> pool.get('customer-42').get('administrations')
+        [{'id': 123, 'name': 'Parkietje B.V.', ...
+
+    :param authentication_factory: A callable returning the authentication of a tenant, e.g. a
+        :py:class:`moneybird.tokens.TokenManager`.
+    :param maxsize: The maximum number of clients kept in the pool.
+    :param idle_timeout: The time in seconds after which unused clients are evicted (optional).
+    :param rate_limiter_factory: A callable returning the rate limiter of a tenant, or None for no rate limiting,
+        defaults to a new :py:class:`moneybird.throttling.RateLimiter` per tenant.
+    :param transport: The transport shared by all clients, defaults to a
+        :py:class:`moneybird.transport.RequestsTransport` with a pool of ``pool_maxsize`` connections and without
+        cookies.
+    :param pool_maxsize: The maximum number of connections to keep alive, when the default transport is used.
+    :param client_class: The client class.
+    :param client_options: Additional arguments for the clients, e.g. ``retry`` or ``metrics``, shared by all clients.
+    """
+    def __init__(self, authentication_factory, maxsize: int = 100, idle_timeout: float = None,
+                 rate_limiter_factory=None, transport: Transport = None, pool_maxsize: int = 10,
+                 client_class=MoneyBird, **client_options):
+        self.authentication_factory = authentication_factory
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.rate_limiter_factory = rate_limiter_factory or (lambda tenant: RateLimiter())
+        self.transport = transport or RequestsTransport(pool_maxsize=pool_maxsize, cookies=False)
+        self.client_class = client_class
+        self.client_options = client_options
+
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant) -> MoneyBird:
+        """
+        Returns the client of a tenant, creating it when needed.
+
+        New clients are created without holding the lock of the pool, since creating the authentication may be slow,
+        e.g. when it reads a token store. When two threads create the client of a tenant at the same time, the client
+        which is added to the pool first is used by both.
+
+        :param tenant: The tenant, e.g. a customer id.
+        :return: The client.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            if tenant in self._clients:
+                return self._use(tenant, self._clients.pop(tenant)[0], now)
+
+        client = self.client_class(
+            self.authentication_factory(tenant),
+            rate_limiter=self.rate_limiter_factory(tenant),
+            transport=self.transport,
+            **self.client_options
+        )
+
+        with self._lock:
+            if tenant in self._clients:
+                return self._use(tenant, self._clients.pop(tenant)[0], now)
+            logger.debug("API client created for tenant %s" % (tenant,))
+            return self._use(tenant, client, now)
+
+    def evict(self, tenant):
+        """
+        Removes the client of a tenant, e.g. when its authorization was revoked.
+
+        :param tenant: The tenant.
+        """
+        with self._lock:
+            self._clients.pop(tenant, None)
+
+    def close(self):
+        """
+        Removes all clients and closes all pooled connections.
+        """
+        with self._lock:
+            self._clients.clear()
+        self.transport.close()
+
+    def __getitem__(self, tenant) -> MoneyBird:
+        return self.get(tenant)
+
+    def __contains__(self, tenant) -> bool:
+        with self._lock:
+            return tenant in self._clients
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _use(self, tenant, client: MoneyBird, now: float) -> MoneyBird:
+        """
+        Stores the client of a tenant as the most recently used client, evicting the least recently used clients when
+        the pool is full. Must be called with the lock held.
+
+        :param tenant: The tenant.
+        :param client: The client.
+        :param now: The current monotonic time.
+        :return: The client.
+        """
+        self._clients[tenant] = (client, now)
+        while len(self._clients) > self.maxsize:
+            evicted, _ = self._clients.popitem(last=False)
+            logger.debug("API client evicted for tenant %s" % (evicted,))
+        return client
+
+    def _evict_idle(self, now: float):
+        """
+        Removes the clients which have not been used for longer than the idle timeout. Must be called with the lock
+        held.
+
+        :param now: The current monotonic time.
+        """
+        if self.idle_timeout is None:
+            return
+        while self._clients:
+            tenant, (_, used_at) = next(iter(self._clients.items()))
+            if now - used_at <= self.idle_timeout:
+                break
+            del self._clients[tenant]
+            logger.debug("API client evicted for idle tenant %s" % (tenant,))
@@ -0,0 +1,361 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+from moneybird.api import MoneyBird
+from moneybird.authentication import TokenAuthentication
+
+
+class FakeMoneyBird(object):
+    """
+    Local stand-in for the MoneyBird API, for tests and benchmarks which should not depend on the real API.
+
+    The server runs in a background thread and implements a small part of the API: administrations, and listing,
+    creating, reading, changing and deleting records of resources like contacts and sales invoices, including
+    pagination and the synchronization endpoints. It can be configured to throttle requests and to fail randomly.
+
+    Example:
+        >>> from moneybird.testing import FakeMoneyBird
+        >>> with FakeMoneyBird(contacts=500) as server:
+        ...     moneybird = server.client()
+        ...     len(list(moneybird.iter('contacts', server.administration_id)))
+        500
+
+    :param token: The access token which is accepted.
+    :param contacts: The number of contacts to create.
+    :param sales_invoices: The number of sales invoices to create.
+    :param rate_limit: The number of requests allowed per ``rate_window`` seconds, unlimited when None.
+    :param rate_window: The length of the rate limit window in seconds.
+    :param error_rate: The fraction of requests which fail with a server error.
+    :param latency: The time in seconds to wait before responding.
+    :param seed: The seed for the generated data and the random errors.
+    """
+    administration_id = 123456789
+
+    def __init__(self, token: str = 'test_token', contacts: int = 100, sales_invoices: int = 100,
+                 rate_limit: int = None, rate_window: float = 300, error_rate: float = 0.0, latency: float = 0.0,
+                 seed: int = 0):
+        self.token = token
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.latency = latency
+
+        self.requests = 0
+        self.data = {}
+        self._random = random.Random(seed)
+        self._ids = iter(range(10 ** 17, 10 ** 18))
+        self._window = (time.time(), 0)
+        self._last_version = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self.administrations = [{
+            'id': self.administration_id,
+            'name': 'Parkietje B.V.',
+            'language': 'nl',
+            'currency': 'EUR',
+            'country': 'NL',
+            'time_zone': 'Europe/Amsterdam',
+        }]
+        for i in range(contacts):
+            self.create('contacts', self._contact(i))
+        for i in range(sales_invoices):
+            self.create('sales_invoices', self._sales_invoice(i))
+
+    @property
+    def base_url(self) -> str:
+        """
+        The base URL to use as :py:attr:`moneybird.api.MoneyBird.base_url`.
+        """
+        return 'http://%s:%d/api/' % self._server.server_address[:2]
+
+    def start(self) -> 'FakeMoneyBird':
+        """
+        Starts the server in a background thread.
+
+        :return: The server.
+        """
+        server = self._server = _Server(('127.0.0.1', 0), _Handler)
+        server.fake = self
+        self._thread = threading.Thread(target=server.serve_forever, name='FakeMoneyBird', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def client(self, client_class=None, **kwargs):
+        """
+        Creates a client which uses this server.
+
+        :param client_class: The client class, defaults to :py:class:`moneybird.api.MoneyBird`.
+        :param kwargs: Additional arguments for the client.
+        :return: The client.
+        """
+        return fake_client(self.base_url, self.token, client_class, **kwargs)
+
+    def create(self, resource: str, record: dict) -> dict:
+        """
+        Adds a record to a resource.
+
+        :param resource: The resource, e.g. ``contacts``.
+        :param record: The fields of the record.
+        :return: The stored record.
+        """
+        with self._lock:
+            record = dict(record, id=str(next(self._ids)), administration_id=self.administration_id)
+            record['version'] = self._version()
+            self.data.setdefault(resource, OrderedDict())[record['id']] = record
+            return record
+
+    def update(self, resource: str, id_: str, fields: dict) -> dict:
+        """
+        Changes a record.
+
+        :param resource: The resource, e.g. ``contacts``.
+        :param id_: The id of the record.
+        :param fields: The fields to change.
+        :return: The changed record.
+        """
+        with self._lock:
+            record = self.data[resource][id_]
+            record.update(fields)
+            record['version'] = self._version()
+            return record
+
+    def delete(self, resource: str, id_: str) -> dict:
+        """
+        Removes a record.
+
+        :param resource: The resource, e.g. ``contacts``.
+        :param id_: The id of the record.
+        :return: The removed record.
+        """
+        with self._lock:
+            return self.data[resource].pop(id_)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _version(self) -> int:
+        """
+        Generates a new record version. Must be called with the lock held.
+
+        :return: The version.
+        """
+        self._last_version = max(int(time.time()), self._last_version + 1)
+        return self._last_version
+
+    def _contact(self, i: int) -> dict:
+        return {
+            'company_name': 'Company %d B.V.' % i,
+            'firstname': self._random.choice(['Jan', 'Piet', 'Klaas', 'Marieke', 'Anne']),
+            'lastname': 'Jansen',
+            'address1': 'Straat %d' % i,
+            'zipcode': '1234 AB',
+            'city': 'Amsterdam',
+            'country': 'NL',
+            'email': 'info@company%d.example' % i,
+            'customer_id': str(1000 + i),
+            'delivery_method': 'Email',
+            'notes': [],
+            'custom_fields': [],
+            'contact_people': [],
+            'events': [],
+        }
+
+    def _sales_invoice(self, i: int) -> dict:
+        contacts = list(self.data.get('contacts') or [None])
+        price = self._random.randint(100, 100000) / 100.0
+        return {
+            'contact_id': contacts[i % len(contacts)],
+            'invoice_id': '2016-%04d' % i,
+            'state': self._random.choice(['draft', 'open', 'paid', 'late']),
+            'invoice_date': '2016-01-%02d' % (i % 28 + 1),
+            'currency': 'EUR',
+            'prices_are_incl_tax': False,
+            'total_price_excl_tax': '%.2f' % price,
+            'total_price_incl_tax': '%.2f' % (price * 1.21),
+            'details': [{
+                'id': str(i),
+                'description': 'Product %d' % i,
+                'price': '%.2f' % price,
+                'amount': '1',
+                'tax_rate_id': '1',
+            }],
+            'payments': [],
+            'notes': [],
+            'events': [],
+        }
+
+
+def fake_client(base_url: str, token: str = 'test_token', client_class=None, **kwargs):
+    """
+    Creates a client which uses a fake server, e.g. one running in another process.
+
+    :param base_url: The base URL of the server.
+    :param token: The access token to use.
+    :param client_class: The client class, defaults to :py:class:`moneybird.api.MoneyBird`.
+    :param kwargs: Additional arguments for the client.
+    :return: The client.
+    """
+    client_class = client_class or MoneyBird
+    client_class = type('Fake%s' % client_class.__name__, (client_class,), {'base_url': base_url})
+    return client_class(TokenAuthentication(token), **kwargs)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    path_pattern = re.compile(r'^/api/v2/(?:(\d+)/)?(.+?)(?:\.json)?$')
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self, method: str):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        content = self.rfile.read(length) if length else b''
+        body = None
+        if content and self.headers.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(content.decode('utf-8'))
+
+        with fake._lock:
+            fake.requests += 1
+            throttled = self._throttle(fake)
+            failed = fake.error_rate and fake._random.random() < fake.error_rate
+
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        if self.headers.get('Authorization') != 'Bearer %s' % fake.token:
+            return self._respond(401, {'error': 'Unauthorized'})
+        if throttled is not None:
+            return self._respond(429, {'error': 'Too many requests'}, throttled)
+        if failed:
+            return self._respond(500, {'error': 'Internal server error'})
+
+        url = urlsplit(self.path)
+        match = self.path_pattern.match(url.path)
+        if not match:
+            return self._respond(404, {'error': 'Not found'})
+
+        administration_id, path = match.groups()
+        if administration_id is None:
+            if path == 'administrations' and method == 'GET':
+                return self._respond(200, fake.administrations)
+            return self._respond(404, {'error': 'Not found'})
+        if int(administration_id) != fake.administration_id:
+            return self._respond(404, {'error': 'Administration not found'})
+
+        parts = path.split('/')
+        resource = parts[0]
+        records = fake.data.setdefault(resource, OrderedDict())
+        query = parse_qs(url.query)
+
+        if len(parts) == 1:
+            if method == 'GET':
+                page = int(query.get('page', ['1'])[0])
+                per_page = min(int(query.get('per_page', ['50'])[0]), 100)
+                with fake._lock:
+                    result = list(records.values())[(page - 1) * per_page:page * per_page]
+                return self._respond(200, result)
+            if method == 'POST':
+                fields = (body or {}).get(resource[:-1])
+                if not isinstance(fields, dict):
+                    return self._respond(422, {'error': {resource[:-1]: ['is missing']}})
+                return self._respond(201, fake.create(resource, fields))
+        elif parts[1:] == ['synchronization']:
+            if method == 'GET':
+                with fake._lock:
+                    result = [{'id': record['id'], 'version': record['version']} for record in records.values()]
+                return self._respond(200, result)
+            if method == 'POST':
+                ids = (body or {}).get('ids', [])
+                if len(ids) > 100:
+                    return self._respond(422, {'error': {'ids': ['too many ids']}})
+                with fake._lock:
+                    result = [records[id_] for id_ in ids if id_ in records]
+                return self._respond(200, result)
+        elif len(parts) == 2:
+            if parts[1] not in records:
+                return self._respond(404, {'error': 'Record not found'})
+            if method == 'GET':
+                return self._respond(200, records[parts[1]])
+            if method == 'PATCH':
+                return self._respond(200, fake.update(resource, parts[1], (body or {}).get(resource[:-1], {})))
+            if method == 'DELETE':
+                return self._respond(200, fake.delete(resource, parts[1]))
+
+        return self._respond(404, {'error': 'Not found'})
+
+    @staticmethod
+    def _throttle(fake: FakeMoneyBird):
+        """
+        Applies the rate limit. Must be called with the lock held.
+
+        :return: The rate limit headers when the request is throttled, None otherwise.
+        """
+        if fake.rate_limit is None:
+            return None
+
+        start, count = fake._window
+        now = time.time()
+        if now - start >= fake.rate_window:
+            start, count = now, 0
+        count += 1
+        fake._window = (start, count)
+
+        if count > fake.rate_limit:
+            reset = start + fake.rate_window
+            return {
+                'Retry-After': '%d' % max(reset - now, 1),
+                'RateLimit-Limit': str(fake.rate_limit),
+                'RateLimit-Remaining': '0',
+                'RateLimit-Reset': '%d' % reset,
+            }
+        return None
+
+    def _respond(self, status: int, data, headers: dict = None):
+        content = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
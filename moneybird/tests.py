@@ -1,12 +1,62 @@
+import asyncio
+import csv
+import datetime
+import email.utils
+import io
+import json
 import os
-from unittest import TestCase
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import TestCase, IsolatedAsyncioTestCase, skipIf
+from unittest.mock import patch
 from urllib.parse import unquote
 
-from moneybird import TokenAuthentication, OAuthAuthentication, MoneyBird
+import requests
+
+from moneybird import TokenAuthentication, OAuthAuthentication, MoneyBird, AsyncMoneyBird
+from moneybird.authentication import Authentication, Token
+from moneybird.aio import aiohttp
+from moneybird.cli import main
+from moneybird.benchmark import compare, main as benchmark_main, percentile
+from moneybird.cache import CacheEntry, ConditionalCache, DiskBackend, MemoryBackend, ResponseCache
+from moneybird.coalescing import RequestCoalescer
+from moneybird.codecs import OrjsonCodec, orjson
+from moneybird.export import CSVWriter, Exporter, pyarrow
+from moneybird.filters import Filter, period, query_params
+from moneybird.metrics import CallbackHook, Histogram, MetricsAggregator, RequestEvent
+from moneybird.mirror import Mirror
+from moneybird.models import SalesInvoice, Contact
+from moneybird.retry import RetryPolicy
+from moneybird.synchronization import Synchronizer
+from moneybird.tokens import FileTokenStore, SQLiteTokenStore, TokenManager
+from moneybird.tenants import ClientPool
+from moneybird.testing import FakeMoneyBird, fake_client
+from moneybird.transport import HttpxTransport, RecordingTransport, ReplayTransport, Urllib3Transport, httpx_installed
+from moneybird.throttling import RateLimiter
+from moneybird.webhooks import WebhookDispatcher
 
 TEST_TOKEN = os.getenv('MONEYBIRD_TEST_TOKEN')
 
 
+def fake_response(data, status_code: int = 200, method: str = 'GET', url: str = 'https://moneybird.test/',
+                  headers: dict = None) -> requests.Response:
+    """
+    Builds a response object as returned by requests, for tests which do not need a server.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response.request = requests.Request(method, url).prepare()
+    response._content = json.dumps(data).encode('utf-8') if data is not None else b''
+    response._content_consumed = True
+    return response
+
+
 class TokenAuthenticationTest(TestCase):
     """
     Tests the behaviour of the TokenAuthentication implementation.
@@ -32,6 +82,35 @@ class TokenAuthenticationTest(TestCase):
         )
 
 
+class SessionAuthenticationTest(TestCase):
+    """
+    Tests the fallback for authentication implementations which only implement get_session.
+    """
+    class SessionAuthentication(Authentication):
+        def is_ready(self) -> bool:
+            return True
+
+        def get_session(self) -> requests.Session:
+            session = requests.Session()
+            session.headers.update({'Authorization': 'Bearer session_token'})
+            return session
+
+    def test_get_headers(self):
+        auth = self.SessionAuthentication()
+        with self.assertWarns(DeprecationWarning, msg="The fallback is not deprecated."):
+            headers = auth.get_headers()
+        self.assertEqual(headers, {'Authorization': 'Bearer session_token'}, "The session header was not used.")
+
+    def test_request(self):
+        def fake_request(session, method, url, **kwargs):
+            self.assertEqual(kwargs['headers']['Authorization'], 'Bearer session_token', "The request is not signed.")
+            return fake_response({'id': '1'}, method=method, url=url)
+
+        with patch.object(requests.Session, 'request', fake_request), self.assertWarns(DeprecationWarning):
+            self.assertEqual(MoneyBird(self.SessionAuthentication()).get('administrations'), {'id': '1'},
+                             "The request failed.")
+
+
 class OAuthAuthenticationTest(TestCase):
     """
     Tests the behaviour of the OAuthAuthentication implementation.
@@ -78,6 +157,375 @@ class OAuthAuthenticationTest(TestCase):
             states.append(state)
 
 
+class FakeMoneyBirdTest(TestCase):
+    """
+    Tests the client against the local fake server.
+    """
+    def setUp(self):
+        self.server = FakeMoneyBird(contacts=120).start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.client()
+        self.adm_id = self.server.administration_id
+
+    def test_contacts_roundtrip(self):
+        contact = self.api.post('contacts', {'contact': {'company_name': 'MoneyBird API'}}, self.adm_id)
+        self.assertIsNotNone(contact['id'], "The contact has not been created properly.")
+
+        result = self.api.patch('contacts/%s' % contact['id'], {'contact': {'firstname': 'No'}}, self.adm_id)
+        self.assertEqual(result['company_name'], 'MoneyBird API', "The contact has not been updated properly.")
+        self.assertEqual(result['firstname'], 'No', "The contact has not been updated properly.")
+
+        self.api.delete('contacts/%s' % contact['id'], administration_id=self.adm_id)
+        with self.assertRaises(MoneyBird.NotFound):
+            self.api.get('contacts/%s' % contact['id'], administration_id=self.adm_id)
+
+    def test_pagination(self):
+        self.assertEqual(len(list(self.api.iter('contacts', self.adm_id))), 120, "Not all pages were requested.")
+        self.assertEqual(len(self.api.get('contacts', self.adm_id)), 50, "The default page size is not applied.")
+
+    def test_synchronization(self):
+        result = Synchronizer(self.api, 'contacts', self.adm_id, batch_size=50).synchronize({})
+        self.assertEqual(len(result.updated), 120, "Not all records were synchronized.")
+
+    def test_fan_out(self):
+        results = self.api.fan_out('contacts', [self.adm_id, 987654321], paginate=True)
+        self.assertEqual([result.item for result in results], [self.adm_id, 987654321], "The order was not kept.")
+        self.assertEqual(len(results[0].result), 120, "Not all pages were requested.")
+        self.assertIsInstance(results[1].error, MoneyBird.NotFound, "The error was not collected.")
+
+        results = list(self.api.iter_fan_out('contacts/synchronization', workers=2))
+        self.assertEqual([result.item for result in results], [self.adm_id], "Not all administrations were queried.")
+        self.assertEqual(len(results[0].result), 120, "The results were not collected.")
+
+    def test_unauthorized(self):
+        with self.assertRaises(MoneyBird.Unauthorized):
+            fake_client(self.server.base_url, 'wrong').get('administrations')
+
+    def test_throttled(self):
+        self.server.rate_limit = 2
+        self.api.get('administrations')
+        self.api.get('administrations')
+        with self.assertRaises(MoneyBird.Throttled) as context:
+            self.api.get('administrations')
+        self.assertEqual(context.exception.status_code, 429, "The request was not throttled.")
+
+    def test_server_error(self):
+        self.server.error_rate = 0.5
+        retry = RetryPolicy(max_attempts=20, backoff_factor=0)
+        api = self.server.client(retry=retry)
+        for _ in range(10):
+            api.get('administrations')
+        self.assertGreater(retry.retries, 0, "No server errors were returned.")
+
+
+class TransportTest(TestCase):
+    """
+    Tests the transports.
+    """
+    def setUp(self):
+        self.server = FakeMoneyBird(contacts=120).start()
+        self.addCleanup(self.server.stop)
+        self.adm_id = self.server.administration_id
+
+    def test_urllib3(self):
+        api = self.server.client(transport=Urllib3Transport())
+        self.assertEqual(len(list(api.iter('contacts', self.adm_id))), 120, "The pages were not requested properly.")
+        contact = api.post('contacts', {'contact': {'company_name': 'MoneyBird API'}}, self.adm_id)
+        self.assertEqual(contact['company_name'], 'MoneyBird API', "The request body was not sent properly.")
+        with self.assertRaises(MoneyBird.NotFound):
+            api.get('contacts/1', self.adm_id)
+
+    def test_urllib3_connection_error(self):
+        api = fake_client('http://127.0.0.1:1/api/', transport=Urllib3Transport())
+        with self.assertRaises(requests.ConnectionError) as context:
+            api.get('administrations')
+        self.assertTrue(RetryPolicy._not_sent(context.exception), "The error was not converted like requests does.")
+
+    @skipIf(httpx_installed(), "httpx is installed")
+    def test_httpx_missing(self):
+        with self.assertRaises(ImportError, msg="A missing httpx package was not reported."):
+            HttpxTransport()
+
+    @skipIf(not httpx_installed(), "httpx is not installed")
+    def test_httpx(self):
+        api = self.server.client(transport=HttpxTransport())
+        self.assertEqual(len(list(api.iter('contacts', self.adm_id))), 120, "The pages were not requested properly.")
+        contact = api.post('contacts', {'contact': {'company_name': 'MoneyBird API'}}, self.adm_id)
+        self.assertEqual(contact['company_name'], 'MoneyBird API', "The request body was not sent properly.")
+        with self.assertRaises(MoneyBird.NotFound):
+            api.get('contacts/1', self.adm_id)
+
+    def test_record_replay(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'traffic.jsonl')
+        recorder = self.server.client(transport=RecordingTransport(Urllib3Transport(), path))
+        page = recorder.get('contacts', self.adm_id, params={'page': 2})
+        contact = recorder.post('contacts', {'contact': {'company_name': 'MoneyBird API'}}, self.adm_id)
+
+        replay = self.server.client(transport=ReplayTransport(path))
+        self.assertEqual(replay.get('contacts', self.adm_id, params={'page': 2}), page, "The page was not replayed.")
+        self.assertEqual(
+            replay.post('contacts', {'contact': {'company_name': 'MoneyBird API'}}, self.adm_id), contact,
+            "The created contact was not replayed.",
+        )
+        with self.assertRaises(requests.RequestException):
+            replay.post('contacts', {'contact': {'company_name': 'Other'}}, self.adm_id)
+
+
+class ClientPoolTest(TestCase):
+    """
+    Tests the multi-tenant client pool.
+    """
+    def setUp(self):
+        self.pool = ClientPool(lambda tenant: TokenAuthentication('token_%s' % tenant), maxsize=2)
+
+    def test_shared_connections(self):
+        first, second = self.pool.get('a'), self.pool['b']
+        self.assertIs(self.pool.get('a'), first, "The client of a tenant should be reused.")
+        self.assertIs(first.transport, second.transport, "The tenants should share the connection pool.")
+        self.assertIsNot(first.rate_limiter, second.rate_limiter, "The tenants should have their own rate limit.")
+
+        with patch.object(self.pool.transport.session, 'request', return_value=fake_response([])) as request:
+            first.get('administrations')
+            second.get('administrations')
+        self.assertEqual(
+            [call[1]['headers']['Authorization'] for call in request.call_args_list],
+            ['Bearer token_a', 'Bearer token_b'],
+            "The tenants were not authenticated separately.",
+        )
+
+    def test_eviction(self):
+        self.pool.get('a')
+        self.pool.get('b')
+        self.pool.get('a')
+        self.pool.get('c')
+        self.assertEqual(len(self.pool), 2, "The pool exceeds its maximum size.")
+        self.assertNotIn('b', self.pool, "The least recently used tenant was not evicted.")
+        self.assertIn('a', self.pool, "A recently used tenant was evicted.")
+
+    def test_cookies(self):
+        cookies = self.pool.transport.session.cookies
+        cookies.set('session', 'tenant_a', domain='moneybird.com')
+        self.assertEqual(len(cookies), 0, "A cookie of one tenant was kept for the others.")
+
+    def test_factory_unlocked(self):
+        def factory(tenant):
+            self.assertFalse(pool._lock.locked(), "The authentication was created while holding the lock.")
+            return TokenAuthentication(tenant)
+
+        pool = ClientPool(factory)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            clients = list(executor.map(pool.get, ['a'] * 8))
+        self.assertEqual(len({id(client) for client in clients}), 1, "Concurrently created clients were not shared.")
+
+    def test_idle_timeout(self):
+        pool = ClientPool(lambda tenant: TokenAuthentication(tenant), idle_timeout=0.05)
+        pool.get('a')
+        time.sleep(0.1)
+        pool.get('b')
+        self.assertNotIn('a', pool, "An idle tenant was not evicted.")
+
+
+class CommandLineTest(TestCase):
+    """
+    Tests the command-line tool against the local fake server.
+    """
+    def setUp(self):
+        self.server = FakeMoneyBird(contacts=30).start()
+        self.addCleanup(self.server.stop)
+        base_url = patch.object(MoneyBird, 'base_url', self.server.base_url)
+        base_url.start()
+        self.addCleanup(base_url.stop)
+
+    def run_command(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        argv = ['--token', 'test_token', '-a', str(self.server.administration_id)] + list(args)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = main(argv)
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_requests(self):
+        code, output, _ = self.run_command('post', 'contacts', '{"contact": {"company_name": "MoneyBird API"}}')
+        contact = json.loads(output)
+        self.assertEqual((code, contact['company_name']), (0, 'MoneyBird API'), "The contact was not created.")
+
+        code, output, _ = self.run_command('get', 'contacts/%s' % contact['id'])
+        self.assertEqual(json.loads(output), contact, "The contact was not returned.")
+
+        code, output, _ = self.run_command('--transport', 'urllib3', 'list', 'contacts', '--per-page', '7')
+        self.assertEqual(len(output.splitlines()), 31, "Not all records were listed.")
+
+        self.run_command('delete', 'contacts/%s' % contact['id'])
+        code, _, error = self.run_command('get', 'contacts/%s' % contact['id'])
+        self.assertEqual(code, 1, "The error was not reported in the exit code.")
+        self.assertIn('404', error, "The error was not reported.")
+
+    def test_export_sync(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        code, output, _ = self.run_command('export', 'contacts', '-d', directory.name, '-f', 'csv')
+        self.assertEqual(code, 0, "The export failed.")
+        self.assertIn('contacts: 30 records', output, "The export was not reported.")
+
+        database = os.path.join(directory.name, 'mirror.sqlite3')
+        code, output, _ = self.run_command('sync', 'contacts', '--database', database)
+        self.assertEqual(output, 'contacts: 30 updated, 0 deleted\n', "The resource was not synchronized.")
+
+    def test_lazy_imports(self):
+        code = (
+            'import sys, moneybird\n'
+            'print("requests" in sys.modules)\n'
+            'moneybird.MoneyBird\n'
+            'import moneybird.transport\n'
+            'print("requests" in sys.modules, "sqlite3" in sys.modules, "httpx" in sys.modules)\n'
+        )
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__)))
+        self.assertEqual(output.split(), [b'False', b'True', b'False', b'False'], "The client was not imported lazily.")
+
+    def test_invalid_environment(self):
+        stderr = io.StringIO()
+        with patch.dict(os.environ, {'MONEYBIRD_ADMINISTRATION_ID': 'abc'}), redirect_stderr(stderr):
+            with self.assertRaises(SystemExit) as context:
+                main(['--token', 'test_token', 'list', 'contacts'])
+        self.assertEqual(context.exception.code, 2, "The invalid environment variable was not a usage error.")
+        self.assertIn("invalid int value: 'abc'", stderr.getvalue(), "The invalid value was not reported.")
+
+
+class BenchmarkTest(TestCase):
+    """
+    Tests the evaluation of benchmark results.
+    """
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50, "The median is not correct.")
+        self.assertEqual(percentile(values, 99), 99, "The 99th percentile is not correct.")
+        self.assertIsNone(percentile([], 50), "A percentile of no values was calculated.")
+
+    def test_compare(self):
+        baseline = {'scenarios': {'get': {'throughput': 100.0, 'p50': 0.010}}}
+        results = {'scenarios': {'get': {'throughput': 80.0, 'p50': 0.0105}}}
+        comparison = {metric: regression for _, metric, _, _, _, regression in compare(baseline, results, 0.1)}
+        self.assertTrue(comparison['throughput'], "A lower throughput was not reported as a regression.")
+        self.assertFalse(comparison['p50'], "A change within the tolerance was reported as a regression.")
+
+    @skipIf(httpx_installed(), "httpx is installed")
+    def test_missing_transport(self):
+        with redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            benchmark_main(['get', '--transport', 'httpx'])
+        self.assertIn('requires the httpx package', stderr.getvalue(), "A missing transport was not reported.")
+
+
+class TokenManagerTest(TestCase):
+    """
+    Tests the shared token store and the refreshing of tokens.
+    """
+    def setUp(self):
+        self.oauth = OAuthAuthentication('https://example.test/login/oauth/', 'test_client', 'test_secret')
+        self.refreshes = []
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def fake_post(self, url, data, timeout=None):
+        time.sleep(0.05)
+        self.assertEqual(timeout, self.oauth.timeout, "The token request has no timeout.")
+        self.refreshes.append(data)
+        return fake_response({
+            'access_token': 'token_%d' % len(self.refreshes),
+            'refresh_token': 'refresh_%d' % len(self.refreshes),
+            'expires_in': 7200,
+        }, method='POST', url=url)
+
+    def test_oauth_refresh(self):
+        self.oauth.set_token(Token('old_token', 'refresh_0', None))
+        with patch.object(requests, 'post', self.fake_post):
+            token = self.oauth.refresh()
+        self.assertEqual(self.refreshes[0]['refresh_token'], 'refresh_0', "The refresh token was not sent.")
+        self.assertEqual(self.refreshes[0]['grant_type'], 'refresh_token', "The wrong grant type was used.")
+        self.assertEqual(token.refresh_token, 'refresh_1', "The new refresh token was not kept.")
+        self.assertAlmostEqual(token.expires_at, time.time() + 7200, delta=10, msg="The expiry time is not correct.")
+        self.assertEqual(self.oauth.get_headers()['Authorization'], 'Bearer token_1', "The new token is not used.")
+
+    def test_expired(self):
+        manager = TokenManager(self.oauth, key='adm')
+        manager.save(Token('old_token', 'refresh_0', time.time() - 1))
+        headers = []
+        with patch.object(requests, 'post', self.fake_post):
+            threads = [threading.Thread(target=lambda: headers.append(manager.get_headers())) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(self.refreshes), 1, "Concurrent refreshes were not collapsed into one.")
+        self.assertEqual({header['Authorization'] for header in headers}, {'Bearer token_1'}, "An old token was used.")
+
+    def test_proactive(self):
+        manager = TokenManager(self.oauth, key='adm', refresh_margin=300)
+        manager.save(Token('old_token', 'refresh_0', time.time() + 60))
+        with patch.object(requests, 'post', self.fake_post):
+            self.assertEqual(manager.get_headers()['Authorization'], 'Bearer old_token', "The request was stalled.")
+            with manager._lock:
+                pass
+        self.assertEqual(manager.get_headers()['Authorization'], 'Bearer token_1', "The token was not refreshed.")
+
+    def test_failed_refresh(self):
+        manager = TokenManager(self.oauth, key='adm', refresh_margin=300, retry_interval=60)
+        manager.save(Token('old_token', 'refresh_0', time.time() + 60))
+        error = {'error': 'server_error'}
+
+        def failing_post(url, data, timeout=None):
+            self.refreshes.append(data)
+            return fake_response(error, 400, method='POST', url=url)
+
+        with patch.object(requests, 'post', failing_post):
+            for _ in range(50):
+                self.assertEqual(manager.get_headers()['Authorization'], 'Bearer old_token', "The token was lost.")
+                with manager._lock:
+                    pass
+            self.assertEqual(len(self.refreshes), 1, "A failed refresh was retried without waiting.")
+
+            error = {'error': 'invalid_grant'}
+            manager._retry_at = 0.0
+            for _ in range(50):
+                manager.get_headers()
+                with manager._lock:
+                    pass
+            self.assertEqual(len(self.refreshes), 2, "A rejected refresh token was retried in the background.")
+
+            manager.save(Token('old_token', 'refresh_0', time.time() - 1))
+            with self.assertRaises(OAuthAuthentication.OAuthError, msg="An expired token did not raise the error."):
+                manager.get_headers()
+        self.assertEqual(len(self.refreshes), 3, "The expired token was not refreshed in the foreground.")
+
+    def test_shared_store(self):
+        for store in (FileTokenStore(os.path.join(self.directory, 'tokens.json')),
+                      SQLiteTokenStore(os.path.join(self.directory, 'tokens.sqlite3'))):
+            self.refreshes = []
+            store.set('adm', Token('old_token', 'refresh_0', time.time() - 1))
+            first, second = TokenManager(self.oauth, store, 'adm'), TokenManager(self.oauth, store, 'adm')
+            with patch.object(requests, 'post', self.fake_post):
+                first.refresh()
+                second.get_headers()
+            self.assertEqual(len(self.refreshes), 1, "The token refreshed by another worker was not used.")
+            self.assertEqual(second.token, store.get('adm'), "The stored token is not used.")
+
+    def test_sqlite_lock(self):
+        store = SQLiteTokenStore(os.path.join(self.directory, 'tokens.sqlite3'))
+        self.addCleanup(store.close)
+        store.set('adm', Token('old_token', 'refresh_0', None))
+        tokens = []
+        with store.lock('adm'):
+            store.set('adm', Token('new_token', 'refresh_1', None))
+            thread = threading.Thread(target=lambda: tokens.append(store.get('adm')))
+            thread.start()
+            thread.join(5)
+            self.assertEqual(store.get('adm').access_token, 'new_token', "The lock holder does not see its changes.")
+        self.assertEqual([token.access_token for token in tokens], ['old_token'], "Reading waited for the lock.")
+        self.assertEqual(store.get('adm').access_token, 'new_token', "The refreshed token was not committed.")
+
+
 class APIConnectionTest(TestCase):
     """
     Tests whether a connection to the API can be made.
@@ -137,3 +585,1173 @@ class APIConnectionTest(TestCase):
             pass
         else:
             self.fail("The contact has not been deleted properly.")
+
+
+class SessionTest(TestCase):
+    """
+    Tests the session and connection pool management of the client.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'), pool_maxsize=32)
+
+    def test_session(self):
+        session = self.api.session
+        self.assertIs(self.api.session, session, "The session of a thread should be reused.")
+        adapter = session.get_adapter(MoneyBird.base_url)
+        self.assertIs(adapter, self.api.transport.adapter, "The shared pool is not used.")
+        self.assertEqual(self.api.transport.adapter._pool_maxsize, 32, "The pool size was not applied.")
+
+    def test_headers(self):
+        with patch.object(self.api.session, 'request', return_value=fake_response([])) as request:
+            self.api.get('administrations')
+        headers = request.call_args[1]['headers']
+        self.assertEqual(headers['Authorization'], 'Bearer test_token', "The request is not authenticated.")
+        self.assertEqual(headers['Accept'], 'application/json', "The default headers were not sent.")
+
+    def test_threads(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(self.api.session)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(map(id, sessions + [self.api.session]))), 5, "Threads should not share sessions.")
+        self.assertTrue(
+            all(session.get_adapter(MoneyBird.base_url) is self.api.transport.adapter for session in sessions),
+            "Threads should share the connection pool.",
+        )
+
+    def test_renew_session(self):
+        session = self.api.session
+        self.api.renew_session()
+        self.assertIsNot(self.api.session, session, "The session was not renewed.")
+        adapter = self.api.session.get_adapter(MoneyBird.base_url)
+        self.assertIs(adapter, self.api.transport.adapter, "The pool was not kept.")
+
+
+class BulkTest(TestCase):
+    """
+    Tests the concurrent bulk operations.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.lock = threading.Lock()
+        self.active = self.max_active = 0
+
+    def fake_request(self, method, url, data=None, **kwargs):
+        data = json.loads(data.decode('utf-8'))
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if data['contact']['firstname'] == 'invalid':
+            return fake_response({'error': {'firstname': ['is invalid']}}, 422, method, url)
+        return fake_response(data['contact'], 201, method, url)
+
+    def test_bulk_post(self):
+        names = ['invalid' if i % 7 == 3 else 'name %d' % i for i in range(30)]
+        items = [('contacts', {'contact': {'firstname': name}}) for name in names]
+
+        with patch.object(requests.Session, 'request', self.fake_request):
+            results = self.api.bulk_post(items, 123, workers=5)
+
+        self.assertEqual([result.item for result in results], items, "The results are not in the order of the input.")
+        for name, result in zip(names, results):
+            if name == 'invalid':
+                self.assertFalse(result.ok, "A failed item was reported as successful.")
+                self.assertIsInstance(result.error, MoneyBird.InvalidData, "The error of a failed item is incorrect.")
+            else:
+                self.assertTrue(result.ok, "A successful item was reported as failed.")
+                self.assertEqual(result.result, {'firstname': name}, "The result of an item is incorrect.")
+        self.assertLessEqual(self.max_active, 5, "More requests than the number of workers were performed at once.")
+        self.assertGreater(self.max_active, 1, "The requests were not performed concurrently.")
+
+
+class CodecTest(TestCase):
+    """
+    Tests the encoding of requests and decoding of responses.
+    """
+    def test_request(self):
+        api = MoneyBird(TokenAuthentication('test_token'))
+        with patch.object(api.session, 'request', return_value=fake_response({'id': 1}, 201)) as request:
+            api.post('contacts', {'contact': {'firstname': 'John'}}, 123)
+        kwargs = request.call_args[1]
+        self.assertEqual(kwargs['data'], b'{"contact":{"firstname":"John"}}', "The request body was not encoded.")
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json', "The content type was not set.")
+
+    def test_process_response(self):
+        self.assertEqual(MoneyBird._process_response(fake_response({'id': 1})), {'id': 1}, "Decoding failed.")
+        self.assertIsNone(MoneyBird._process_response(fake_response(None, 204)), "An empty body should give None.")
+        with self.assertRaises(MoneyBird.InvalidData) as context:
+            MoneyBird._process_response(fake_response({'error': 'Invalid'}, 422))
+        self.assertIn('Invalid', str(context.exception), "The error description was not used.")
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        codec = OrjsonCodec()
+        data = {'contact': {'firstname': 'Jöhn', 'amount': '1.50'}}
+        self.assertEqual(codec.decode(codec.encode(data)), data, "The codec does not round-trip data.")
+        self.assertEqual(MoneyBird._process_response(fake_response(data), codec=codec), data, "Decoding failed.")
+
+
+class ResourceTest(TestCase):
+    """
+    Tests the resource-oriented interface.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.administration = self.api.administration(123)
+
+    def test_urls(self):
+        contacts = self.administration.contacts
+        self.assertIs(self.administration.contacts, contacts, "Resources should be reused.")
+        self.assertEqual(contacts.collection_url, MoneyBird._get_url(123, 'contacts'), "The collection URL is wrong.")
+        self.assertEqual(
+            self.administration.resource('documents/purchase_invoices').collection_url,
+            MoneyBird._get_url(123, 'documents/purchase_invoices'),
+            "The URL of a nested resource path is wrong.",
+        )
+
+    def test_requests(self):
+        contacts = self.administration.contacts
+        expected = [
+            ('GET', MoneyBird._get_url(123, 'contacts'), lambda: contacts.list()),
+            ('GET', MoneyBird._get_url(123, 'contacts/1'), lambda: contacts.get(1)),
+            ('POST', MoneyBird._get_url(123, 'contacts'), lambda: contacts.create({'contact': {}})),
+            ('PATCH', MoneyBird._get_url(123, 'contacts/1'), lambda: contacts.update(1, {'contact': {}})),
+            ('DELETE', MoneyBird._get_url(123, 'contacts/1'), lambda: contacts.delete(1)),
+        ]
+        for method, url, call in expected:
+            with patch.object(self.api.session, 'request', return_value=fake_response({'id': 1})) as request:
+                self.assertEqual(call(), {'id': 1}, "The response was not returned.")
+            self.assertEqual(request.call_args[1]['method'], method, "The HTTP method is wrong.")
+            self.assertEqual(request.call_args[1]['url'], url, "The URL is wrong.")
+
+    def test_iterate(self):
+        pages = [[{'id': str(i)} for i in range(100)], [{'id': 'last'}]]
+        with patch.object(self.api.session, 'request', side_effect=[fake_response(page) for page in pages]):
+            self.assertEqual(len(list(self.administration.contacts.iterate())), 101, "Not all records were returned.")
+
+
+class RecordTest(TestCase):
+    """
+    Tests the compact record models.
+    """
+    def setUp(self):
+        self.data = {
+            'id': '1',
+            'invoice_id': '2016-0001',
+            'state': 'open',
+            'details': [{'id': '2', 'description': 'Parkiet', 'price': '10.0'}],
+            'new_field': 'preserved',
+        }
+
+    def test_fields(self):
+        invoice = SalesInvoice(self.data)
+        self.assertFalse(hasattr(invoice, '__dict__'), "Records should not have an instance dictionary.")
+        self.assertEqual(invoice.invoice_id, '2016-0001', "A field was not stored.")
+        self.assertEqual(invoice['state'], 'open', "Fields should be accessible by key.")
+        self.assertIsNone(invoice.due_date, "Missing known fields should be None.")
+        self.assertEqual(invoice.new_field, 'preserved', "Unknown fields should be preserved.")
+        with self.assertRaises(AttributeError):
+            invoice.nonexistent
+
+    def test_nested(self):
+        invoice = SalesInvoice(self.data)
+        self.assertIsInstance(invoice._details, bytes, "Nested fields should be stored encoded.")
+        self.assertEqual(invoice.details, self.data['details'], "A nested field was not decoded properly.")
+        invoice.details = []
+        self.assertEqual(invoice.details, [], "A nested field was not changed.")
+
+    def test_to_dict(self):
+        self.assertEqual(SalesInvoice(self.data).to_dict(), self.data, "The record does not round-trip.")
+        self.assertEqual(Contact(self.data), Contact(self.data), "Equal records should compare equal.")
+        self.assertEqual(
+            list(Contact.from_dicts([{'id': '1'}, {'id': '2'}])),
+            [Contact({'id': '1'}), Contact({'id': '2'})],
+            "The records were not converted.",
+        )
+
+
+class ConditionalCacheTest(TestCase):
+    """
+    Tests the conditional request cache.
+    """
+    def setUp(self):
+        self.cache = ConditionalCache()
+        self.api = MoneyBird(TokenAuthentication('test_token'), conditional_cache=self.cache)
+        self.sent_headers = []
+
+    def fake_request(self, method, url, headers=None, **kwargs):
+        self.sent_headers.append(headers)
+        if headers and headers.get('If-None-Match') == '"v1"':
+            return fake_response(None, 304, method, url)
+        return fake_response([{'id': 1}], 200, method, url, headers={'ETag': '"v1"'})
+
+    def test_not_modified(self):
+        with patch.object(self.api.session, 'request', self.fake_request):
+            first = self.api.get('tax_rates', 123)
+            second = self.api.get('tax_rates', 123)
+        self.assertEqual(first, second, "The cached body was not used for a 304 response.")
+        self.assertNotIn('If-None-Match', self.sent_headers[0], "Validators were sent without a cached entry.")
+        self.assertEqual(self.sent_headers[1]['If-None-Match'], '"v1"', "The ETag was not sent.")
+
+    def test_credentials(self):
+        other = MoneyBird(TokenAuthentication('other_token'), conditional_cache=self.cache)
+        with patch.object(self.api.session, 'request', self.fake_request):
+            self.api.get('tax_rates', 123)
+        with patch.object(other.session, 'request', self.fake_request):
+            other.get('tax_rates', 123)
+        self.assertNotIn('If-None-Match', self.sent_headers[1], "Entries should not be shared between credentials.")
+
+    def test_ttl(self):
+        cache = ConditionalCache(ttl=10)
+        cache.backend.set('old', CacheEntry(b'[]', '"v1"', None, time.time() - 20))
+        cache.backend.set('new', CacheEntry(b'[]', '"v1"', None, time.time()))
+        self.assertEqual(cache.validators(cache.get('old')), {}, "An expired entry was used.")
+        self.assertEqual(cache.validators(cache.get('new')), {'If-None-Match': '"v1"'}, "A valid entry was not used.")
+
+    def test_not_modified_refreshes_entry(self):
+        for backend in (MemoryBackend(), DiskBackend(':memory:')):
+            cache = ConditionalCache(backend, ttl=10)
+            api = MoneyBird(TokenAuthentication('test_token'), conditional_cache=cache)
+            with patch.object(api.session, 'request', self.fake_request):
+                api.get('tax_rates', 123)
+                key, = backend.keys()
+                backend.set(key, backend.get(key)._replace(stored_at=time.time() - 8))
+                api.get('tax_rates', 123)
+            self.assertAlmostEqual(backend.get(key).stored_at, time.time(), delta=1,
+                                   msg="The entry was not refreshed by a 304 response.")
+            self.assertEqual(backend.get(key).content, b'[{"id": 1}]', "The cached body was changed.")
+
+    def test_evicted(self):
+        def fake_request(session, method, url, headers=None, **kwargs):
+            self.cache.backend.clear()
+            return self.fake_request(method, url, headers, **kwargs)
+
+        with patch.object(self.api.session, 'request', self.fake_request):
+            first = self.api.get('tax_rates', 123)
+        with patch.object(requests.Session, 'request', fake_request):
+            second = self.api.get('tax_rates', 123)
+        self.assertEqual(first, second, "The body of an entry evicted during the request was not used.")
+
+    def test_memory_backend(self):
+        backend = MemoryBackend(maxsize=2)
+        for key in ('a', 'b', 'c'):
+            backend.set(key, CacheEntry(key.encode(), None, None, 0))
+            backend.get('a')
+        self.assertEqual(sorted(backend.keys()), ['a', 'c'], "The least recently used entry was not evicted.")
+
+    def test_disk_backend(self):
+        backend = DiskBackend(':memory:', maxsize=2)
+        for key in ('a', 'b', 'c'):
+            backend.set(key, CacheEntry(key.encode(), '"%s"' % key, None, 0))
+        self.assertEqual(len(backend.keys()), 2, "The cache size was not bounded.")
+        self.assertEqual(backend.get('c'), CacheEntry(b'c', '"c"', None, 0), "The entry was not stored properly.")
+        backend.close()
+
+
+class ResponseCacheTest(TestCase):
+    """
+    Tests the response cache and its invalidation.
+    """
+    def setUp(self):
+        self.cache = ResponseCache(ttl=60)
+        self.api = MoneyBird(TokenAuthentication('test_token'), response_cache=self.cache)
+        self.requests = []
+
+    def fake_request(self, method, url, **kwargs):
+        self.requests.append((method, url))
+        return fake_response({'id': len(self.requests)}, 200, method, url)
+
+    def test_cached(self):
+        with patch.object(self.api.session, 'request', self.fake_request):
+            first = self.api.get('contacts/1', 123)
+            second = self.api.get('contacts/1', 123)
+            self.api.get('contacts/1', 456)
+        self.assertEqual(first, second, "The cached response was not used.")
+        self.assertEqual(len(self.requests), 2, "A cached response was requested again.")
+
+    def test_invalidation(self):
+        with patch.object(self.api.session, 'request', self.fake_request):
+            for path in ('contacts', 'contacts/1', 'contacts/synchronization', 'contacts_other', 'ledger_accounts'):
+                self.api.get(path, 123)
+            self.api.get('contacts/1', 456)
+            self.api.patch('contacts/1', {'contact': {}}, 123)
+            self.requests = []
+            for path in ('contacts', 'contacts/1', 'contacts/synchronization', 'contacts_other', 'ledger_accounts'):
+                self.api.get(path, 123)
+            self.api.get('contacts/1', 456)
+
+        self.assertEqual(
+            [url for method, url in self.requests],
+            [MoneyBird._get_url(123, path) for path in ('contacts', 'contacts/1', 'contacts/synchronization')],
+            "Only the responses of the changed resource should be dropped.",
+        )
+
+    def test_synchronization(self):
+        with patch.object(self.api.session, 'request', self.fake_request):
+            self.api.get('contacts', 123)
+            self.api.post('contacts/synchronization', {'ids': ['1']}, 123)
+            self.api.get('contacts', 123)
+            self.api.post('contacts/1/notes', {'note': {}}, 123)
+            self.api.get('contacts', 123)
+
+        self.assertEqual(
+            [method for method, url in self.requests],
+            ['GET', 'POST', 'POST', 'GET'],
+            "Only requests which change data should drop the cached responses.",
+        )
+
+    def test_expired(self):
+        cache = ResponseCache(ttl=10)
+        cache.backend.set('key', CacheEntry(b'[]', None, None, time.time() - 20))
+        self.assertIsNone(cache.get('key'), "An expired response was served.")
+
+    def test_existing_entries(self):
+        backend = MemoryBackend()
+        url = MoneyBird._get_url(123, 'contacts/1')
+        for key in (url, url + '?page=2', MoneyBird._get_url(123, 'ledger_accounts')):
+            backend.set(key, CacheEntry(b'[]', None, None, time.time()))
+        ResponseCache(backend).invalidate(MoneyBird._get_url(123, 'contacts'))
+        self.assertEqual(backend.keys(), [MoneyBird._get_url(123, 'ledger_accounts')],
+                         "The responses stored before the cache was created were not invalidated.")
+
+    def test_concurrent_write(self):
+        generation = self.cache.generation
+        self.cache.invalidate(MoneyBird._get_url(123, 'contacts/1'))
+        self.cache.store('key', fake_response([]), generation)
+        self.assertIsNone(self.cache.get('key'), "A response requested before a change was stored.")
+
+
+class CoalescingTest(TestCase):
+    """
+    Tests the coalescing of identical concurrent GET requests.
+    """
+    def test_coalescing(self):
+        server = FakeMoneyBird(latency=0.2).start()
+        self.addCleanup(server.stop)
+        metrics = MetricsAggregator()
+        coalescer = RequestCoalescer()
+        api = server.client(metrics=metrics, coalescer=coalescer)
+        barrier = threading.Barrier(8)
+
+        def get():
+            barrier.wait()
+            return api.get('administrations')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: get(), range(8)))
+
+        self.assertEqual(len({id(result) for result in results}), 8, "Callers share the decoded result.")
+        self.assertEqual(len({json.dumps(result) for result in results}), 1, "The results differ.")
+        self.assertGreater(coalescer.coalesced, 0, "No requests were coalesced.")
+        self.assertEqual(server.requests + coalescer.coalesced, 8, "Coalesced requests were sent.")
+        stats = metrics.snapshot()[('GET', 'administrations')]
+        self.assertEqual(stats['coalesced'], coalescer.coalesced, "The coalesced requests were not measured.")
+
+    def test_error(self):
+        coalescer = RequestCoalescer()
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            release.wait()
+            raise requests.ConnectionError("Failed")
+
+        def call():
+            try:
+                coalescer.call('key', fail)
+            except requests.ConnectionError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while coalescer.requests < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(errors), 3, "The error was not raised to every caller.")
+        self.assertEqual(coalescer.coalesced, 2, "The calls were not coalesced.")
+        self.assertEqual(coalescer.call('key', lambda: 'new'), ('new', False), "A finished call was shared.")
+
+
+class AsyncCoalescingTest(IsolatedAsyncioTestCase):
+    """
+    Tests the coalescing of identical concurrent coroutines.
+    """
+    def setUp(self):
+        self.coalescer = RequestCoalescer()
+        self.calls = 0
+
+    async def fetch(self, result='response', delay=0.01):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def test_call_async(self):
+        results = await asyncio.gather(*[self.coalescer.call_async('key', self.fetch) for _ in range(3)])
+        self.assertEqual(results, [('response', False), ('response', True), ('response', True)],
+                         "The call was not shared.")
+        self.assertEqual((self.calls, self.coalescer.requests), (1, 3), "The call was made more than once.")
+        result = await self.coalescer.call_async('key', self.fetch)
+        self.assertEqual(result, ('response', False), "A finished call was shared.")
+
+    async def test_error(self):
+        error = requests.ConnectionError("Failed")
+        results = await asyncio.gather(
+            *[self.coalescer.call_async('key', lambda: self.fetch(error)) for _ in range(3)], return_exceptions=True,
+        )
+        self.assertEqual(results, [error] * 3, "The error was not raised to every caller.")
+        self.assertEqual(self.calls, 1, "The failing call was made more than once.")
+
+    async def test_cancel(self):
+        first = asyncio.ensure_future(self.coalescer.call_async('key', lambda: self.fetch(delay=0.05)))
+        second = asyncio.ensure_future(self.coalescer.call_async('key', lambda: self.fetch(delay=0.05)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        self.assertEqual(await second, ('response', True), "Cancelling a caller cancelled the shared call.")
+        self.assertTrue(first.cancelled(), "The caller was not cancelled.")
+
+
+class StreamingTest(TestCase):
+    """
+    Tests the streaming downloads and uploads.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.content = os.urandom(200000)
+
+    def fake_download(self, method, url, headers=None, stream=False, **kwargs):
+        self.assertTrue(stream, "The download was not streamed.")
+        self.assertEqual(headers['Accept'], '*/*', "Binary responses should be accepted.")
+        response = fake_response(None, 200, method, url)
+        response._content = False
+        response._content_consumed = False
+        response.raw = io.BytesIO(self.content)
+        return response
+
+    def test_iter_download(self):
+        with patch.object(self.api.session, 'request', self.fake_download):
+            chunks = list(self.api.iter_download('sales_invoices/1/download_pdf', 123, chunk_size=65536))
+        self.assertEqual(b''.join(chunks), self.content, "The file was not downloaded correctly.")
+        self.assertEqual(max(map(len, chunks)), 65536, "The file was not downloaded in chunks.")
+
+    def test_download(self):
+        destination = io.BytesIO()
+        with patch.object(self.api.session, 'request', self.fake_download):
+            size = self.api.download('sales_invoices/1/download_pdf', destination, 123)
+        self.assertEqual(size, len(self.content), "The wrong size was returned.")
+        self.assertEqual(destination.getvalue(), self.content, "The file was not written correctly.")
+
+    def test_download_error(self):
+        with patch.object(self.api.session, 'request', return_value=fake_response({'error': 'Not found'}, 404)):
+            with self.assertRaises(MoneyBird.NotFound):
+                self.api.download('sales_invoices/1/download_pdf', io.BytesIO(), 123)
+
+    def test_upload(self):
+        def fake_upload(method, url, data=None, headers=None, **kwargs):
+            self.assertNotIsInstance(data, bytes, "The upload was not streamed.")
+            self.body = b''.join(data)
+            self.length = len(data)
+            self.content_type = headers['Content-Type']
+            return fake_response({'id': '1'}, 201, method, url)
+
+        with patch.object(self.api.session, 'request', fake_upload):
+            result = self.api.upload('documents/receipts/1/attachments', io.BytesIO(self.content), 123,
+                                     filename='receipt.pdf')
+
+        self.assertEqual(result, {'id': '1'}, "The response was not returned.")
+        self.assertEqual(self.length, len(self.body), "The announced length of the body is wrong.")
+        boundary = self.content_type.split('boundary=')[1]
+        self.assertTrue(self.body.startswith(('--%s\r\n' % boundary).encode()), "The body does not start properly.")
+        self.assertTrue(self.body.endswith(('\r\n--%s--\r\n' % boundary).encode()), "The body does not end properly.")
+        self.assertIn(b'filename="receipt.pdf"', self.body, "The file name was not sent.")
+        self.assertIn(b'Content-Type: application/pdf\r\n\r\n' + self.content, self.body, "The file was not sent.")
+
+    def test_upload_retry(self):
+        self.api.retry = RetryPolicy(backoff_factor=0, jitter=False)
+        bodies = []
+
+        def fake_upload(method, url, data=None, headers=None, **kwargs):
+            bodies.append(b''.join(data))
+            if len(bodies) == 1:
+                return fake_response({'error': 'Throttled'}, 429, method, url)
+            return fake_response({'id': '1'}, 201, method, url)
+
+        with patch.object(self.api.session, 'request', fake_upload):
+            result = self.api.upload('documents/receipts/1/attachments', io.BytesIO(self.content), 123)
+
+        self.assertEqual(result, {'id': '1'}, "The upload was not retried.")
+        self.assertEqual(bodies[0], bodies[1], "The retried upload did not send the whole file again.")
+        self.assertIn(self.content, bodies[1], "The file was not sent again.")
+
+        class Pipe(object):
+            def __init__(self, content):
+                self.read = io.BytesIO(content).read
+
+        bodies = []
+        with patch.object(self.api.session, 'request', fake_upload), self.assertRaises(MoneyBird.Throttled):
+            self.api.upload('documents/receipts/1/attachments', Pipe(self.content), 123)
+        self.assertEqual(len(bodies), 1, "An upload which cannot be sent again was retried.")
+
+
+class MetricsTest(TestCase):
+    """
+    Tests the per-request measurements.
+    """
+    def setUp(self):
+        self.events = []
+        self.api = MoneyBird(
+            TokenAuthentication('test_token'),
+            metrics=CallbackHook(self.events.append),
+            retry=RetryPolicy(backoff_factor=0, jitter=False),
+        )
+
+    def test_event(self):
+        responses = [fake_response({'error': 'Throttled'}, 429), fake_response({'id': '1'}, 201)]
+        with patch.object(self.api.session, 'request', side_effect=responses):
+            self.api.post('contacts/1/notes', {'note': {'note': 'Test'}}, 123)
+
+        event, = self.events
+        self.assertEqual((event.method, event.path, event.administration_id), ('POST', 'contacts/:id/notes', 123))
+        self.assertEqual(event.status_code, 201, "The status code was not recorded.")
+        self.assertEqual((event.attempts, event.retries, event.throttled), (2, 1, 1), "The retries were not recorded.")
+        self.assertEqual(event.bytes_sent, len(b'{"note":{"note":"Test"}}'), "The request size was not recorded.")
+        self.assertEqual(event.bytes_received, len(b'{"id": "1"}'), "The response size was not recorded.")
+        self.assertGreater(event.duration, 0, "The duration was not recorded.")
+        self.assertIsNone(event.error, "An error was recorded for a successful call.")
+
+    def test_error(self):
+        with patch.object(self.api.session, 'request', return_value=fake_response({'error': 'Not found'}, 404)):
+            with self.assertRaises(MoneyBird.NotFound):
+                self.api.get('contacts/1', 123)
+        self.assertEqual(self.events[0].error, 'NotFound', "The error was not recorded.")
+        self.assertEqual(self.events[0].status_code, 404, "The status code was not recorded.")
+
+    def test_path(self):
+        event = RequestEvent('GET', MoneyBird._get_url(None, 'administrations'))
+        self.assertEqual((event.path, event.administration_id), ('administrations', None), "The path is wrong.")
+
+    def test_aggregator(self):
+        aggregator = MetricsAggregator(buckets=(0.1, 1))
+        for duration, status in ((0.05, 200), (0.5, 200), (2, 500)):
+            event = RequestEvent('GET', MoneyBird._get_url(123, 'contacts/%d' % status))
+            event.duration = duration
+            event.status_code = status
+            event.attempts = 1
+            aggregator.record(event)
+
+        stats = aggregator.snapshot()[('GET', 'contacts/:id')]
+        self.assertEqual(stats['requests'], 3, "The requests were not counted.")
+        self.assertEqual(stats['statuses'], {200: 2, 500: 1}, "The status codes were not counted.")
+        self.assertEqual(stats['duration']['p50'], 1, "The median duration is wrong.")
+        self.assertEqual(stats['duration']['p99'], float('inf'), "The 99th percentile is wrong.")
+
+    def test_histogram(self):
+        histogram = Histogram((1, 2, 3))
+        self.assertIsNone(histogram.percentile(50), "An empty histogram has no percentiles.")
+        for value in (0.5, 1.5, 1.5, 2.5):
+            histogram.observe(value)
+        self.assertEqual([histogram.percentile(p) for p in (25, 50, 75, 100)], [1, 2, 2, 3], "Wrong percentiles.")
+
+
+class PaginationTest(TestCase):
+    """
+    Tests the lazy iteration over paginated list endpoints.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.records = [{'id': str(i)} for i in range(25)]
+        self.pages = []
+
+    def fake_request(self, method, url, params=None, **kwargs):
+        self.pages.append(params['page'])
+        start = (params['page'] - 1) * params['per_page']
+        return fake_response(self.records[start:start + params['per_page']], url=url)
+
+    def test_iter(self):
+        with patch.object(requests.Session, 'request', self.fake_request):
+            result = list(self.api.iter('contacts', 123, per_page=10))
+        self.assertEqual(result, self.records, "Not all records were returned in order.")
+        self.assertEqual(self.pages, [1, 2, 3], "The pages were not requested properly.")
+
+    def test_iter_lazy(self):
+        with patch.object(requests.Session, 'request', self.fake_request):
+            iterator = self.api.iter('contacts', 123, per_page=10)
+            self.assertEqual(self.pages, [], "Pages were requested before iteration started.")
+            next(iterator)
+            self.assertEqual(self.pages, [1], "More pages than necessary were requested.")
+
+    def test_iter_prefetch(self):
+        with patch.object(requests.Session, 'request', self.fake_request):
+            result = list(self.api.iter('contacts', 123, per_page=5, prefetch=True))
+        self.assertEqual(result, self.records, "Not all records were returned in order.")
+        self.assertEqual(self.pages, [1, 2, 3, 4, 5, 6], "The pages were not requested properly.")
+
+    def test_large_pages(self):
+        server = FakeMoneyBird(contacts=350).start()
+        self.addCleanup(server.stop)
+        api = server.client()
+        adm_id = server.administration_id
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.assertEqual(len(list(api.iter('contacts', adm_id, per_page=250))), 350, "Iteration stopped early.")
+        self.assertEqual(len(list(api.iter('contacts', adm_id, per_page=250, prefetch=True))), 350,
+                         "Iteration with prefetching stopped early.")
+        self.assertEqual(len(list(api.administration(adm_id).contacts.iterate(per_page=250))), 350,
+                         "Iteration over the resource stopped early.")
+        self.assertEqual(Exporter(api, adm_id, directory.name, per_page=250).export('contacts').records, 350,
+                         "The export stopped early.")
+
+    def test_invalid_pages(self):
+        self.assertEqual(list(MoneyBird._paginate(lambda page: None, 100, False)), [], "An empty page was not the end.")
+        with self.assertRaises(ValueError):
+            list(MoneyBird._paginate(lambda page: {'error': 'x'}, 100, True))
+
+
+class FilterTest(TestCase):
+    """
+    Tests the builder of server-side filters.
+    """
+    def test_format(self):
+        invoices = Filter(state=['open', 'late'], period=period(datetime.date(2024, 1, 1), datetime.date(2024, 3, 31)))
+        self.assertEqual(str(invoices), 'state:open|late,period:20240101..20240331', "The filter is not formatted.")
+        self.assertEqual(str(invoices.where(state='paid', contact_id=1, reference=None)),
+                         'state:paid,period:20240101..20240331,contact_id:1', "The conditions were not merged.")
+        self.assertEqual(str(invoices), 'state:open|late,period:20240101..20240331', "The filter was modified.")
+        self.assertEqual(str(Filter(updated_after=datetime.datetime(2024, 1, 2, 3, 4, 5)) & Filter(inactive=False)),
+                         'updated_after:2024-01-02T03:04:05,inactive:false', "The values are not formatted.")
+        with self.assertRaises(ValueError):
+            str(Filter(reference='a,b'))
+
+    def test_query_params(self):
+        self.assertEqual(query_params(Filter(state='open')), {'filter': 'state:open'}, "The filter was not converted.")
+        self.assertEqual(query_params({'filter': Filter(), 'query': 'x'}), {'query': 'x'}, "Empty filters were sent.")
+        self.assertIsNone(query_params(None), "Missing parameters were converted.")
+
+    def test_iter(self):
+        sent = []
+
+        def fake_request(session, method, url, params=None, **kwargs):
+            sent.append(params)
+            return fake_response([], url=url)
+
+        api = MoneyBird(TokenAuthentication('test_token'))
+        with patch.object(requests.Session, 'request', fake_request):
+            list(api.iter('sales_invoices', 123, params=Filter(state='open')))
+            api.administration(123).sales_invoices.list({'filter': Filter(contact_id=1), 'query': 'x'})
+        self.assertEqual(sent, [
+            {'filter': 'state:open', 'per_page': 100, 'page': 1},
+            {'filter': 'contact_id:1', 'query': 'x'},
+        ], "The filters were not sent.")
+
+
+class ExportTest(TestCase):
+    """
+    Tests the streaming export of resources against the local fake server.
+    """
+    def setUp(self):
+        self.server = FakeMoneyBird(contacts=120, sales_invoices=30).start()
+        self.addCleanup(self.server.stop)
+        self.api = self.server.client()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def read_ndjson(self, path):
+        with open(path) as fileobj:
+            return [json.loads(line) for line in fileobj]
+
+    def test_export_resume(self):
+        def interrupt(record):
+            if record['id'] == contacts[75]['id'] and not interrupted:
+                interrupted.append(record)
+                raise RuntimeError("Interrupted")
+            return record
+
+        contacts = list(self.api.iter('contacts', self.server.administration_id))
+        interrupted = []
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, per_page=25,
+                            transforms=[interrupt])
+        with self.assertRaises(RuntimeError):
+            exporter.export('contacts')
+
+        result = exporter.export('contacts')
+        self.assertTrue(result.resumed, "The export was not resumed.")
+        self.assertEqual((result.records, result.pages), (120, 5), "The export is incomplete.")
+        self.assertEqual(self.read_ndjson(result.path), contacts, "The records were not written exactly once.")
+        self.assertFalse(os.path.exists(result.path + '.checkpoint'), "The checkpoint was not removed.")
+
+    def test_export_all(self):
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, format='csv',
+                            transforms=[lambda record: record if int(record['id']) % 2 else None])
+        results = exporter.export_all(['contacts', 'sales_invoices', 'contacts/0'], workers=3)
+
+        self.assertEqual([result.result.records for result in results[:2]], [60, 15], "Not all records were exported.")
+        self.assertIsInstance(results[2].error, MoneyBird.NotFound, "The error was not collected.")
+        with open(results[1].result.path, newline='') as fileobj:
+            rows = list(csv.DictReader(fileobj))
+        self.assertEqual(len(rows), 15, "The CSV file is incomplete.")
+        self.assertIsInstance(json.loads(rows[0]['details']), list, "Nested fields were not written as JSON.")
+
+    def test_csv_fields(self):
+        path = os.path.join(self.directory, 'records.csv')
+        writer = CSVWriter(path)
+        self.assertIsNone(writer.checkpoint(), "A checkpoint was made before the columns were known.")
+        writer.write([{'id': '1'}])
+        with self.assertRaises(ValueError, msg="A field which is not in the header was dropped."):
+            writer.write([{'id': '2', 'extra': 'x'}])
+        writer.close()
+
+        writer = CSVWriter(path, fields=['id'])
+        writer.write([{'id': '1', 'extra': 'x'}])
+        writer = CSVWriter(path, writer.checkpoint(), fields=['id'])
+        writer.write([{'id': '2', 'extra': 'x'}])
+        writer.close()
+        with open(path, newline='') as fileobj:
+            self.assertEqual(list(csv.DictReader(fileobj)), [{'id': '1'}, {'id': '2'}], "The fields were not selected.")
+
+        def add_field(record):
+            return dict(record, extra='x') if record['id'].endswith('50') else record
+
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, format='csv', per_page=25,
+                            transforms=[add_field])
+        results = exporter.export_all(['contacts', 'sales_invoices'])
+        self.assertIsInstance(results[0].error, ValueError, "The error of an export was not collected.")
+        self.assertEqual(results[1].result.records, 30, "An export failed because of another export.")
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, format='parquet', batch_size=50)
+        result = exporter.export('contacts')
+        self.assertEqual(pyarrow.parquet.read_table(result.path).num_rows, 120, "The Parquet file is incomplete.")
+
+    @skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet_fields(self):
+        def add_field(record):
+            return dict(record, extra='x') if int(record['id'][-3:]) >= 25 else record
+
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, format='parquet', per_page=25,
+                            batch_size=25, transforms=[add_field])
+        with self.assertRaises(ValueError, msg="A field which first appears on the second page was dropped."):
+            exporter.export('contacts')
+
+        exporter.writer_options['fields'] = ['id', 'extra']
+        result = exporter.export('contacts')
+        table = pyarrow.parquet.read_table(result.path)
+        self.assertEqual(table.column_names, ['id', 'extra'], "The fields were not selected.")
+        self.assertEqual(table.column('extra').null_count, 25, "The field of the later pages was not written.")
+
+        exporter = Exporter(self.api, self.server.administration_id, self.directory, format='parquet', per_page=25,
+                            transforms=[add_field])
+        table = pyarrow.parquet.read_table(exporter.export('contacts').path)
+        self.assertIn('extra', table.column_names, "A field missing from the first record was dropped.")
+
+
+class SynchronizerTest(TestCase):
+    """
+    Tests the incremental synchronization based on record versions.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.remote = {str(i): {'id': str(i), 'version': 1} for i in range(250)}
+        self.batches = []
+
+    def fake_get(self, resource_path, administration_id=None, params=None):
+        self.assertEqual(resource_path, 'contacts/synchronization')
+        return [{'id': record['id'], 'version': record['version']} for record in self.remote.values()]
+
+    def fake_post(self, resource_path, data, administration_id=None):
+        self.assertEqual(resource_path, 'contacts/synchronization')
+        self.batches.append(len(data['ids']))
+        return [self.remote[id_] for id_ in data['ids']]
+
+    def test_synchronize(self):
+        known = {id_: 1 for id_ in self.remote}
+        known['0'] = 0
+        known['deleted'] = 1
+        del known['1']
+
+        with patch.object(self.api, 'get', self.fake_get), patch.object(self.api, 'post', self.fake_post):
+            result = Synchronizer(self.api, 'contacts', 123).synchronize(known)
+
+        self.assertEqual(sorted(record['id'] for record in result.updated), ['0', '1'], "Wrong records were updated.")
+        self.assertEqual(result.deleted, ['deleted'], "The deleted records were not detected.")
+        self.assertEqual(len(result.versions), 250, "Not all remote versions were returned.")
+
+    def test_filtered(self):
+        known = {'0': 0, 'outside': 1}
+        with patch.object(self.api, 'get', self.fake_get), patch.object(self.api, 'post', self.fake_post):
+            result = Synchronizer(self.api, 'contacts', 123).synchronize(known, params=Filter(contact_id=1))
+
+        self.assertEqual(len(result.updated), 250, "The changed records were not fetched.")
+        self.assertEqual(result.deleted, [], "Records outside the filter were reported as deleted.")
+
+    def test_batches(self):
+        with patch.object(self.api, 'get', self.fake_get), patch.object(self.api, 'post', self.fake_post):
+            result = Synchronizer(self.api, 'contacts', 123).synchronize({})
+
+        self.assertEqual(len(result.updated), 250, "Not all new records were fetched.")
+        self.assertEqual(self.batches, [100, 100, 50], "The records were not fetched in batches of 100.")
+
+
+class MirrorTest(TestCase):
+    """
+    Tests the local SQLite mirror of resources.
+    """
+    def setUp(self):
+        self.api = MoneyBird(TokenAuthentication('test_token'))
+        self.mirror = Mirror(self.api)
+        self.remote = {str(i): {'id': str(i), 'version': 1, 'customer_id': str(i % 5)} for i in range(20)}
+        self.fetched = []
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def fake_get(self, resource_path, administration_id=None, params=None):
+        return [{'id': record['id'], 'version': record['version']} for record in self.remote.values()]
+
+    def fake_post(self, resource_path, data, administration_id=None):
+        self.fetched.extend(data['ids'])
+        return [self.remote[id_] for id_ in data['ids']]
+
+    def refresh(self):
+        with patch.object(self.api, 'get', self.fake_get), patch.object(self.api, 'post', self.fake_post):
+            return self.mirror.refresh('contacts', 123)
+
+    def test_refresh(self):
+        self.assertEqual(tuple(self.refresh()), (20, 0), "The initial refresh did not store all records.")
+        self.assertEqual(self.mirror.get('contacts', 123, '3'), self.remote['3'], "The record was not stored.")
+        self.assertIsNone(self.mirror.get('contacts', 456, '3'), "Administrations are not separated.")
+
+        self.remote['3'] = {'id': '3', 'version': 2, 'customer_id': 'changed'}
+        del self.remote['4']
+        self.fetched = []
+
+        self.assertEqual(tuple(self.refresh()), (1, 1), "The refresh did not apply only the changes.")
+        self.assertEqual(self.fetched, ['3'], "Unchanged records were downloaded again.")
+        self.assertEqual(self.mirror.get('contacts', 123, '3')['customer_id'], 'changed', "The update was not stored.")
+        self.assertIsNone(self.mirror.get('contacts', 123, '4'), "The deleted record was not removed.")
+
+    def test_refresh_filtered(self):
+        self.refresh()
+        del self.remote['4']
+        self.remote['3'] = {'id': '3', 'version': 2, 'customer_id': 'changed'}
+
+        def fake_get(resource_path, administration_id=None, params=None):
+            # Record 5 is deleted after it was listed, so it is not returned when the records are requested.
+            return [{'id': '3', 'version': 2}, {'id': '5', 'version': 2}]
+
+        def fake_post(resource_path, data, administration_id=None):
+            return [self.remote[id_] for id_ in data['ids'] if id_ != '5']
+
+        with patch.object(self.api, 'get', fake_get), patch.object(self.api, 'post', fake_post):
+            result = self.mirror.refresh('contacts', 123, params=Filter(customer_id=['3', 'changed']))
+
+        self.assertEqual(tuple(result), (1, 0), "The records actually stored were not counted.")
+        self.assertIsNotNone(self.mirror.get('contacts', 123, '4'), "A record outside the filter was removed.")
+        self.assertEqual(self.mirror.get('contacts', 123, '3')['customer_id'], 'changed', "The update was not stored.")
+
+    def test_find(self):
+        self.refresh()
+        result = self.mirror.find('contacts', 123, customer_id='2')
+        self.assertEqual(sorted(record['id'] for record in result), ['12', '17', '2', '7'], "The lookup is incorrect.")
+        self.assertEqual(len(self.mirror.all('contacts', 123)), 20, "Not all records are returned.")
+        with self.assertRaises(ValueError):
+            self.mirror.find('contacts', 123, **{"x') OR 1=1 --": 1})
+
+
+class WebhookTest(TestCase):
+    """
+    Tests the webhook receiver and dispatcher.
+    """
+    def setUp(self):
+        self.dispatcher = WebhookDispatcher(tokens=['secret'], workers=2, queue_size=2, timeout=0.01)
+        self.events = []
+        self.dispatcher.add_handler(self.events.append, entity_type='Contact')
+
+    def payload(self, entity_id='1', version=1, action='contact_changed', token='secret', **entity):
+        return json.dumps({
+            'administration_id': '123',
+            'webhook_id': '456',
+            'webhook_token': token,
+            'entity_type': 'Contact',
+            'entity_id': entity_id,
+            'action': action,
+            'entity': dict(entity, id=entity_id, version=version),
+        }).encode('utf-8')
+
+    def test_parse(self):
+        event = self.dispatcher.parse(self.payload(firstname='John'))
+        self.assertEqual((event.administration_id, event.entity_id, event.version), (123, '1', 1),
+                         "The payload was not parsed properly.")
+        self.assertEqual(event.entity['firstname'], 'John', "The entity was not parsed properly.")
+
+        invalid_id = self.payload().replace(b'"123"', b'"abc"')
+        missing_fields = json.dumps({'webhook_token': 'secret'})
+        for body in (b'not json', b'[]', self.payload(token='wrong'), missing_fields, invalid_id):
+            with self.assertRaises(WebhookDispatcher.InvalidPayload, msg="An invalid payload was accepted."):
+                self.dispatcher.parse(body)
+
+    def test_deduplication(self):
+        with self.dispatcher:
+            self.assertTrue(self.dispatcher.receive(self.payload(version=2)), "A new event was not queued.")
+            self.assertFalse(self.dispatcher.receive(self.payload(version=2)), "A duplicate event was queued.")
+            self.assertFalse(self.dispatcher.receive(self.payload(version=1)), "A stale event was queued.")
+            self.assertTrue(self.dispatcher.receive(self.payload(version=3)), "A newer event was not queued.")
+            self.assertTrue(self.dispatcher.receive(self.payload(version=3, action='contact_destroyed')),
+                            "Another action on the same version was not queued.")
+            self.dispatcher.join()
+
+        self.assertEqual([(event.version, event.action) for event in self.events],
+                         [(2, 'contact_changed'), (3, 'contact_changed'), (3, 'contact_destroyed')],
+                         "The events were not handled in order.")
+        self.assertEqual(self.dispatcher.duplicates, 2, "The duplicates were not counted.")
+
+    def test_back_pressure(self):
+        # The workers are not started, so the queues, which hold four events in total, fill up.
+        with self.assertRaises(WebhookDispatcher.Busy):
+            for i in range(5):
+                self.dispatcher.receive(self.payload(entity_id=str(i)))
+        self.assertEqual(self.dispatcher.received, i + 1, "The events were not counted.")
+
+        status = []
+        response = self.dispatcher.wsgi({'CONTENT_LENGTH': '3', 'wsgi.input': io.BytesIO(b'bad')},
+                                        lambda code, headers: status.append(code))
+        self.assertEqual(status, ['400 Bad Request'], "An invalid payload was not rejected.")
+        self.assertEqual(response, [b'The payload is not valid JSON'], "The error was not returned.")
+
+    def test_busy_history(self):
+        dispatcher = WebhookDispatcher(tokens=['secret'], workers=1, queue_size=1, timeout=0.01)
+        self.assertTrue(dispatcher.receive(self.payload(version=1)), "The first event was not queued.")
+        with self.assertRaises(WebhookDispatcher.Busy):
+            dispatcher.receive(self.payload(version=2))
+
+        dispatcher._queues[0].get_nowait()
+        self.assertFalse(dispatcher.receive(self.payload(version=1)), "The version seen before was forgotten.")
+        self.assertTrue(dispatcher.receive(self.payload(version=2)), "The rejected event was not accepted again.")
+
+    def test_mirror(self):
+        mirror = Mirror(MoneyBird(TokenAuthentication('test_token')))
+        self.addCleanup(mirror.close)
+        self.dispatcher.mirror = mirror
+
+        with self.dispatcher:
+            self.dispatcher.receive(self.payload(entity_id='1', firstname='John'))
+            self.dispatcher.receive(self.payload(entity_id='2'))
+            self.dispatcher.join()
+            self.assertEqual(mirror.get('contacts', 123, '1')['firstname'], 'John', "The record was not stored.")
+
+            self.dispatcher.receive(self.payload(entity_id='1', version=2, action='contact_destroyed'))
+
+        self.assertIsNone(mirror.get('contacts', 123, '1'), "The deleted record was not removed.")
+        self.assertEqual(len(mirror.all('contacts', 123)), 1, "The other record was removed.")
+        self.assertEqual(self.dispatcher.resource_path('SalesInvoice'), 'sales_invoices',
+                         "The resource path was not derived properly.")
+
+
+class RateLimiterTest(TestCase):
+    """
+    Tests the client-side rate limiter.
+    """
+    def test_burst(self):
+        limiter = RateLimiter(rate=50, capacity=3)
+        start = time.monotonic()
+        for i in range(3):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.02, "A burst within the capacity should not be delayed.")
+        limiter.acquire()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.03, "Requests beyond the capacity were not paced.")
+
+    def test_retry_after(self):
+        limiter = RateLimiter(rate=1000, capacity=10)
+        limiter.update(fake_response(None, status_code=429, headers={'Retry-After': '0.1'}))
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09, "The Retry-After header was not respected.")
+
+        limiter = RateLimiter(rate=1000, capacity=10)
+        limiter.update(fake_response(None, status_code=429, headers={
+            'Retry-After': email.utils.formatdate(time.time() + 60, usegmt=True),
+        }))
+        with limiter._condition:
+            delay = limiter._delay()
+        self.assertAlmostEqual(delay, 60, delta=2, msg="A Retry-After date was not respected.")
+
+    def test_remaining(self):
+        limiter = RateLimiter(rate=1000, capacity=10)
+        limiter.update(fake_response(None, headers={'RateLimit-Remaining': '0', 'RateLimit-Reset': time.time() + 0.1}))
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09, "The RateLimit-Reset header was not respected.")
+
+    def test_priority(self):
+        limiter = RateLimiter(rate=20, capacity=1)
+        limiter.acquire()
+        order = []
+
+        def worker(name, priority):
+            with limiter.prioritized(priority):
+                limiter.acquire()
+            order.append(name)
+
+        threads = [threading.Thread(target=worker, args=('bulk', RateLimiter.BULK))]
+        threads[0].start()
+        time.sleep(0.01)
+        threads.append(threading.Thread(target=worker, args=('interactive', RateLimiter.INTERACTIVE)))
+        threads[1].start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, ['interactive', 'bulk'], "Interactive requests should go before bulk requests.")
+
+    def test_client(self):
+        limiter = RateLimiter(rate=1000, capacity=10)
+        api = MoneyBird(TokenAuthentication('test_token'), rate_limiter=limiter)
+        response = fake_response({'error': 'Throttled'}, status_code=429, headers={'Retry-After': '0.1'})
+        with patch.object(api.session, 'request', return_value=response):
+            with self.assertRaises(MoneyBird.Throttled):
+                api.get('administrations')
+        self.assertGreater(limiter._blocked_until, time.monotonic(), "The client did not update the rate limiter.")
+
+
+class RetryPolicyTest(TestCase):
+    """
+    Tests the retrying of requests which failed because of a transient problem.
+    """
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, backoff_factor=0.001, jitter=False)
+        self.api = MoneyBird(TokenAuthentication('test_token'), retry=self.policy)
+
+    def request(self, method, *responses):
+        with patch.object(self.api.session, 'request', side_effect=responses) as request:
+            try:
+                return self.api._request(method, 'contacts', 123)
+            finally:
+                self.calls = request.call_count
+
+    def test_retry(self):
+        result = self.request('GET', fake_response(None, 500), fake_response(None, 503), fake_response({'id': 1}))
+        self.assertEqual(result, {'id': 1}, "The request was not retried until it succeeded.")
+        self.assertEqual(self.policy.retries, 2, "The retries were not counted.")
+
+    def test_max_attempts(self):
+        with self.assertRaises(MoneyBird.ServerError):
+            self.request('GET', *[fake_response(None, 500)] * 5)
+        self.assertEqual(self.calls, 3, "The maximum number of attempts was not respected.")
+
+    def test_non_idempotent(self):
+        with self.assertRaises(MoneyBird.ServerError):
+            self.request('POST', fake_response(None, 500), fake_response({'id': 1}))
+        self.assertEqual(self.calls, 1, "A POST request which may have been processed was retried.")
+
+        result = self.request('POST', fake_response(None, 429), fake_response({'id': 1}))
+        self.assertEqual(result, {'id': 1}, "A throttled POST request was not retried.")
+
+    def test_connection_error(self):
+        result = self.request('GET', requests.ConnectionError(), fake_response({'id': 1}))
+        self.assertEqual(result, {'id': 1}, "A connection error was not retried.")
+        with self.assertRaises(requests.ReadTimeout):
+            self.request('POST', requests.ReadTimeout(), fake_response({'id': 1}))
+        result = self.request('POST', requests.ConnectTimeout(), fake_response({'id': 1}))
+        self.assertEqual(result, {'id': 1}, "A POST request which was not sent was not retried.")
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.delay(attempt) for attempt in range(1, 6)], [1, 2, 4, 5, 5], "Wrong backoff curve.")
+        response = fake_response(None, 429, headers={'Retry-After': '10'})
+        self.assertEqual(policy.delay(1, response), 10, "The Retry-After header was not respected.")
+        later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=60)
+        response = fake_response(None, 503, headers={'Retry-After': later.strftime('%a, %d %b %Y %H:%M:%S GMT')})
+        self.assertTrue(55 < policy.delay(1, response) <= 60, "The Retry-After date was not respected.")
+        response = fake_response(None, 503, headers={'Retry-After': 'soon'})
+        self.assertEqual(policy.delay(1, response), 1, "An invalid Retry-After header was not ignored.")
+        policy.jitter = True
+        self.assertTrue(all(0 <= policy.delay(3) <= 4 for i in range(100)), "The jitter is out of bounds.")
+
+    def test_status_max_attempts(self):
+        self.policy.statuses = dict(RetryPolicy.default_statuses)
+        self.policy.statuses[503] = 2
+        with self.assertLogs('moneybird', 'WARNING') as logs, self.assertRaises(MoneyBird.APIError):
+            self.request('GET', *[fake_response(None, 503)] * 5)
+        self.assertEqual(self.calls, 2, "The maximum number of attempts of the status was not respected.")
+        self.assertIn('attempt 2 of 2', logs.output[0], "The maximum number of attempts in effect was not logged.")
+
+
+@skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncMoneyBirdTest(IsolatedAsyncioTestCase):
+    """
+    Tests the asynchronous client against a local aiohttp server.
+    """
+    async def asyncSetUp(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        async def administrations(request):
+            self.headers = request.headers
+            self.query = dict(request.query)
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            return web.json_response([{'id': 123, 'name': 'Parkietje B.V.'}])
+
+        async def contact(request):
+            if request.method == 'PATCH':
+                return web.json_response({'error': {'firstname': ['is invalid']}}, status=422)
+            return web.json_response({'error': 'Not found'}, status=404)
+
+        self.calls = 0
+        app = web.Application()
+        app.router.add_get('/api/v2/administrations.json', administrations)
+        app.router.add_route('*', '/api/v2/123/contacts/1.json', contact)
+
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        class LocalAsyncMoneyBird(AsyncMoneyBird):
+            base_url = str(self.server.make_url('/api/'))
+
+        self.api = LocalAsyncMoneyBird(TokenAuthentication('test_token'))
+
+    async def asyncTearDown(self):
+        await self.api.close()
+        await self.server.close()
+
+    async def test_get(self):
+        result = await self.api.get('administrations')
+        self.assertEqual(result, [{'id': 123, 'name': 'Parkietje B.V.'}], "The response was not decoded properly.")
+        self.assertEqual(self.headers['Authorization'], 'Bearer test_token', "The request was not authenticated.")
+
+        await self.api.get('administrations', params=Filter(state=['open', 'late']))
+        self.assertEqual(self.query, {'filter': 'state:open|late'}, "The filter was not sent.")
+
+    async def test_token_change(self):
+        await self.api.get('administrations')
+        self.api.authentication.set_token('new_token')
+        await self.api.get('administrations')
+        self.assertEqual(self.headers['Authorization'], 'Bearer new_token', "The new token was not used.")
+
+    async def test_coalescing(self):
+        self.api.coalescer = RequestCoalescer()
+        self.api.metrics = MetricsAggregator()
+        results = await asyncio.gather(*[self.api.get('administrations') for _ in range(5)])
+        self.assertEqual(results, [[{'id': 123, 'name': 'Parkietje B.V.'}]] * 5, "The response was not shared.")
+        self.assertEqual((self.calls, self.api.coalescer.coalesced), (1, 4), "The requests were not coalesced.")
+        stats = self.api.metrics.snapshot()[('GET', 'administrations')]
+        self.assertEqual((stats['requests'], stats['coalesced']), (5, 4), "The coalesced requests were not measured.")
+
+    async def test_errors(self):
+        with self.assertRaises(MoneyBird.NotFound):
+            await self.api.get('contacts/1', administration_id=123)
+        with self.assertRaises(MoneyBird.InvalidData):
+            await self.api.patch('contacts/1', {'contact': {'firstname': ''}}, administration_id=123)
@@ -0,0 +1,171 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from moneybird.retry import parse_retry_after
+
+logger = logging.getLogger('moneybird')
+
+
+class RateLimiter(object):
+    """
+    Client-side rate limiter for the MoneyBird API, based on a token bucket.
+
+    The bucket refills at a steady rate and allows short bursts up to its capacity. The rate limit headers of API
+    responses (``RateLimit-Remaining``, ``RateLimit-Reset`` and ``Retry-After``) are used to correct the local state, so
+    the limiter never lets requests through when the server has indicated they will be throttled.
+
+    The limiter is thread-safe and is meant to be shared by all threads using a :py:class:`moneybird.api.MoneyBird`
+    instance, or even by multiple instances which use the same credentials. Waiting requests are let through in order of
+    priority, then in order of arrival. The priority of the requests made by a thread can be set using
+    :py:func:`prioritized`.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.throttling import RateLimiter
+        >>> limiter = RateLimiter()
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), rate_limiter=limiter)
+        >>> with limiter.prioritized(RateLimiter.BULK):
+        ...     moneybird.get('contacts/synchronization', 123)
+
+    :param rate: The number of requests per second.
+    :param capacity: The maximum number of requests in a burst.
+    """
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+    def __init__(self, rate: float = 150 / 300, capacity: int = 10):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    @property
+    def priority(self) -> int:
+        """
+        The priority of the requests made by the current thread.
+        """
+        return getattr(self._local, 'priority', self.NORMAL)
+
+    @contextmanager
+    def prioritized(self, priority: int):
+        """
+        Context manager which sets the priority of the requests made by the current thread. Lower values go first.
+
+        :param priority: The priority, e.g. :py:attr:`INTERACTIVE` or :py:attr:`BULK`.
+        """
+        previous = self.priority
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self, priority: int = None):
+        """
+        Blocks until a request may be performed.
+
+        :param priority: The priority of the request, defaults to the priority of the current thread.
+        """
+        entry = (self.priority if priority is None else priority, next(self._counter))
+
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    delay = self._delay() if self._waiting[0] == entry else None
+                    if delay == 0:
+                        self._tokens -= 1
+                        return
+                    self._condition.wait(delay)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+
+    def update(self, response: requests.Response):
+        """
+        Updates the state of the limiter using the rate limit headers of an API response.
+
+        :param response: The API response.
+        """
+        headers = response.headers
+        now = time.monotonic()
+
+        with self._condition:
+            self._refill(now)
+
+            remaining = self._header(headers, 'RateLimit-Remaining')
+            if remaining is not None:
+                self._tokens = min(self._tokens, remaining)
+
+                reset = self._header(headers, 'RateLimit-Reset')
+                if remaining <= 0 and reset is not None:
+                    self._block(now + max(reset - time.time(), 0))
+
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None and response.status_code in (403, 429):
+                self._tokens = min(self._tokens, 0)
+                self._block(now + retry_after)
+
+            self._condition.notify_all()
+
+    def _delay(self) -> float:
+        """
+        Calculates how long to wait until the next request can be performed. Must be called with the lock held.
+
+        :return: The delay in seconds, zero if a request can be performed right away.
+        """
+        now = time.monotonic()
+        self._refill(now)
+
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _refill(self, now: float):
+        """
+        Adds the tokens gained since the last refill. Must be called with the lock held.
+
+        :param now: The current monotonic time.
+        """
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _block(self, until: float):
+        """
+        Blocks all requests until the given time. Must be called with the lock held.
+
+        :param until: The monotonic time until which requests are blocked.
+        """
+        if until > self._blocked_until:
+            logger.warning("API rate limit reached, pausing requests for %.1f seconds" % (until - time.monotonic()))
+            self._blocked_until = until
+
+    @staticmethod
+    def _header(headers, name: str):
+        """
+        Reads a numeric header.
+
+        :param headers: The response headers.
+        :param name: The name of the header.
+        :return: The value of the header, or None when it is missing or invalid.
+        """
+        try:
+            return float(headers[name])
+        except (KeyError, TypeError, ValueError):
+            return None
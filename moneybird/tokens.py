@@ -0,0 +1,347 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from moneybird.authentication import Authentication, OAuthAuthentication, Token
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger('moneybird')
+
+
+class MemoryTokenStore(object):
+    """
+    Token store which keeps tokens in memory. Tokens are only shared by the threads of a single process.
+    """
+    def __init__(self):
+        self._tokens = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Token:
+        """
+        Returns a token.
+
+        :param key: The key of the token.
+        :return: The token, or None when it is not in the store.
+        """
+        return self._tokens.get(key)
+
+    def set(self, key: str, token: Token):
+        """
+        Stores a token.
+
+        :param key: The key of the token.
+        :param token: The token.
+        """
+        self._tokens[key] = token
+
+    @contextmanager
+    def lock(self, key: str):
+        """
+        Context manager holding an exclusive lock on a token, for refreshing it. The lock is held across all users of
+        the store, so only one of them refreshes the token.
+
+        :param key: The key of the token.
+        """
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+
+class FileTokenStore(object):
+    """
+    Token store which keeps tokens in a JSON file, so they can be shared by multiple processes on the same machine.
+
+    The file is replaced atomically when a token is stored. On POSIX systems, refreshes are coordinated between
+    processes using a lock file next to the token file. Elsewhere, they are only coordinated within a process.
+
+    :param path: The path to the JSON file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get(self, key: str) -> Token:
+        data = self._read().get(key)
+        return Token(**data) if data is not None else None
+
+    def set(self, key: str, token: Token):
+        with self._lock:
+            data = self._read()
+            data[key] = dict(token._asdict())
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tokens-')
+            try:
+                with os.fdopen(descriptor, 'w') as fileobj:
+                    json.dump(data, fileobj)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+    @contextmanager
+    def lock(self, key: str):
+        with self._refresh_lock, open(self.path + '.lock', 'a') as fileobj:
+            if fcntl is not None:
+                fcntl.flock(fileobj, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fileobj, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        """
+        Reads all tokens from the file.
+
+        :return: The tokens as dictionaries, by key.
+        """
+        try:
+            with open(self.path) as fileobj:
+                return json.load(fileobj)
+        except FileNotFoundError:
+            return {}
+
+
+class SQLiteTokenStore(object):
+    """
+    Token store which keeps tokens in an SQLite database, so they can be shared by multiple processes on the same
+    machine. Refreshes are coordinated between processes using database transactions.
+
+    The lock is held using a separate connection, so other threads can read tokens while a token is being refreshed.
+
+    :param path: The path to the SQLite database.
+    :param timeout: The maximum time in seconds to wait for a lock held by another process.
+    """
+    def __init__(self, path: str, timeout: float = 30):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._refresh_lock = threading.Lock()
+        self._refresh_connection = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                                   check_same_thread=False)
+        self._holder = None
+        with self._lock:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS tokens ('
+                'key TEXT PRIMARY KEY, '
+                'access_token TEXT NOT NULL, '
+                'refresh_token TEXT, '
+                'expires_at REAL'
+                ')'
+            )
+
+    def get(self, key: str) -> Token:
+        with self._get_connection() as connection:
+            row = connection.execute(
+                'SELECT access_token, refresh_token, expires_at FROM tokens WHERE key = ?', (key,),
+            ).fetchone()
+        return Token(*row) if row is not None else None
+
+    def set(self, key: str, token: Token):
+        with self._get_connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tokens (key, access_token, refresh_token, expires_at) VALUES (?, ?, ?, ?)',
+                (key,) + tuple(token),
+            )
+
+    @contextmanager
+    def lock(self, key: str):
+        with self._refresh_lock:
+            self._refresh_connection.execute('BEGIN IMMEDIATE')
+            self._holder = threading.get_ident()
+            try:
+                yield
+            except BaseException:
+                self._refresh_connection.execute('ROLLBACK')
+                raise
+            else:
+                self._refresh_connection.execute('COMMIT')
+            finally:
+                self._holder = None
+
+    def close(self):
+        """
+        Closes the database connections.
+        """
+        self._connection.close()
+        self._refresh_connection.close()
+
+    @contextmanager
+    def _get_connection(self):
+        """
+        Context manager providing the connection to use: the connection holding the lock for the thread holding it, so
+        it sees its own changes, and the shared connection for other threads.
+        """
+        if self._holder == threading.get_ident():
+            yield self._refresh_connection
+        else:
+            with self._lock:
+                yield self._connection
+
+
+class TokenManager(Authentication):
+    """
+    Authentication using OAuth tokens which are kept in a shared store and refreshed before they expire.
+
+    The current token is kept in memory and only read from the store again when it is about to expire, so tokens
+    refreshed by other processes are picked up. When the token expires within ``refresh_margin`` seconds, it is
+    refreshed in the background while requests continue to use the current token. Only one refresh is performed at a
+    time: within a process, other threads keep using the current token, and across processes, the store lock makes
+    other processes wait for the refresh and use its result. Requests only wait when the token has already expired.
+
+    When a background refresh fails, the next background attempt waits ``retry_interval`` seconds, doubling after
+    every further failure. When the OAuth server rejects the refresh token, e.g. because it was revoked, no further
+    background attempts are made, and requests fail with the error of the OAuth server once the token has expired.
+
+    Example:
+        >>> from moneybird import MoneyBird, OAuthAuthentication
+        >>> from moneybird.tokens import SQLiteTokenStore, TokenManager
+        >>> oauth = OAuthAuthentication('https://example.com/oauth/moneybird/', 'your_id', 'your_secret')
+        >>> manager = TokenManager(oauth, SQLiteTokenStore('tokens.sqlite3'), key='administration-123')
+        >>> moneybird = MoneyBird(manager)
+
+    :param oauth: The OAuth authentication used to refresh tokens. When it holds a token and the store does not, that
+        token is stored.
+    :param store: The store holding the tokens, defaults to a :py:class:`MemoryTokenStore`.
+    :param key: The key of the token in the store, e.g. the user or administration it belongs to.
+    :param refresh_margin: The time in seconds before expiry at which the token is refreshed.
+    :param retry_interval: The time in seconds before retrying a failed background refresh, doubled after every
+        further failure.
+    """
+    #: OAuth error codes which may be resolved by retrying the refresh, other errors are permanent.
+    transient_errors = frozenset(['server_error', 'temporarily_unavailable'])
+
+    def __init__(self, oauth: OAuthAuthentication, store=None, key: str = 'default', refresh_margin: float = 300,
+                 retry_interval: float = 10):
+        self.oauth = oauth
+        self.store = MemoryTokenStore() if store is None else store
+        self.key = key
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+
+        self._token = self.store.get(key)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+
+        if self._token is None and oauth.token is not None:
+            self.save(oauth.token)
+
+    @property
+    def token(self) -> Token:
+        """
+        The current token, refreshed when needed (may be None when no token was stored).
+        """
+        token = self._token
+        if token is None or token.expires_within(self.refresh_margin):
+            token = self._token = self.store.get(self.key) or token
+        if token is None or not token.expires_within(self.refresh_margin):
+            return token
+
+        if not token.expires_within(0):
+            if time.monotonic() >= self._retry_at and self._lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh_in_background, args=(token,), daemon=True).start()
+            return token
+
+        with self._lock:
+            return self._refresh(token)
+
+    def save(self, token: Token):
+        """
+        Stores a token, e.g. one obtained using :py:func:`OAuthAuthentication.obtain_token`. Background refreshes are
+        resumed if they were stopped after an error.
+
+        :param token: The token.
+        """
+        self.store.set(self.key, token)
+        self._token = token
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def refresh(self) -> Token:
+        """
+        Refreshes the token now, unless another user of the store refreshed it in the meantime.
+
+        :return: The new token.
+        """
+        with self._lock:
+            return self._refresh(self._token)
+
+    def is_ready(self) -> bool:
+        return self._token is not None or self.store.get(self.key) is not None
+
+    def get_headers(self) -> dict:
+        token = self.token
+        if token is None:
+            raise ValueError("No token is available for %s" % self.key)
+        return {
+            'Authorization': 'Bearer %s' % token.access_token,
+        }
+
+    def get_session(self) -> requests.Session:
+        session = requests.Session()
+        session.headers.update(self.get_headers())
+        return session
+
+    def _refresh(self, token: Token) -> Token:
+        """
+        Refreshes a token while holding the store lock. When the stored token differs from the given token and is
+        still valid, another user of the store has refreshed it already, and the stored token is used instead.
+
+        :param token: The token which should be refreshed.
+        :return: The new token.
+        """
+        with self.store.lock(self.key):
+            current = self.store.get(self.key) or token
+            if current is not None and current != token and not current.expires_within(self.refresh_margin):
+                logger.debug("Using token refreshed by another process for %s" % self.key)
+                self._token = current
+                return current
+
+            new = self.oauth.refresh(current.refresh_token if current is not None else None)
+            if new.refresh_token is None and current is not None:
+                new = new._replace(refresh_token=current.refresh_token)
+            self.save(new)
+            logger.debug("Refreshed token for %s" % self.key)
+            return new
+
+    def _refresh_in_background(self, token: Token):
+        """
+        Refreshes a token which is about to expire. The lock must be held, and is released afterwards.
+
+        :param token: The token which should be refreshed.
+        """
+        try:
+            self._refresh(token)
+        except Exception as e:
+            self._failures += 1
+            if isinstance(e, OAuthAuthentication.OAuthError) and e.error_code not in self.transient_errors:
+                self._retry_at = float('inf')
+                logger.warning("Refreshing the token for %s failed, not retrying in the background: %s" % (
+                    self.key, e,
+                ))
+            else:
+                delay = min(self.retry_interval * 2 ** (self._failures - 1), max(self.refresh_margin, 1))
+                self._retry_at = time.monotonic() + delay
+                logger.warning("Refreshing the token for %s failed, retrying in %.0f seconds: %s" % (
+                    self.key, delay, e,
+                ))
+        else:
+            self._failures = 0
+            self._retry_at = 0.0
+        finally:
+            self._lock.release()
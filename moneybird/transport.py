@@ -0,0 +1,465 @@
+import base64
+import datetime
+import hashlib
+import importlib.util
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+def httpx_installed() -> bool:
+    """
+    Checks whether the httpx package, which is required by :py:class:`HttpxTransport`, is installed, without importing
+    it.
+
+    :return: Whether httpx is installed.
+    """
+    return importlib.util.find_spec('httpx') is not None
+
+
+def build_url(url: str, params: dict = None) -> str:
+    """
+    Appends query parameters to a URL.
+
+    :param url: The URL.
+    :param params: The query parameters (may be None).
+    :return: The URL including the query parameters.
+    """
+    if not params:
+        return url
+    return '%s%s%s' % (url, '&' if '?' in url else '?', urlencode(params, doseq=True))
+
+
+def build_response(method: str, url: str, status_code: int, headers, content: bytes = None, raw=None,
+                   elapsed: float = 0.0) -> requests.Response:
+    """
+    Builds a requests response, so responses of all transports can be processed in the same way.
+
+    :param method: The HTTP method of the request.
+    :param url: The URL of the request, including the query parameters.
+    :param status_code: The status code of the response.
+    :param headers: The headers of the response.
+    :param content: The body of the response, or None when it is read from ``raw``.
+    :param raw: A file-like object to read the body from (optional).
+    :param elapsed: The time from sending the request until the response headers were received, in seconds.
+    :return: The response.
+    """
+    request = requests.PreparedRequest()
+    request.method = method
+    request.url = url
+
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response.url = url
+    response.request = request
+    response.raw = raw
+    response.elapsed = datetime.timedelta(seconds=elapsed)
+    if content is not None:
+        response._content = content
+        response._content_consumed = True
+    return response
+
+
+class Transport(object):
+    """
+    Base class for transports, which send requests to the API.
+
+    Transports only send requests, the client is responsible for authentication, caching, rate limiting and retrying.
+    Responses are returned as :py:class:`requests.Response` objects and errors are raised as
+    :py:class:`requests.RequestException` subclasses, whichever library is used, so all transports behave the same.
+    Transports are shared by all threads using a client and must be thread-safe.
+    """
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        """
+        Sends a request.
+
+        :param method: The HTTP method.
+        :param url: The absolute URL.
+        :param body: The request body: bytes, or an iterable of bytes (may be None).
+        :param headers: The request headers, including the authentication headers (may be None).
+        :param params: The query parameters (may be None).
+        :param stream: Whether to defer reading the response body.
+        :return: The response.
+        """
+        raise NotImplementedError()
+
+    def renew(self):
+        """
+        Discards session state, like cookies. Open connections are kept.
+        """
+        pass
+
+    def close(self):
+        """
+        Closes all pooled connections. The transport can still be used afterwards, new connections will be opened.
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport using the requests package. This is the default transport.
+
+    Every thread uses its own session, while the connection pool is shared by all threads.
+
+    :param pool_connections: The number of hosts to keep connection pools for.
+    :param pool_maxsize: The maximum number of connections to keep alive per host.
+    :param pool_block: Whether to wait for a free connection when all connections are in use, instead of opening an
+        extra connection which is discarded afterwards.
+    :param cookies: Whether to store the cookies set by the server and send them with later requests. Cookies should
+        be disabled when the transport is shared by clients with different credentials.
+    """
+    def __init__(self, pool_connections: int = 1, pool_maxsize: int = 10, pool_block: bool = False,
+                 cookies: bool = True):
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.cookies = cookies
+        self._local = threading.local()
+        self._generation = 0
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The session of the current thread.
+        """
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.session = self._create_session()
+            local.generation = self._generation
+        return local.session
+
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        return self.session.request(
+            method=method,
+            url=url,
+            data=body,
+            headers=headers,
+            params=params,
+            stream=stream,
+        )
+
+    def renew(self):
+        self._generation += 1
+
+    def close(self):
+        self.adapter.close()
+
+    def _create_session(self) -> requests.Session:
+        """
+        Creates a new session which uses the shared connection pool.
+
+        :return: The new session.
+        """
+        session = requests.Session()
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        if not self.cookies:
+            session.cookies = _DisabledCookieJar()
+        return session
+
+
+class _DisabledCookieJar(requests.cookies.RequestsCookieJar):
+    """
+    Cookie jar which does not store any cookies.
+    """
+    def set_cookie(self, cookie, *args, **kwargs):
+        pass
+
+
+class Urllib3Transport(Transport):
+    """
+    Lean transport using urllib3 directly, skipping the session machinery of requests, like cookie handling, hooks and
+    proxy settings from the environment.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.transport import Urllib3Transport
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), transport=Urllib3Transport(maxsize=16))
+
+    :param maxsize: The maximum number of connections to keep alive per host.
+    :param block: Whether to wait for a free connection when all connections are in use.
+    :param timeout: The connect and read timeout in seconds (optional).
+    """
+    def __init__(self, maxsize: int = 10, block: bool = False, timeout: float = None):
+        self.pool = urllib3.PoolManager(maxsize=maxsize, block=block)
+        self.timeout = urllib3.Timeout(timeout) if timeout is not None else urllib3.Timeout.DEFAULT_TIMEOUT
+        # Only redirects are followed, retrying is up to the client.
+        self.retries = urllib3.Retry(total=None, connect=0, read=False, status=0, other=0, redirect=10,
+                                     raise_on_status=False)
+
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        url = build_url(url, params)
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, bytes) and hasattr(body, '__len__'):
+            headers['Content-Length'] = str(len(body))
+            body = iter(body)
+
+        start = time.perf_counter()
+        try:
+            response = self.pool.urlopen(method, url, body=body, headers=headers, retries=self.retries,
+                                         timeout=self.timeout, preload_content=False)
+            elapsed = time.perf_counter() - start
+            content = None if stream else response.read()
+        except (urllib3.exceptions.HTTPError, OSError) as e:
+            raise self._convert_error(e)
+
+        if not stream:
+            response.release_conn()
+        return build_response(method, url, response.status, response.headers, content, response, elapsed)
+
+    def close(self):
+        self.pool.clear()
+
+    @staticmethod
+    def _convert_error(error: Exception) -> requests.RequestException:
+        """
+        Converts a urllib3 exception into the exception requests would raise.
+
+        :param error: The urllib3 exception.
+        :return: The requests exception.
+        """
+        exceptions = urllib3.exceptions
+        if isinstance(error, exceptions.MaxRetryError):
+            reason = error.reason
+            if isinstance(reason, exceptions.ConnectTimeoutError) and \
+                    not isinstance(reason, exceptions.NewConnectionError):
+                return requests.ConnectTimeout(error)
+            if isinstance(reason, exceptions.ResponseError):
+                return requests.exceptions.RetryError(error)
+            if isinstance(reason, exceptions.SSLError):
+                return requests.exceptions.SSLError(error)
+            return requests.ConnectionError(error)
+        if isinstance(error, exceptions.ReadTimeoutError):
+            return requests.ReadTimeout(error)
+        if isinstance(error, exceptions.SSLError):
+            return requests.exceptions.SSLError(error)
+        if isinstance(error, (exceptions.ProtocolError, exceptions.ClosedPoolError, OSError)):
+            return requests.ConnectionError(error)
+        return requests.RequestException(error)
+
+
+class HttpxTransport(Transport):
+    """
+    Transport using the httpx package, which supports HTTP/2. With HTTP/2, all concurrent requests to the API are
+    multiplexed over a single connection.
+
+    HTTP/2 is disabled by default, since it requires the h2 package, which is installed with
+    ``pip install httpx[http2]``.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.transport import HttpxTransport
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), transport=HttpxTransport(http2=True))
+
+    :param http2: Whether to use HTTP/2 when the server supports it.
+    :param max_connections: The maximum number of connections.
+    :param timeout: The connect and read timeout in seconds (optional).
+    """
+    def __init__(self, http2: bool = False, max_connections: int = 10, timeout: float = None):
+        try:
+            import httpx  # Imported here, since it is optional and slow to import.
+        except ImportError:
+            raise ImportError("HttpxTransport requires the httpx package")
+
+        self._httpx = httpx
+        self.client = httpx.Client(
+            http2=http2,
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=timeout,
+        )
+
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        url = build_url(url, params)
+        headers = dict(headers or {})
+        if body is not None and not isinstance(body, bytes) and hasattr(body, '__len__'):
+            headers['Content-Length'] = str(len(body))
+            body = iter(body)
+
+        start = time.perf_counter()
+        try:
+            response = self.client.send(self.client.build_request(method, url, content=body, headers=headers),
+                                        stream=True)
+            elapsed = time.perf_counter() - start
+            content = None if stream else response.read()
+        except self._httpx.HTTPError as e:
+            raise self._convert_error(e)
+
+        if not stream:
+            response.close()
+        return build_response(method, url, response.status_code, response.headers, content, _HttpxStream(response),
+                              elapsed)
+
+    def close(self):
+        self.client.close()
+
+    def _convert_error(self, error: Exception) -> requests.RequestException:
+        """
+        Converts an httpx exception into the exception requests would raise.
+
+        :param error: The httpx exception.
+        :return: The requests exception.
+        """
+        httpx = self._httpx
+        if isinstance(error, httpx.ConnectTimeout):
+            return requests.ConnectTimeout(error)
+        if isinstance(error, httpx.ReadTimeout):
+            return requests.ReadTimeout(error)
+        if isinstance(error, (httpx.ConnectError, httpx.NetworkError, httpx.RemoteProtocolError)):
+            return requests.ConnectionError(error)
+        return requests.RequestException(error)
+
+
+class _HttpxStream(object):
+    """
+    File-like wrapper around a streamed httpx response, as expected by :py:func:`requests.Response.iter_content`.
+    """
+    def __init__(self, response):
+        self.response = response
+
+    def stream(self, chunk_size: int, decode_content: bool = True):
+        return self.response.iter_bytes(chunk_size)
+
+    def close(self):
+        self.response.close()
+
+
+class RecordingTransport(Transport):
+    """
+    Transport which records all requests and responses passing through another transport to a file, so they can be
+    served by a :py:class:`ReplayTransport` later.
+
+    Every exchange is written as one line of JSON. Response bodies are read completely before they are recorded, so
+    streamed responses are held in memory.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.transport import RecordingTransport, RequestsTransport
+        >>> transport = RecordingTransport(RequestsTransport(), 'moneybird-traffic.jsonl')
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), transport=transport)
+
+    :param transport: The transport which sends the requests.
+    :param path: The path of the file to append the exchanges to.
+    """
+    def __init__(self, transport: Transport, path: str):
+        self.transport = transport
+        self.path = path
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        response = self.transport.request(method, url, body, headers, params, stream)
+
+        exchange = OrderedDict([
+            ('method', method),
+            ('url', build_url(url, params)),
+            ('body', _body_hash(body)),
+            ('status_code', response.status_code),
+            ('headers', dict(response.headers)),
+        ])
+        exchange.update(_encode_content(response.content))
+
+        line = json.dumps(exchange) + '\n'
+        with self._lock, open(self.path, 'a') as fileobj:
+            fileobj.write(line)
+        return response
+
+    def renew(self):
+        self.transport.renew()
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Transport which serves responses recorded by a :py:class:`RecordingTransport`, without contacting the API. This
+    makes load tests and other tests deterministic.
+
+    Requests are matched on their method, URL, query parameters and body. When the same request was recorded multiple
+    times, the recorded responses are served in order, starting over after the last one. Requests which were not
+    recorded fail with a :py:class:`requests.RequestException`.
+
+    Example:
+        >>> from moneybird import MoneyBird, TokenAuthentication
+        >>> from moneybird.transport import ReplayTransport
+        >>> transport = ReplayTransport('moneybird-traffic.jsonl')
+        >>> moneybird = MoneyBird(TokenAuthentication('access_token'), transport=transport)
+
+    :param path: The path of the file containing the recorded exchanges.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.exchanges = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+        with open(path) as fileobj:
+            for line in fileobj:
+                if line.strip():
+                    exchange = json.loads(line)
+                    key = (exchange['method'], exchange['url'], exchange['body'])
+                    self.exchanges.setdefault(key, []).append(exchange)
+
+    def request(self, method: str, url: str, body=None, headers: dict = None, params: dict = None,
+                stream: bool = False) -> requests.Response:
+        url = build_url(url, params)
+        key = (method, url, _body_hash(body))
+
+        exchanges = self.exchanges.get(key)
+        if not exchanges:
+            raise requests.RequestException("No recorded response for %s %s" % (method, url))
+
+        with self._lock:
+            position = self._positions.get(key, 0)
+            self._positions[key] = (position + 1) % len(exchanges)
+
+        exchange = exchanges[position]
+        return build_response(method, url, exchange['status_code'], exchange['headers'], _decode_content(exchange))
+
+
+def _body_hash(body) -> str:
+    """
+    Hashes a request body, for matching recorded requests.
+
+    :param body: The request body (may be None).
+    :return: The hash, or None when there is no body or it is streamed.
+    """
+    if not isinstance(body, bytes):
+        return None
+    return hashlib.sha256(body).hexdigest()
+
+
+def _encode_content(content: bytes) -> dict:
+    """
+    Encodes a response body for storage in JSON, as text when possible.
+
+    :param content: The response body.
+    :return: A dictionary containing either ``content`` or ``content_base64``.
+    """
+    try:
+        return {'content': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'content_base64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_content(exchange: dict) -> bytes:
+    """
+    Decodes a response body encoded by :py:func:`_encode_content`.
+
+    :param exchange: The recorded exchange.
+    :return: The response body.
+    """
+    if 'content_base64' in exchange:
+        return base64.b64decode(exchange['content_base64'])
+    return exchange['content'].encode('utf-8')
@@ -0,0 +1,335 @@
+import hmac
+import json
+import logging
+import queue
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger('moneybird')
+
+WebhookEvent = namedtuple('WebhookEvent', [
+    'administration_id', 'webhook_id', 'entity_type', 'entity_id', 'action', 'state', 'version', 'entity',
+])
+WebhookEvent.__doc__ = """
+An event sent by the API to a webhook.
+
+:param administration_id: The administration id.
+:param webhook_id: The id of the webhook which received the event.
+:param entity_type: The type of the changed record, e.g. ``SalesInvoice``.
+:param entity_id: The id of the changed record.
+:param action: The action, e.g. ``sales_invoice_created``.
+:param state: The state of the record, when it has one (may be None).
+:param version: The version of the record (may be None).
+:param entity: The record as sent with the event (may be None).
+"""
+
+
+class WebhookDispatcher(object):
+    """
+    Receives webhook events and dispatches them to handlers using a pool of worker threads.
+
+    Payloads are validated against the tokens of the webhooks, which are returned by the API when a webhook is
+    registered. Since the API may deliver an event more than once, events are deduplicated by record and version, and
+    events older than the last seen version of a record are dropped.
+
+    Every record is always handled by the same worker, so the events of a record are handled in order, while the events
+    of different records are handled concurrently. Every worker has a bounded queue. When it is full,
+    :py:func:`receive` waits up to ``timeout`` seconds and then raises :py:class:`Busy`, which should be answered with
+    an error status so the API delivers the event again later.
+
+    When a :py:class:`moneybird.mirror.Mirror` is given, it is kept up to date with the records sent with the events.
+
+    Example:
+        >>> from moneybird.webhooks import WebhookDispatcher
+        >>> dispatcher = WebhookDispatcher(tokens=['webhook_token'], workers=8)
+        >>> @dispatcher.handler('SalesInvoice')
+        ... def invoice_changed(event):
+        ...     print(event.entity_id, event.action)
+        >>> with dispatcher:
+        ...     dispatcher.receive(request_body)
+        True
+
+    :param tokens: The tokens of the webhooks, payloads with another token are rejected (optional, but recommended).
+    :param workers: The number of worker threads.
+    :param queue_size: The maximum number of queued events per worker.
+    :param timeout: The maximum time in seconds :py:func:`receive` waits for room in a queue.
+    :param mirror: A mirror to store the received records in (optional).
+    :param resources: Resource paths by entity type, for entity types which are not stored in the resource path derived
+        from their name, e.g. ``{'Document::Receipt': 'documents/receipts'}`` (optional).
+    :param history_size: The number of records for which the last seen version is remembered for deduplication.
+    """
+    _camel_pattern = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+    _delete_actions = ('_destroyed', '_deleted')
+
+    def __init__(self, tokens=None, workers: int = 4, queue_size: int = 1000, timeout: float = 5,
+                 mirror=None, resources: dict = None, history_size: int = 100000):
+        self.tokens = [token.encode('utf-8') for token in tokens or []]
+        self.workers = workers
+        self.timeout = timeout
+        self.mirror = mirror
+        self.resources = resources or {}
+        self.history_size = history_size
+
+        self.received = 0
+        self.duplicates = 0
+        self.failures = 0
+
+        self._handlers = []
+        self._queues = [queue.Queue(queue_size) for _ in range(workers)]
+        self._threads = []
+        self._history = OrderedDict()
+        self._lock = threading.Lock()
+
+    def handler(self, entity_type: str = None, action: str = None):
+        """
+        Decorator registering a handler, see :py:func:`add_handler`.
+
+        :param entity_type: The entity type to handle, e.g. ``SalesInvoice`` (optional).
+        :param action: The action to handle, e.g. ``sales_invoice_paid`` (optional).
+        :return: The decorator.
+        """
+        def decorator(function):
+            self.add_handler(function, entity_type, action)
+            return function
+        return decorator
+
+    def add_handler(self, function, entity_type: str = None, action: str = None):
+        """
+        Registers a handler, which is called with the :py:class:`WebhookEvent` of every matching event. Exceptions
+        raised by handlers are logged and do not affect other handlers.
+
+        :param function: The handler.
+        :param entity_type: The entity type to handle, all entity types when omitted.
+        :param action: The action to handle, all actions when omitted.
+        """
+        self._handlers.append((entity_type, action, function))
+
+    def parse(self, body) -> WebhookEvent:
+        """
+        Validates and parses a webhook payload.
+
+        :param body: The request body, as bytes or text.
+        :return: The event.
+        """
+        try:
+            data = json.loads(body.decode('utf-8') if isinstance(body, bytes) else body)
+        except ValueError:
+            raise WebhookDispatcher.InvalidPayload("The payload is not valid JSON")
+        if not isinstance(data, dict):
+            raise WebhookDispatcher.InvalidPayload("The payload is not a JSON object")
+
+        if self.tokens:
+            token = str(data.get('webhook_token') or '').encode('utf-8')
+            if not any(hmac.compare_digest(token, known) for known in self.tokens):
+                raise WebhookDispatcher.InvalidPayload("The webhook token is not valid")
+
+        for field in ('administration_id', 'entity_type', 'entity_id', 'action'):
+            if not data.get(field):
+                raise WebhookDispatcher.InvalidPayload("The payload does not contain %s" % field)
+
+        try:
+            administration_id = int(data['administration_id'])
+        except (TypeError, ValueError):
+            raise WebhookDispatcher.InvalidPayload("The administration id is not valid")
+
+        entity = data.get('entity') if isinstance(data.get('entity'), dict) else None
+        return WebhookEvent(
+            administration_id=administration_id,
+            webhook_id=data.get('webhook_id'),
+            entity_type=data['entity_type'],
+            entity_id=str(data['entity_id']),
+            action=data['action'],
+            state=data.get('state'),
+            version=entity.get('version') if entity is not None else None,
+            entity=entity,
+        )
+
+    def receive(self, body) -> bool:
+        """
+        Validates and parses a webhook payload and queues the event for handling.
+
+        :param body: The request body, as bytes or text.
+        :return: Whether the event was queued, False when it is a duplicate.
+        """
+        event = self.parse(body)
+        return self.dispatch(event)
+
+    def dispatch(self, event: WebhookEvent) -> bool:
+        """
+        Queues an event for handling, unless it is a duplicate.
+
+        :param event: The event.
+        :return: Whether the event was queued, False when it is a duplicate.
+        """
+        key = (event.administration_id, event.entity_type, event.entity_id)
+        with self._lock:
+            self.received += 1
+            previous = self._history.get(key)
+            if self._is_duplicate(key, event):
+                self.duplicates += 1
+                logger.debug("Duplicate webhook event ignored: %s %s" % (event.action, event.entity_id))
+                return False
+
+        try:
+            self._queues[hash(key) % self.workers].put(event, timeout=self.timeout)
+        except queue.Full:
+            # The event will be delivered again, so the version seen before it is restored, unless a newer event of
+            # the record was received in the meantime.
+            with self._lock:
+                if self._history.get(key) == (event.version, event.action):
+                    if previous is None:
+                        del self._history[key]
+                    else:
+                        self._history[key] = previous
+            raise WebhookDispatcher.Busy("The webhook queue is full")
+        return True
+
+    def start(self):
+        """
+        Starts the worker threads.
+        """
+        for number, events in enumerate(self._queues):
+            thread = threading.Thread(target=self._work, args=(events,), name='WebhookWorker-%d' % number, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def join(self):
+        """
+        Blocks until all queued events have been handled.
+        """
+        for events in self._queues:
+            events.join()
+
+    def stop(self):
+        """
+        Handles the queued events and stops the worker threads.
+        """
+        for events in self._queues:
+            events.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def wsgi(self, environ, start_response):
+        """
+        WSGI application receiving webhook events, which can be mounted in any WSGI server or framework.
+
+        It responds with 200 when the event was accepted or is a duplicate, with 400 for invalid payloads and with 503
+        when the queues are full, so the API delivers the event again later.
+        """
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+
+        try:
+            self.receive(environ['wsgi.input'].read(length))
+        except WebhookDispatcher.InvalidPayload as e:
+            status, message = '400 Bad Request', str(e)
+        except WebhookDispatcher.Busy as e:
+            status, message = '503 Service Unavailable', str(e)
+        else:
+            status, message = '200 OK', 'OK'
+
+        content = message.encode('utf-8')
+        start_response(status, [('Content-Type', 'text/plain'), ('Content-Length', str(len(content)))])
+        return [content]
+
+    def resource_path(self, entity_type: str) -> str:
+        """
+        Returns the resource path for an entity type, e.g. ``sales_invoices`` for ``SalesInvoice``.
+
+        :param entity_type: The entity type.
+        :return: The resource path.
+        """
+        try:
+            return self.resources[entity_type]
+        except KeyError:
+            return self._camel_pattern.sub('_', entity_type.split('::')[-1]).lower() + 's'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _is_duplicate(self, key: tuple, event: WebhookEvent) -> bool:
+        """
+        Checks whether an event has been received before or is older than the last received event of the record, and
+        remembers it otherwise. Must be called with the lock held.
+
+        :param key: The key of the record.
+        :param event: The event.
+        :return: Whether the event is a duplicate.
+        """
+        last = self._history.get(key)
+        if last is not None and event.version is not None and last[0] is not None:
+            if event.version < last[0] or (event.version, event.action) == last:
+                return True
+
+        self._history[key] = (event.version, event.action)
+        self._history.move_to_end(key)
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        return False
+
+    def _work(self, events: queue.Queue):
+        """
+        Handles the events of a queue until it receives None.
+
+        :param events: The queue.
+        """
+        while True:
+            event = events.get()
+            try:
+                if event is None:
+                    return
+                self._handle(event)
+            finally:
+                events.task_done()
+
+    def _handle(self, event: WebhookEvent):
+        """
+        Updates the mirror and calls the handlers for an event.
+
+        :param event: The event.
+        """
+        if self.mirror is not None:
+            try:
+                resource_path = self.resource_path(event.entity_type)
+                if event.action.endswith(self._delete_actions):
+                    self.mirror.remove(resource_path, event.administration_id, [event.entity_id])
+                elif event.entity is not None:
+                    self.mirror.store(resource_path, event.administration_id, [event.entity])
+            except Exception:
+                self._failed()
+                logger.exception("Updating the mirror for webhook event %s %s failed" % (event.action, event.entity_id))
+
+        for entity_type, action, function in self._handlers:
+            if (entity_type is None or entity_type == event.entity_type) and (action is None or action == event.action):
+                try:
+                    function(event)
+                except Exception:
+                    self._failed()
+                    logger.exception("Webhook handler %r failed for %s %s" % (function, event.action, event.entity_id))
+
+    def _failed(self):
+        """
+        Counts a failure of a handler or of updating the mirror.
+        """
+        with self._lock:
+            self.failures += 1
+
+    class InvalidPayload(ValueError):
+        """
+        Exception for webhook payloads which are invalid or do not belong to a known webhook.
+        """
+        pass
+
+    class Busy(Exception):
+        """
+        Exception raised when an event cannot be queued because the workers are not keeping up.
+        """
+        pass
@@ -1,4 +1,4 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(
     name='moneybird',
@@ -9,13 +9,30 @@ setup(
     author='Jan-Jelle Kester',
     author_email='janjelle@jjkester.nl',
     description='MoneyBird API and OAuth client library',
-    requires=['requests'],
+    python_requires='>=3.9',
+    install_requires=['requests>=2.9.1,<3.0'],
+    extras_require={
+        'async': ['aiohttp>=3.8'],
+        'httpx': ['httpx>=0.23'],
+        'http2': ['httpx[http2]>=0.23'],
+        'orjson': ['orjson>=3.6'],
+        'parquet': ['pyarrow>=7.0'],
+    },
+    entry_points={
+        'console_scripts': [
+            'moneybird = moneybird.cli:main',
+        ],
+    },
     classifiers=[
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
+        'Programming Language :: Python :: 3.13',
     ],
     keywords='moneybird api client oauth consumer',
 )